@@ -1,15 +1,22 @@
-﻿from fastapi import FastAPI
+﻿from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 import os
+import time
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import json
+import uuid
 import datetime
+import functools
+import contextlib
+import contextvars
+import dataclasses
 
 # Import the data cleaner and cdt classifier
 from data_cleaner import DentalScenarioProcessor
-from cdt_classifier import CDTClassifier
+from cdt_classifier import CDTClassifier, KEYWORD_DETECTED_DOUBT
 from icd_classifier import ICDClassifier
 from sub_topic_registry import SubtopicRegistry
 from questioner import Questioner
@@ -17,6 +24,19 @@ from inspector import DentalInspector
 from icd_inspector import ICDInspector
 # Import database
 from database import MedicalCodingDB
+from llm_services import get_service
+from rate_limiter import request_fanout
+from hedging import hedge_budget
+from deadline import request_deadline, time_left, degrade, degraded_stages, DEADLINE_LOW_PRIORITY_MIN, DEADLINE_TOPIC_RESERVE
+from pipeline import Pipeline, Stage, Listener, STAGE_DONE, STAGE_ERROR, emit
+from batch_analysis import BATCH_MAX_ITEMS, BATCH_CONCURRENCY, BATCH_LLM_CONCURRENCY, BulkInserter, bulk_inserts, current_inserter, dedupe, normalize_scenario
+from idempotency import (
+    RequestDeduplicator, IdempotencyConflict, fingerprint, LEADER, IDEMPOTENCY_AUTO, IDEMPOTENCY_WINDOW, IDEMPOTENCY_KEY_TTL
+)
+from job_queue import JobQueue, JobWorkerPool, JobFailed, JOB_WORKERS
+from speculation import PIPELINE_SPECULATION, REUSED, SPECULATION_ERROR, SpeculationStats, check_reuse
+from checkpoints import PIPELINE_CHECKPOINTS, CheckpointStore, encode_output
+from similarity_index import SIMILARITY_REUSE, SAME_CODES, SAME_TEETH, SimilarityIndex, SimilarAnalysis
 
 # Import topic functions
 from topics.diagnostics import diagnostic_service
@@ -130,418 +150,679 @@ def map_to_cdt_category(specific_code: str) -> str:
 # Request model
 class ScenarioRequest(BaseModel):
     scenario: str
+    # None lets the cleaner decide whether the note is already structured;
+    # True always normalizes it locally, False always sends it to the LLM
+    cleaner_bypass: Optional[bool] = None
+    # Seconds the analysis may take (REQUEST_DEADLINE if unset, 0 for no deadline)
+    deadline: Optional[float] = None
+
+class BatchRequest(BaseModel):
+    scenarios: List[str]
+    cleaner_bypass: Optional[bool] = None
 
 class QuestionAnswersRequest(BaseModel):
     answers: str
 
 # API endpoint to process user input
 @app.post("/api/analyze")
-async def analyze_web(request: ScenarioRequest):
+async def analyze_web(request: ScenarioRequest, response: Response,
+                      idempotency_key: Optional[str] = Header(None)):
     """Process the dental scenario through the data cleaner, CDT classifier, and topic activators."""
+    async def analyze():
+        # Cap how many LLM calls this one request may have in flight at once,
+        # how many of them may be hedged, and how long the whole request may take
+        with request_fanout(), hedge_budget(), request_deadline(request.deadline):
+            return await run_analysis_pipeline(request)
+
+    # Retries and double submissions share one pipeline run and one dental_report record
+    request_fingerprint = fingerprint(normalize_scenario(request.scenario), request.cleaner_bypass)
+    if idempotency_key:
+        key, ttl = f"key:{idempotency_key}", IDEMPOTENCY_KEY_TTL
+    elif IDEMPOTENCY_AUTO:
+        key, ttl = f"scenario:{request_fingerprint}", IDEMPOTENCY_WINDOW
+    else:
+        return await analyze()
     try:
-        # Step 1: Process the input through data_cleaner
-        print("\n*************************** STEP 1: DATA CLEANING ***************************")
-        print(f"🔍 INPUT SCENARIO: {request.scenario}")
-        processed_result = cleaner.process(request.scenario)
-        processed_scenario = processed_result["standardized_scenario"]
-        print(f"✅ PROCESSED SCENARIO: {processed_scenario}")
-        
-        # Step 2: Process the cleaned scenario with CDT and ICD classifiers in parallel
-        print("\n*************************** STEP 2: PARALLEL CLASSIFICATION ***************************")
-        print(f"⏳ RUNNING CDT & ICD CLASSIFICATION IN PARALLEL...")
-        
-        # Create async tasks for parallel execution
-        async def run_cdt_classification():
-            return cdt_classifier.process(processed_scenario)
-            
-        async def run_icd_classification():
-            return icd_classifier.process(processed_scenario)
-        
-        # Run both classifications in parallel
-        cdt_task = asyncio.create_task(run_cdt_classification())
-        icd_task = asyncio.create_task(run_icd_classification())
-        
-        # Await both results
-        cdt_result, icd_result = await asyncio.gather(cdt_task, icd_task)
-        
-        # Log CDT results
-        print(f"🏆 CDT CLASSIFICATION COMPLETE with {len(cdt_result.get('formatted_results', []))} code ranges")
-        
-        # Log ICD results
-        if "error" in icd_result and icd_result["error"]:
-            print(f"❌ ICD CLASSIFICATION ERROR: {icd_result['error']}")
-        else:
-            print(f"🏆 ICD CLASSIFICATION COMPLETE with {len(icd_result.get('categories', []))} categories")
-            if icd_result.get("icd_codes"):
-                print(f"📋 ICD CODES IDENTIFIED: {', '.join(icd_result.get('icd_codes', []))}")
-        
-        # Step 3: Activate topics in parallel based on code ranges
-        print("\n*************************** STEP 3: TOPIC ACTIVATION ***************************")
-        print(f"⚡ ACTIVATING TOPICS IN PARALLEL...")
-        range_codes = cdt_result["range_codes_string"].split(",")
-        
-        # Process code ranges to get the standardized categories
-        category_ranges = set()
-        for range_code in range_codes:
-            category = map_to_cdt_category(range_code.strip())
-            if category:
-                category_ranges.add(category)
-        
-        # Convert to comma-separated string for the registry
-        category_ranges_str = ",".join(category_ranges)
-        
-        # Run all relevant topics in parallel
-        topic_results = await topic_registry.activate_all(processed_scenario, category_ranges_str)
-        
-        # Make sure we have valid data structures
-        activated_subtopics = topic_results.get('activated_subtopics', [])
-        topic_result = topic_results.get('topic_result', [])
-        print(f"🎯 TOPICS ACTIVATED: {activated_subtopics}")
-        print(f"📋 SPECIFIC CODES IDENTIFIED: {len(topic_result)}")
-        
-        # Step 4: Process results for response
-        print("\n*************************** STEP 4: PROCESSING RESULTS ***************************")
-        
-        # Process the CDT classification data for better structure
-        formatted_cdt_results = []
-        for result in cdt_result.get("formatted_results", []):
-            formatted_result = {
-                "code_range": result.get("code_range", ""),
-                "explanation": result.get("explanation", ""),
-                "doubt": result.get("doubt", "")
-            }
-            formatted_cdt_results.append(formatted_result)
-        
-        # Process topic_result to extract codes by subtopic for the response
-        subtopic_data = {}
-        for topic_item in topic_result:
-            topic_name = topic_item.get("topic", "Unknown")
-            if "codes" in topic_item:
-                for subtopic_code in topic_item["codes"]:
-                    subtopic_name = subtopic_code.get("topic", "Unknown Subtopic")
-                    code_range = subtopic_code.get("code_range", "")
-                    subtopic_key = f"{subtopic_name} ({code_range})"
-                    
-                    if "codes" in subtopic_code:
-                        codes_list = []
-                        for code_entry in subtopic_code["codes"]:
-                            code = code_entry.get("code", "Unknown")
-                            # Clean up code value
-                            if isinstance(code, str):
-                                if " - " in code:
-                                    code = code.split(" - ")[0].strip()
-                            
-                            explanation = code_entry.get("explanation", "")
-                            doubt = code_entry.get("doubt", "")
-                            
-                            codes_list.append({
-                                "code": code,
-                                "explanation": explanation,
-                                "doubt": doubt
-                            })
-                        
-                        if subtopic_key not in subtopic_data:
-                            subtopic_data[subtopic_key] = []
-                        subtopic_data[subtopic_key].extend(codes_list)
-        
-        # Remove codes arrays from topic_result to avoid duplication
-        cleaned_topic_result = []
-        for topic_item in topic_result:
-            # Create a copy without the codes array
-            cleaned_item = {
-                "topic": topic_item.get("topic", "Unknown"),
-                "code_range": topic_item.get("code_range", ""),
-                "activated_subtopics": topic_item.get("activated_subtopics", [])
-            }
-            cleaned_topic_result.append(cleaned_item)
-        
-        # Format the topics data for response
-        topics_data = {}
-        for code_range in category_ranges:
-            if code_range in CDT_TOPIC_MAPPING:
-                topic_name = CDT_TOPIC_MAPPING[code_range]["name"]
-                topics_data[code_range] = {
-                    "name": topic_name,
-                    "activated": topic_name in activated_subtopics
-                }
-        
-        # Save data to database
-        print("\n*************************** SAVING TO DATABASE ***************************")
-        try:
-            # Filter out activated_subtopics from topic_result for database
-            db_topic_result = []
-            for topic_item in cleaned_topic_result:
-                # Create a copy without the activated_subtopics
-                filtered_item = {
-                    "topic": topic_item.get("topic", "Unknown"),
-                    "code_range": topic_item.get("code_range", "")
-                    # Removed activated_subtopics
-                }
-                db_topic_result.append(filtered_item)
-            
-            # Prepare the complete CDT result data with all components
-            complete_cdt_data = {
-                "cdt_classification": {
-                    "CDT_classifier": formatted_cdt_results,
-                },
-                "topics_results": {
-                    "topic_result": db_topic_result, 
-                    "subtopic_data": subtopic_data
-                }
-            }
-            
-            # Prepare the complete ICD result data - ensuring all keys exist and have valid values
-            complete_icd_data = {}
-            
-            # Check if icd_result exists and is not None
-            if icd_result is not None:
-                # Get primary category and topic result for simplified version
-                primary_icd_code = ""
-                primary_explanation = ""
-                primary_doubt = ""
-                
-                # Extract from topics_results if available
-                if "icd_topics_results" in icd_result and icd_result["icd_topics_results"]:
-                    if "category_numbers_string" in icd_result and icd_result["category_numbers_string"]:
-                        primary_category = icd_result["category_numbers_string"].split(",")[0]
-                        if primary_category in icd_result["icd_topics_results"]:
-                            topic_data = icd_result["icd_topics_results"][primary_category]
-                            if "parsed_result" in topic_data:
-                                parsed = topic_data["parsed_result"]
-                                primary_icd_code = parsed.get("code", "")
-                                primary_explanation = parsed.get("explanation", "")
-                                primary_doubt = parsed.get("doubt", "")
-                
-                # If still no data, try categories
-                if not primary_icd_code and "categories" in icd_result and icd_result["categories"]:
-                    category_index = 0
-                    if "icd_codes" in icd_result and len(icd_result["icd_codes"]) > category_index:
-                        primary_icd_code = icd_result["icd_codes"][category_index]
-                    if "explanations" in icd_result and len(icd_result["explanations"]) > category_index:
-                        primary_explanation = icd_result["explanations"][category_index]
-                    if "doubts" in icd_result and len(icd_result["doubts"]) > category_index:
-                        primary_doubt = icd_result["doubts"][category_index]
-                
-                # Store both the full data and a simplified version
-                complete_icd_data = {
-                    "simplified": {
-                        "code": primary_icd_code,
-                        "explanation": primary_explanation,
-                        "doubt": primary_doubt
-                    }
-                }
-                
-                print(f"⏳ Prepared ICD data for storage with primary code: {primary_icd_code}")
-            else:
-                print("⚠️ No ICD result data available to save")
-                complete_icd_data = {"error": "No ICD data available"}
-            
-            # Check data sizes
-            cdt_json = json.dumps(complete_cdt_data)
-            icd_json = json.dumps(complete_icd_data)
-            print(f"💾 CDT data size: {len(cdt_json)} bytes")
-            print(f"💾 ICD data size: {len(icd_json)} bytes")
-            
-            # Prepare data for database storage
-            db_data = {
-                "user_question": request.scenario,  # Original user question
-                "processed_clean_data": processed_scenario,  # Cleaned data
-                "cdt_result": cdt_json,  # Complete CDT result data
-                "icd_result": icd_json   # Complete ICD result data
+        result, source = await request_deduplicator.run(key, request_fingerprint, ttl, analyze, keep=is_complete_analysis)
+    except IdempotencyConflict as e:
+        return {"status": "error", "message": str(e)}
+    if source != LEADER:
+        print(f"♻️ DUPLICATE REQUEST ANSWERED FROM THE {source.upper().replace('_', ' ')} RUN")
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+@app.post("/api/analyze/resume/{checkpoint_id}")
+async def resume_analysis(checkpoint_id: str):
+    """Continue a failed or interrupted analysis, by checkpoint id or record id, running only its missing stages."""
+    if checkpoint_store is None:
+        return {"status": "error", "message": "Checkpoints are disabled (PIPELINE_CHECKPOINTS)"}
+    checkpoint = await asyncio.to_thread(checkpoint_store.find, checkpoint_id)
+    if not checkpoint:
+        return {"status": "error", "message": f"No checkpoints found for ID: {checkpoint_id}"}
+    print(f"⏯️ RESUMING ANALYSIS {checkpoint['id']} WITH {len(checkpoint['stages'])} COMPLETED STAGES")
+    request = ScenarioRequest(**checkpoint["request"])
+
+    async def resume():
+        with request_fanout(), hedge_budget(), request_deadline(request.deadline):
+            return await run_analysis_pipeline(request, checkpoint_id=checkpoint["id"])
+
+    # Two resumes of the same run share one pipeline run, so the record is never saved twice
+    result, _ = await request_deduplicator.run(f"resume:{checkpoint['id']}", checkpoint["id"], 0, resume,
+                                               keep=lambda result: False)
+    return result
+
+def is_complete_analysis(result: Dict[str, Any]) -> bool:
+    """Whether a response may be replayed to later duplicates: saved, and not degraded to meet a deadline."""
+    return (
+        result.get("status") == "success"
+        and result["data"].get("record_id") is not None
+        and not result["data"].get("degraded")
+    )
+
+async def clean_scenario(scenario: str, cleaner_bypass: Optional[bool]) -> str:
+    """Step 1: standardize the input through data_cleaner."""
+    print("\n*************************** STEP 1: DATA CLEANING ***************************")
+    print(f"🔍 INPUT SCENARIO: {scenario}")
+    processed_result = await cleaner.process_async(scenario, bypass=cleaner_bypass)
+    processed_scenario = processed_result["standardized_scenario"]
+    if processed_result["bypassed"]:
+        print(f"⚡ STRUCTURED NOTE - CLEANER LLM CALL SKIPPED (confidence {processed_result['confidence']:.2f})")
+    print(f"✅ PROCESSED SCENARIO: {processed_scenario}")
+    return processed_scenario
+
+async def classify_cdt(processed_scenario: str) -> Dict[str, Any]:
+    """Step 2a: CDT code range classification."""
+    print(f"⏳ RUNNING CDT CLASSIFICATION...")
+    cdt_result = await cdt_classifier.process_async(processed_scenario)
+    print(f"🏆 CDT CLASSIFICATION COMPLETE with {len(cdt_result.get('formatted_results', []))} code ranges")
+    return cdt_result
+
+async def classify_icd(processed_scenario: str) -> Dict[str, Any]:
+    """Step 2b: ICD category classification and activation of the primary ICD topic."""
+    print(f"⏳ RUNNING ICD CLASSIFICATION...")
+    icd_result = await icd_classifier.process_async(processed_scenario)
+    if "error" in icd_result and icd_result["error"]:
+        print(f"❌ ICD CLASSIFICATION ERROR: {icd_result['error']}")
+    else:
+        print(f"🏆 ICD CLASSIFICATION COMPLETE with {len(icd_result.get('categories', []))} categories")
+        if icd_result.get("icd_codes"):
+            print(f"📋 ICD CODES IDENTIFIED: {', '.join(icd_result.get('icd_codes', []))}")
+    return icd_result
+
+# Speculative classifications started by the current analysis (see speculation_scope)
+_speculation_tasks: contextvars.ContextVar[Optional[List[asyncio.Task]]] = contextvars.ContextVar(
+    "speculation_tasks", default=None
+)
+
+@contextlib.contextmanager
+def speculation_scope():
+    """Cancel speculative classifications still running when the analysis ends.
+
+    Covers the paths where check_speculation never runs: the cleaner failed, the run was
+    aborted, or the request deadline cut it short.
+    """
+    tasks: List[asyncio.Task] = []
+    token = _speculation_tasks.set(tasks)
+    try:
+        yield
+    finally:
+        _speculation_tasks.reset(token)
+        pending = [task for task in tasks if not task.done()]
+        if pending:
+            print(f"🛑 CANCELLING {len(pending)} UNFINISHED SPECULATIVE CLASSIFICATIONS")
+            for task in pending:
+                task.cancel()
+
+async def start_speculation(scenario: str) -> Dict[str, asyncio.Task]:
+    """Start CDT and ICD classification on the raw scenario while the cleaner runs."""
+    print(f"⚡ SPECULATIVE CLASSIFICATION STARTED ON THE RAW SCENARIO")
+    speculation = {
+        "cdt_result": asyncio.create_task(classify_cdt(scenario)),
+        "icd_result": asyncio.create_task(classify_icd(scenario))
+    }
+    scope = _speculation_tasks.get()
+    if scope is not None:
+        scope.extend(speculation.values())
+    return speculation
+
+async def check_speculation(scenario: str, processed_scenario: str, speculation: Dict[str, asyncio.Task]) -> str:
+    """Decide whether the speculative results stand for the cleaned scenario; cancel them if not."""
+    reuse, reason = check_reuse(scenario, processed_scenario)
+    if not reuse:
+        print(f"↩️ SPECULATIVE CLASSIFICATION DISCARDED ({reason})")
+        for task in speculation.values():
+            task.cancel()
+    return reason
+
+async def resolve_classification(name: str, classify, processed_scenario: str,
+                                 speculation: Dict[str, asyncio.Task], speculation_check: str) -> Dict[str, Any]:
+    """The speculative result for name when it can be kept, else a fresh classification of the cleaned scenario."""
+    outcome = speculation_check
+    if speculation_check == REUSED:
+        result = await speculation[name]
+        if not result.get("error"):
+            speculation_stats.record(name, REUSED)
+            print(f"✅ REUSING SPECULATIVE {name.upper()}")
+            return result
+        outcome = SPECULATION_ERROR
+    speculation_stats.record(name, outcome)
+    return await classify(processed_scenario)
+
+def classification_stages() -> List[Stage]:
+    """CDT and ICD classification stages, speculative when PIPELINE_SPECULATION is set."""
+    if not PIPELINE_SPECULATION:
+        return [
+            Stage("cdt_result", classify_cdt, ("processed_scenario",)),
+            Stage("icd_result", classify_icd, ("processed_scenario",)),
+        ]
+    requires = ("processed_scenario", "speculation", "speculation_check")
+    return [
+        Stage("speculation", start_speculation, ("scenario",)),
+        Stage("speculation_check", check_speculation, ("scenario", "processed_scenario", "speculation")),
+        Stage("cdt_result", functools.partial(resolve_classification, "cdt_result", classify_cdt), requires),
+        Stage("icd_result", functools.partial(resolve_classification, "icd_result", classify_icd), requires),
+    ]
+
+# Stages a near-duplicate past analysis can stand in for: stage -> (stages that must be reused too, what must match)
+REUSE_RULES = {
+    "cdt_result": ((), SAME_CODES),
+    "icd_result": ((), SAME_CODES),
+    "topic_results": (("cdt_result",), SAME_TEETH),
+    "questioner_result": (("topic_results", "icd_result"), SAME_TEETH),
+    "inspector_results": (("questioner_result",), SAME_TEETH),
+}
+
+async def find_similar_analysis(processed_scenario: str) -> Optional[SimilarAnalysis]:
+    """Step 2c: look up a near-identical past scenario whose stage outputs can stand in for this one's."""
+    similar = await asyncio.to_thread(similarity_index.lookup, processed_scenario, REUSE_RULES)
+    if similar is not None:
+        print(f"♻️ SIMILAR TO RECORD {similar.record_id} ({similar.similarity:.2f}) - REUSING {similar.reused or 'NOTHING'}")
+    return similar
+
+def reusable(stage: Stage) -> Stage:
+    """stage, answered from the similar past analysis when the reuse rules allow it."""
+    if not SIMILARITY_REUSE:
+        return stage
+
+    async def run(similar_analysis: Optional[SimilarAnalysis], **inputs):
+        if similar_analysis is not None and stage.name in similar_analysis.reused:
+            print(f"♻️ REUSING {stage.name.upper()} FROM RECORD {similar_analysis.record_id}")
+            if "speculation" in inputs:
+                inputs["speculation"][stage.name].cancel()
+            return similar_analysis.outputs[stage.name]
+        return await stage.func(**inputs)
+
+    return dataclasses.replace(stage, func=run, requires=stage.requires + ("similar_analysis",))
+
+def similarity_stages() -> List[Stage]:
+    """The near-duplicate lookup stage, when SIMILARITY_REUSE is set."""
+    if not SIMILARITY_REUSE:
+        return []
+    return [Stage("similar_analysis", find_similar_analysis, ("processed_scenario",))]
+
+async def index_analysis(record_id: str, outputs: Dict[str, Any]):
+    """Offer a complete, freshly run analysis to later near-duplicates."""
+    similar = outputs.get("similar_analysis")
+    if degraded_stages() or any(outputs.get(name) is None for name in REUSE_RULES):
+        return
+    if similar is not None and len(similar.reused) == len(REUSE_RULES):
+        # Nothing new was computed; the source record already stands for this scenario
+        return
+    if outputs["cdt_result"].get("error") or outputs["icd_result"].get("error"):
+        return
+    stage_outputs = {name: outputs[name] for name in REUSE_RULES}
+    try:
+        await asyncio.to_thread(similarity_index.add, record_id, outputs["processed_scenario"], stage_outputs)
+    except Exception as e:
+        print(f"⚠️ Failed to index analysis {record_id} for reuse: {str(e)}")
+
+async def activate_topics(processed_scenario: str, cdt_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Step 3: activate the CDT topics for the classified code ranges in parallel."""
+    print("\n*************************** STEP 3: TOPIC ACTIVATION ***************************")
+    print(f"⚡ ACTIVATING TOPICS IN PARALLEL...")
+    range_codes = cdt_result["range_codes_string"].split(",")
+    range_codes = drop_low_relevance_ranges(range_codes, cdt_result)
+
+    # Process code ranges to get the standardized categories
+    category_ranges = set()
+    for range_code in range_codes:
+        category = map_to_cdt_category(range_code.strip())
+        if category:
+            category_ranges.add(category)
+
+    # Run all relevant topics in parallel, reporting each one to stream listeners as it finishes.
+    # Topics still running when the request budget is nearly spent are cut short.
+    left = time_left()
+    topic_results = await topic_registry.activate_all(
+        processed_scenario, ",".join(category_ranges),
+        on_result=lambda topic_item: emit("topic", {
+            "topic_result": clean_topic_item(topic_item),
+            "subtopic_data": extract_subtopic_data([topic_item])
+        }),
+        timeout=max(0.0, left - DEADLINE_TOPIC_RESERVE) if left is not None else None
+    )
+    if topic_results["timed_out_subtopics"]:
+        print(f"⏱️ TOPICS CUT SHORT BY THE REQUEST DEADLINE: {topic_results['timed_out_subtopics']}")
+        degrade("topic_results", f"Cut short: {', '.join(topic_results['timed_out_subtopics'])}")
+
+    # Make sure we have valid data structures
+    activated_subtopics = topic_results.get('activated_subtopics', [])
+    topic_result = topic_results.get('topic_result', [])
+    print(f"🎯 TOPICS ACTIVATED: {activated_subtopics}")
+    print(f"📋 SPECIFIC CODES IDENTIFIED: {len(topic_result)}")
+    return {
+        "category_ranges": category_ranges,
+        "activated_subtopics": activated_subtopics,
+        "topic_result": topic_result
+    }
+
+def drop_low_relevance_ranges(range_codes: List[str], cdt_result: Dict[str, Any]) -> List[str]:
+    """Without the budget for every topic, leave out ranges only keyword detection added, if the model picked others."""
+    left = time_left()
+    if left is None or left >= DEADLINE_LOW_PRIORITY_MIN:
+        return range_codes
+    low_relevance = {
+        result.get("code_range") for result in cdt_result.get("formatted_results", [])
+        if result.get("doubt") == KEYWORD_DETECTED_DOUBT
+    }
+    kept = [range_code for range_code in range_codes if range_code.strip() not in low_relevance]
+    if not kept or len(kept) == len(range_codes):
+        return range_codes
+    dropped = [range_code.strip() for range_code in range_codes if range_code.strip() in low_relevance]
+    print(f"⏱️ LOW-RELEVANCE RANGES SKIPPED WITH {left:.1f}s LEFT: {dropped}")
+    degrade("topic_results", f"Skipped low-relevance ranges: {', '.join(dropped)}")
+    return kept
+
+def format_cdt_results(cdt_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The CDT classification entries as returned to the client."""
+    formatted_cdt_results = []
+    for result in cdt_result.get("formatted_results", []):
+        formatted_result = {
+            "code_range": result.get("code_range", ""),
+            "explanation": result.get("explanation", ""),
+            "doubt": result.get("doubt", "")
+        }
+        formatted_cdt_results.append(formatted_result)
+    return formatted_cdt_results
+
+def extract_subtopic_data(topic_items: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Codes found by each subtopic of the given topic results, keyed by "name (code range)"."""
+    subtopic_data = {}
+    for topic_item in topic_items:
+        if "codes" in topic_item:
+            for subtopic_code in topic_item["codes"]:
+                subtopic_name = subtopic_code.get("topic", "Unknown Subtopic")
+                code_range = subtopic_code.get("code_range", "")
+                subtopic_key = f"{subtopic_name} ({code_range})"
+
+                if "codes" in subtopic_code:
+                    codes_list = []
+                    for code_entry in subtopic_code["codes"]:
+                        code = code_entry.get("code", "Unknown")
+                        # Clean up code value
+                        if isinstance(code, str):
+                            if " - " in code:
+                                code = code.split(" - ")[0].strip()
+
+                        explanation = code_entry.get("explanation", "")
+                        doubt = code_entry.get("doubt", "")
+
+                        codes_list.append({
+                            "code": code,
+                            "explanation": explanation,
+                            "doubt": doubt
+                        })
+
+                    if subtopic_key not in subtopic_data:
+                        subtopic_data[subtopic_key] = []
+                    subtopic_data[subtopic_key].extend(codes_list)
+    return subtopic_data
+
+def clean_topic_item(topic_item: Dict[str, Any]) -> Dict[str, Any]:
+    """A topic result without its codes array, which the response carries in subtopic_data instead."""
+    return {
+        "topic": topic_item.get("topic", "Unknown"),
+        "code_range": topic_item.get("code_range", ""),
+        "activated_subtopics": topic_item.get("activated_subtopics", [])
+    }
+
+async def summarize_cdt(cdt_result: Dict[str, Any], topic_results: Dict[str, Any]) -> Dict[str, Any]:
+    """Step 4a: shape the CDT classification and topic results for the response and database."""
+    formatted_cdt_results = format_cdt_results(cdt_result)
+    subtopic_data = extract_subtopic_data(topic_results["topic_result"])
+    cleaned_topic_result = [clean_topic_item(topic_item) for topic_item in topic_results["topic_result"]]
+
+    # The database copy leaves out activated_subtopics
+    db_topic_result = [
+        {"topic": topic_item["topic"], "code_range": topic_item["code_range"]}
+        for topic_item in cleaned_topic_result
+    ]
+
+    return {
+        "formatted_cdt_results": formatted_cdt_results,
+        "subtopic_data": subtopic_data,
+        "cleaned_topic_result": cleaned_topic_result,
+        # Complete CDT result data as stored in the database
+        "stored": {
+            "cdt_classification": {
+                "CDT_classifier": formatted_cdt_results,
+            },
+            "topics_results": {
+                "topic_result": db_topic_result,
+                "subtopic_data": subtopic_data
             }
-            
-            # Save to database
-            db_result = db.create_analysis_record(db_data)
-            record_id = None
-            if db_result:
-                record_id = db_result[0]["id"]
-                print(f"✅ Data saved to database successfully with ID: {record_id}")
-                print(f"  - CDT data size: {len(db_data['cdt_result'])} bytes")
-                print(f"  - ICD data size: {len(db_data['icd_result'])} bytes")
-            else:
-                print("❌ Failed to save data to database")
-            
-            # Step 5: Generate questions with the Questioner module
-            print("\n*************************** STEP 5: QUESTIONER ANALYSIS ***************************")
-            questioner_result = None
-            if record_id:
+        }
+    }
+
+async def summarize_icd(icd_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Step 4b: reduce the ICD result to the primary code, explanation and doubt."""
+    if icd_result is None:
+        print("⚠️ No ICD result data available to save")
+        return {"error": "No ICD data available"}
+
+    simplified_icd_data = {
+        "code": "",
+        "explanation": "",
+        "doubt": ""
+    }
+
+    # First, try to get data from icd_topics_results if available
+    if icd_result.get("icd_topics_results") and icd_result.get("category_numbers_string"):
+        primary_category = icd_result["category_numbers_string"].split(",")[0]
+        if primary_category in icd_result["icd_topics_results"]:
+            category_data = icd_result["icd_topics_results"][primary_category]
+            if "parsed_result" in category_data:
+                parsed = category_data["parsed_result"]
+                simplified_icd_data["code"] = parsed.get("code", "")
+                simplified_icd_data["explanation"] = parsed.get("explanation", "")
+                simplified_icd_data["doubt"] = parsed.get("doubt", "")
+
+    # If no data found yet, try categories
+    if not simplified_icd_data["code"] and icd_result.get("categories"):
+        category_index = 0
+        simplified_icd_data["code"] = (
+            icd_result["icd_codes"][category_index] if "icd_codes" in icd_result and len(icd_result["icd_codes"]) > category_index else ""
+        )
+        simplified_icd_data["explanation"] = (
+            icd_result["explanations"][category_index] if "explanations" in icd_result and len(icd_result["explanations"]) > category_index else ""
+        )
+        simplified_icd_data["doubt"] = (
+            icd_result["doubts"][category_index] if "doubts" in icd_result and len(icd_result["doubts"]) > category_index else ""
+        )
+
+    print(f"⏳ Prepared ICD data with primary code: {simplified_icd_data['code']}")
+    return {"simplified": simplified_icd_data}
+
+async def save_analysis(scenario: str, processed_scenario: str, cdt_data: Dict[str, Any],
+                        icd_data: Dict[str, Any], similar_analysis: Optional[SimilarAnalysis] = None) -> str:
+    """Insert the analysis record; nothing downstream except the later database writes waits on it."""
+    print("\n*************************** SAVING TO DATABASE ***************************")
+    stored_cdt = cdt_data["stored"]
+    if similar_analysis is not None:
+        # Record which stages came from which earlier analysis
+        stored_cdt = {**stored_cdt, "reuse": similar_analysis.as_dict()}
+    cdt_json = json.dumps(stored_cdt)
+    icd_json = json.dumps(icd_data)
+    print(f"💾 CDT data size: {len(cdt_json)} bytes")
+    print(f"💾 ICD data size: {len(icd_json)} bytes")
+
+    # Prepare data for database storage
+    db_data = {
+        "user_question": scenario,  # Original user question
+        "processed_clean_data": processed_scenario,  # Cleaned data
+        "cdt_result": cdt_json,  # Complete CDT result data
+        "icd_result": icd_json   # Complete ICD result data
+    }
+
+    inserter = current_inserter()
+    if inserter is not None:
+        # Part of a batch: the row is inserted together with the batch's other rows
+        record_id = (await inserter.add(db_data))["id"]
+    else:
+        db_result = await asyncio.to_thread(db.create_analysis_record, db_data)
+        if not db_result:
+            raise RuntimeError("Failed to save data to database")
+        record_id = db_result[0]["id"]
+    print(f"✅ Data saved to database successfully with ID: {record_id}")
+    return record_id
+
+async def generate_questions(processed_scenario: str, cdt_result: Dict[str, Any], topic_results: Dict[str, Any],
+                             cdt_data: Dict[str, Any], icd_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Step 5: ask the Questioner which details are missing."""
+    print("\n*************************** STEP 5: QUESTIONER ANALYSIS ***************************")
+    subtopic_data = cdt_data["subtopic_data"]
+    # Format simplified data for the questioner
+    simplified_cdt_data = {
+        "code_ranges": cdt_result.get("range_codes_string", ""),
+        "activated_subtopics": topic_results["activated_subtopics"],
+        "subtopics": ", ".join(list(subtopic_data.keys())) if subtopic_data else "None",
+        "formatted_cdt_results": [
+            f"{res.get('code_range')}: {res.get('explanation')}"
+            for res in cdt_data["formatted_cdt_results"]
+        ]
+    }
+
+    # Format ICD data for questioner
+    primary_icd = icd_data.get("simplified", {})
+    simplified_icd_data = {
+        "code": primary_icd.get("code", ""),
+        "explanation": primary_icd.get("explanation", ""),
+        "doubt": primary_icd.get("doubt", "")
+    }
+
+    print("⏳ Generating questions for the scenario...")
+    questioner_result = await questioner.process_async(
+        processed_scenario,
+        simplified_cdt_data,
+        simplified_icd_data
+    )
+
+    if questioner_result["has_questions"]:
+        print(f"✅ Generated {len(questioner_result['cdt_questions']['questions'])} CDT questions and {len(questioner_result['icd_questions']['questions'])} ICD questions")
+    else:
+        print("✅ No questions needed for this scenario")
+    return questioner_result
+
+def questioner_error(e: Exception) -> Dict[str, Any]:
+    print(f"❌ Error in questioner processing: {str(e)}")
+    return {
+        "cdt_questions": {"questions": [], "explanation": f"Error occurred: {str(e)}", "has_questions": False},
+        "icd_questions": {"questions": [], "explanation": f"Error occurred: {str(e)}", "has_questions": False},
+        "has_questions": False
+    }
+
+async def save_questions(record_id: str, questioner_result: Dict[str, Any]) -> bool:
+    """Store the questioner output on the analysis record."""
+    await asyncio.to_thread(db.update_questioner_data, record_id, json.dumps(questioner_result))
+    print(f"✅ Saved questioner data to database for record ID: {record_id}")
+    return True
+
+async def run_pipeline_inspectors(processed_scenario: str, cdt_data: Dict[str, Any], icd_data: Dict[str, Any],
+                                  questioner_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Step 5b: when no questions are needed, run the inspectors straight away (None otherwise)."""
+    if questioner_result.get("has_questions", False):
+        return None
+    print("✅ Proceeding directly to inspector step...")
+    return await inspect_analysis(processed_scenario, cdt_data["stored"], icd_data, questioner_result)
+
+async def save_inspection(record_id: str, cdt_data: Dict[str, Any], icd_data: Dict[str, Any],
+                          inspector_results: Optional[Dict[str, Any]]) -> bool:
+    """Store the inspector output on the analysis record."""
+    if inspector_results is None:
+        return False
+    await save_inspector_results(record_id, cdt_data["stored"], icd_data, inspector_results)
+    return True
+
+speculation_stats = SpeculationStats()
+checkpoint_store = CheckpointStore() if PIPELINE_CHECKPOINTS else None
+similarity_index = SimilarityIndex() if SIMILARITY_REUSE else None
+request_deduplicator = RequestDeduplicator()
+
+# The analysis stages; each is named after the value it produces and starts as soon
+# as the values it requires are available. Database writes are leaves, so a slow
+# or failed insert never holds up the LLM stages.
+analysis_pipeline = Pipeline([
+    Stage("processed_scenario", clean_scenario, ("scenario", "cleaner_bypass")),
+    *similarity_stages(),
+    *[reusable(stage) if stage.name in REUSE_RULES else stage for stage in classification_stages()],
+    reusable(Stage("topic_results", activate_topics, ("processed_scenario", "cdt_result"))),
+    Stage("cdt_data", summarize_cdt, ("cdt_result", "topic_results")),
+    Stage("icd_data", summarize_icd, ("icd_result",)),
+    Stage("record_id", save_analysis, ("scenario", "processed_scenario", "cdt_data", "icd_data")
+          + (("similar_analysis",) if SIMILARITY_REUSE else ()), bounded=False),
+    # Questioner and inspectors are low priority: skipped when the request deadline is close
+    reusable(Stage("questioner_result", generate_questions,
+                   ("processed_scenario", "cdt_result", "topic_results", "cdt_data", "icd_data"), fallback=questioner_error,
+                   min_budget=DEADLINE_LOW_PRIORITY_MIN)),
+    reusable(Stage("inspector_results", run_pipeline_inspectors,
+                   ("processed_scenario", "cdt_data", "icd_data", "questioner_result"),
+                   min_budget=DEADLINE_LOW_PRIORITY_MIN)),
+    Stage("questions_saved", save_questions, ("record_id", "questioner_result"), bounded=False),
+    Stage("inspection_saved", save_inspection, ("record_id", "cdt_data", "icd_data", "inspector_results"), bounded=False),
+], inputs=("scenario", "cleaner_bypass"))
+
+# Stages whose output the response cannot do without
+REQUIRED_STAGES = ("processed_scenario", "cdt_result", "icd_result", "topic_results", "cdt_data", "icd_data")
+
+# Stages whose outputs are checkpointed for resuming: the LLM work, and the database writes so they are not repeated
+CHECKPOINTED_STAGES = (
+    "processed_scenario", "cdt_result", "icd_result", "topic_results", "cdt_data", "icd_data", "record_id",
+    "questioner_result", "inspector_results", "questions_saved", "inspection_saved"
+)
+
+class CheckpointListener:
+    """A pipeline listener that checkpoints each stage the run completes itself, then passes events on to listener.
+
+    Outputs are encoded when their stage completes and written in order by one task in a worker thread;
+    await flush() before relying on them. Fallback and deadline-shortened outputs are not checkpointed,
+    nor is anything computed from them, so a resume redoes that whole branch instead of keeping results
+    built on a placeholder.
+    """
+
+    def __init__(self, checkpoint_id: str, listener: Listener = None):
+        self.checkpoint_id = checkpoint_id
+        self.listener = listener
+        self.requires = {stage.name: stage.requires for stage in analysis_pipeline.stages}
+        self.redo = set()
+        self._pending: List[Tuple[str, str, Any]] = []
+        self._writer: Optional[asyncio.Task] = None
+
+    def __call__(self, event: str, data: Any):
+        stage = data.get("stage") if event == STAGE_DONE else None
+        if stage is not None and not data.get("restored"):
+            degraded = any(entry["stage"] == stage for entry in degraded_stages())
+            if data.get("fallback") or degraded or self.redo.intersection(self.requires.get(stage, ())):
+                self.redo.add(stage)
+            elif stage in CHECKPOINTED_STAGES:
                 try:
-                    # Format simplified data for the questioner
-                    simplified_cdt_data = {
-                        "code_ranges": cdt_result.get("range_codes_string", ""),
-                        "activated_subtopics": activated_subtopics,
-                        "subtopics": ", ".join(list(subtopic_data.keys())) if subtopic_data else "None",
-                        "formatted_cdt_results": [
-                            f"{res.get('code_range')}: {res.get('explanation')}" 
-                            for res in formatted_cdt_results
-                        ]
-                    }
-                    
-                    # Format ICD data for questioner
-                    primary_icd = complete_icd_data.get("simplified", {})
-                    simplified_icd_data = {
-                        "code": primary_icd.get("code", ""),
-                        "explanation": primary_icd.get("explanation", ""),
-                        "doubt": primary_icd.get("doubt", "")
-                    }
-                    
-                    # Generate questions using the questioner module
-                    print("⏳ Generating questions for the scenario...")
-                    questioner_result = questioner.process(
-                        processed_scenario, 
-                        simplified_cdt_data, 
-                        simplified_icd_data
-                    )
-                    
-                    # Log the results
-                    if questioner_result["has_questions"]:
-                        print(f"✅ Generated {len(questioner_result['cdt_questions']['questions'])} CDT questions and {len(questioner_result['icd_questions']['questions'])} ICD questions")
-                        
-                        # Save questioner data to the database
-                        questioner_json = json.dumps(questioner_result)
-                        db.update_questioner_data(record_id, questioner_json)
-                        print(f"✅ Saved questioner data to database for record ID: {record_id}")
-                    else:
-                        print("✅ No questions needed for this scenario")
-                        
-                        # Save empty questioner data to the database
-                        db.update_questioner_data(record_id, json.dumps(questioner_result))
-                        print(f"✅ Saved empty questioner data to database for record ID: {record_id}")
-                        
-                        # Since no questions are needed, proceed directly to inspectors
-                        print("✅ Proceeding directly to inspector step...")
-                        inspector_result = await run_inspectors(record_id)
-                        print(f"✅ Inspector step complete without questions")
-                    
+                    self._pending.append((stage, encode_output(data["output"]), data["output"]))
                 except Exception as e:
-                    import traceback
-                    error_details = traceback.format_exc()
-                    print(f"❌ Error in questioner processing: {str(e)}")
-                    print(f"STACK TRACE: {error_details}")
-                    questioner_result = {
-                        "cdt_questions": {"questions": [], "explanation": f"Error occurred: {str(e)}", "has_questions": False},
-                        "icd_questions": {"questions": [], "explanation": f"Error occurred: {str(e)}", "has_questions": False},
-                        "has_questions": False
-                    }
-            else:
-                print("⚠️ Skipping questioner step - no record ID available")
-                questioner_result = {
-                    "cdt_questions": {"questions": [], "explanation": "No record ID", "has_questions": False},
-                    "icd_questions": {"questions": [], "explanation": "No record ID", "has_questions": False},
-                    "has_questions": False
-                }
-        except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            print(f"❌ Database error: {str(e)}")
-            print(f"STACK TRACE: {error_details}")
-            # Continue with API response even if database save fails
-        
+                    print(f"⚠️ Failed to checkpoint {stage}: {str(e)}")
+                    self.redo.add(stage)
+                else:
+                    if self._writer is None or self._writer.done():
+                        self._writer = asyncio.create_task(self._write())
+        if self.listener is not None:
+            self.listener(event, data)
+
+    async def _write(self):
+        while self._pending:
+            stage, encoded, output = self._pending.pop(0)
+            # A dependency whose checkpoint failed means this output must be recomputed on resume too
+            if self.redo.intersection(self.requires.get(stage, ())):
+                self.redo.add(stage)
+                continue
+            try:
+                await asyncio.to_thread(checkpoint_store.save_encoded, self.checkpoint_id, stage, encoded)
+                if stage == "record_id":
+                    await asyncio.to_thread(checkpoint_store.link_record, self.checkpoint_id, output)
+            except Exception as e:
+                print(f"⚠️ Failed to checkpoint {stage}: {str(e)}")
+                self.redo.add(stage)
+
+    async def flush(self):
+        """Wait until every checkpoint queued so far is written"""
+        if self._writer is not None:
+            await asyncio.shield(self._writer)
+
+async def run_analysis_pipeline(request: ScenarioRequest, listener: Listener = None,
+                                checkpoint_id: Optional[str] = None):
+    """Run every analysis stage for one scenario and build the API response.
+
+    Stages already checkpointed under checkpoint_id are restored instead of run again.
+    """
+    checkpoint_id = checkpoint_id or str(uuid.uuid4())
+    try:
+        restored = {}
+        checkpoints = None
+        if checkpoint_store is not None:
+            try:
+                restored = await asyncio.to_thread(checkpoint_store.open, checkpoint_id, request.model_dump())
+                listener = checkpoints = CheckpointListener(checkpoint_id, listener)
+            except Exception as e:
+                print(f"⚠️ Checkpoints unavailable, running without: {str(e)}")
+        if restored:
+            print(f"⏯️ RESTORED {len(restored)} CHECKPOINTED STAGES: {', '.join(restored)}")
+        try:
+            with speculation_scope():
+                run = await analysis_pipeline.run(listener, restored=restored, scenario=request.scenario,
+                                                  cleaner_bypass=request.cleaner_bypass)
+        finally:
+            if checkpoints is not None:
+                await checkpoints.flush()
+        outputs = run.outputs
+        timings = run.as_dict()
+        print(f"⏱️ PIPELINE COMPLETE in {timings['duration']:.2f}s - critical path: {' -> '.join(timings['critical_path'])}")
+
+        for name in REQUIRED_STAGES:
+            if name not in outputs:
+                raise RuntimeError(f"Stage {name} failed: {run.timings[name].error}")
+
+        record_id = outputs.get("record_id")
+        if record_id is None:
+            print(f"❌ Failed to save data to database: {run.timings['record_id'].error}")
+        elif SIMILARITY_REUSE:
+            await index_analysis(record_id, outputs)
+
         # Step 6: Prepare final response
         print("\n*************************** STEP 6: PREPARING RESPONSE ***************************")
-        
-        # Extract ICD data with a more robust approach - using only code, explanation, and doubt
-        simplified_icd_data = {
-            "code": "",
-            "explanation": "",
-            "doubt": ""
-        }
-        
-        # First, try to get data from icd_topics_results if available
-        if icd_result and "icd_topics_results" in icd_result and icd_result["icd_topics_results"]:
-            # Get the first category
-            if "category_numbers_string" in icd_result and icd_result["category_numbers_string"]:
-                categories = icd_result["category_numbers_string"].split(",")
-                if categories and categories[0] in icd_result["icd_topics_results"]:
-                    category_data = icd_result["icd_topics_results"][categories[0]]
-                    if "parsed_result" in category_data:
-                        parsed = category_data["parsed_result"]
-                        if "code" in parsed:
-                            simplified_icd_data["code"] = parsed["code"]
-                        if "explanation" in parsed:
-                            simplified_icd_data["explanation"] = parsed["explanation"]
-                        if "doubt" in parsed:
-                            simplified_icd_data["doubt"] = parsed["doubt"]
-        
-        # If no data found yet, try categories
-        if not simplified_icd_data["code"] and "categories" in icd_result and icd_result["categories"]:
-            category_index = 0
-            simplified_icd_data["code"] = (
-                icd_result["icd_codes"][category_index] if "icd_codes" in icd_result and len(icd_result["icd_codes"]) > category_index else ""
-            )
-            simplified_icd_data["explanation"] = (
-                icd_result["explanations"][category_index] if "explanations" in icd_result and len(icd_result["explanations"]) > category_index else ""
-            )
-            simplified_icd_data["doubt"] = (
-                icd_result["doubts"][category_index] if "doubts" in icd_result and len(icd_result["doubts"]) > category_index else ""
-            )
-        
-        # Log what we're returning for debugging
+        cdt_data = outputs["cdt_data"]
+        simplified_icd_data = outputs["icd_data"].get("simplified", {"code": "", "explanation": "", "doubt": ""})
         print(f"🏥 ICD DATA - CODE: {simplified_icd_data['code']}")
         print(f"🏥 ICD DATA - EXPLANATION: {simplified_icd_data['explanation'][:100]}...")
-        
-        # Get the most up-to-date inspector results from database
-        inspector_results = {"cdt_inspector": {}, "icd_inspector": {}}
-        if record_id:
-            try:
-                # Try to get the latest data from the database with inspector results
-                latest_analysis = db.get_complete_analysis(record_id)
-                if latest_analysis:
-                    # Check if we have dedicated inspector_results column data
-                    if 'inspector_results' in latest_analysis and latest_analysis['inspector_results']:
-                        # Parse the inspector_results JSON
-                        inspector_data = json.loads(latest_analysis['inspector_results'])
-                        inspector_results = inspector_data
-                        print(f"✅ Retrieved inspector results from dedicated column")
-                    else:
-                        # Fall back to the old method for backward compatibility
-                        latest_cdt_data = json.loads(latest_analysis.get("cdt_result", "{}"))
-                        latest_icd_data = json.loads(latest_analysis.get("icd_result", "{}"))
-                        
-                        # Extract inspector data
-                        cdt_inspector = latest_cdt_data.get("inspector_results", {})
-                        icd_inspector = latest_icd_data.get("inspector_results", {})
-                        
-                        # Format for the frontend
-                        inspector_results = {
-                            "cdt": {
-                                "codes": cdt_inspector.get("codes", []),
-                                "rejected_codes": cdt_inspector.get("rejected_codes", []),
-                                "explanation": cdt_inspector.get("explanation", "")
-                            },
-                            "icd": {
-                                "codes": icd_inspector.get("codes", []),
-                                "explanation": icd_inspector.get("explanation", "")
-                            }
-                        }
-                        print(f"✅ Retrieved inspector results from CDT/ICD data (legacy method)")
-            except Exception as e:
-                print(f"⚠️ Error retrieving inspector results: {str(e)}")
-                inspector_results = {
-                    "cdt": {"codes": [], "rejected_codes": [], "explanation": ""},
-                    "icd": {"codes": [], "explanation": ""}
-                }
-        
+
+        inspector_results = outputs.get("inspector_results") or {
+            "cdt": {"codes": [], "rejected_codes": [], "explanation": ""},
+            "icd": {"codes": [], "explanation": ""}
+        }
+
         # Prepare a clean response that is JSON-serializable and properly structured
         response_data = {
             "record_id": record_id,
-            "processed_scenario": processed_scenario,
+            # Pass to /api/analyze/resume to finish stages that failed (the record id works too, once saved)
+            "checkpoint_id": checkpoint_id,
+            "processed_scenario": outputs["processed_scenario"],
             "cdt_classification": {
-                "CDT_classifier": formatted_cdt_results,
-                "range_codes_string": cdt_result.get("range_codes_string", "")
+                "CDT_classifier": cdt_data["formatted_cdt_results"],
+                "range_codes_string": outputs["cdt_result"].get("range_codes_string", "")
             },
             "topics_results": {
-                "activated_subtopics": activated_subtopics,
-                "topic_result": cleaned_topic_result,
-                "subtopic_data": subtopic_data
+                "activated_subtopics": outputs["topic_results"]["activated_subtopics"],
+                "topic_result": cdt_data["cleaned_topic_result"],
+                "subtopic_data": cdt_data["subtopic_data"]
             },
             "icd_classification": simplified_icd_data,
-            "questioner_data": questioner_result,          
-            "inspector_results": inspector_results
+            "questioner_data": outputs.get("questioner_result"),
+            "inspector_results": inspector_results,
+            "timings": timings,
+            # Stages skipped or cut short to meet the request deadline
+            "degraded": degraded_stages(),
+            # Stages answered from a near-identical earlier analysis
+            "reuse": outputs["similar_analysis"].as_dict() if outputs.get("similar_analysis") else None
         }
-        
+
         print("\n*************************** PROCESSING COMPLETE ***************************")
-        
+
         return {
             "status": "success",
             "data": response_data
@@ -555,8 +836,257 @@ async def analyze_web(request: ScenarioRequest):
         return {
             "status": "error",
             "message": str(e),
-            "details": error_details
+            "details": error_details,
+            "checkpoint_id": checkpoint_id
+        }
+
+# Stream events sent as pipeline stages finish: stage -> (event, payload in the /api/analyze response shape)
+STREAMED_STAGES = {
+    "processed_scenario": ("processed_scenario", lambda processed_scenario: {"processed_scenario": processed_scenario}),
+    "cdt_result": ("cdt_classification", lambda cdt_result: {
+        "CDT_classifier": format_cdt_results(cdt_result),
+        "range_codes_string": cdt_result.get("range_codes_string", "")
+    }),
+    "topic_results": ("topics_results", lambda topic_results: {
+        "activated_subtopics": topic_results["activated_subtopics"],
+        "topic_result": [clean_topic_item(topic_item) for topic_item in topic_results["topic_result"]],
+        "subtopic_data": extract_subtopic_data(topic_results["topic_result"])
+    }),
+    "icd_data": ("icd_classification", lambda icd_data: icd_data.get("simplified", {"code": "", "explanation": "", "doubt": ""})),
+    "record_id": ("record", lambda record_id: {"record_id": record_id}),
+    "questioner_result": ("questioner_data", lambda questioner_result: questioner_result),
+    "inspector_results": ("inspector_results", lambda inspector_results: inspector_results),
+}
+
+# Seconds without an event after which the stream sends a keep-alive
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+def progress_listener(report) -> Listener:
+    """A pipeline listener that passes each finished stage to report as a stream event and payload."""
+    def listener(event: str, data: Any):
+        if event == STAGE_DONE:
+            streamed = STREAMED_STAGES.get(data["stage"])
+            if streamed is None or data["output"] is None:
+                return
+            event, data = streamed[0], streamed[1](data["output"])
+        report(event, data)
+    return listener
+
+async def stream_analysis(request: ScenarioRequest):
+    """Yield (event, payload) as analysis stages finish, (None, None) as a keep-alive, and finally ("result", response)."""
+    queue: asyncio.Queue = asyncio.Queue()
+    listener = progress_listener(lambda event, data: queue.put_nowait((event, data)))
+
+    async def run():
+        try:
+            with request_fanout(), hedge_budget(), request_deadline(request.deadline):
+                response = await run_analysis_pipeline(request, listener)
+        except Exception as e:
+            response = {"status": "error", "message": str(e)}
+        queue.put_nowait(("result", response))
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            try:
+                event, payload = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield None, None
+                continue
+            yield event, payload
+            if event == "result":
+                break
+    finally:
+        # The client went away (or the run finished): stop any stages still running
+        task.cancel()
+
+def format_sse(event: Optional[str], payload: Any) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@app.post("/api/analyze/stream")
+async def analyze_stream(request: ScenarioRequest):
+    """Server-sent events for each analysis stage as it finishes, ending with the full /api/analyze response."""
+    async def events():
+        async for event, payload in stream_analysis(request):
+            yield format_sse(event, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/analyze")
+async def analyze_websocket(websocket: WebSocket):
+    """WebSocket variant of /api/analyze/stream: send {"scenario": ...}, receive {"event", "data"} messages."""
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                request = ScenarioRequest(**await websocket.receive_json())
+            except (ValidationError, TypeError, ValueError) as e:
+                await websocket.send_json({"event": "error", "data": {"message": str(e)}})
+                continue
+            async for event, payload in stream_analysis(request):
+                if event is not None:
+                    await websocket.send_text(json.dumps({"event": event, "data": payload}, default=str))
+    except WebSocketDisconnect:
+        pass
+
+async def stream_batch(request: BatchRequest):
+    """Yield ("item", {...}) for every scenario of a batch as its analysis finishes, (None, None) as a
+    keep-alive, and finally ("summary", {...}). Duplicate scenarios are analysed once."""
+    unique, mapping = dedupe(request.scenarios)
+    indexes: Dict[int, List[int]] = {}
+    for index, position in enumerate(mapping):
+        indexes.setdefault(position, []).append(index)
+    print(f"📦 BATCH OF {len(request.scenarios)} SCENARIOS ({len(unique)} DISTINCT)")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    inserter = BulkInserter(db.create_analysis_records)
+    started = time.perf_counter()
+
+    async def analyze(position: int):
+        async with semaphore:
+            try:
+                response = await run_analysis_pipeline(
+                    ScenarioRequest(scenario=unique[position], cleaner_bypass=request.cleaner_bypass)
+                )
+            except Exception as e:
+                response = {"status": "error", "message": str(e)}
+        queue.put_nowait((position, response))
+
+    async def run():
+        # One fan-out cap and hedge budget for the whole batch, so together its
+        # scenarios hold no more LLM slots than BATCH_LLM_CONCURRENCY
+        with request_fanout(BATCH_LLM_CONCURRENCY), hedge_budget(), bulk_inserts(inserter):
+            tasks = [asyncio.create_task(analyze(position)) for position in range(len(unique))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await inserter.close()
+
+    task = asyncio.create_task(run())
+    succeeded = 0
+    try:
+        for _ in range(len(unique)):
+            while True:
+                try:
+                    position, response = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                    break
+                except asyncio.TimeoutError:
+                    yield None, None
+            succeeded += response["status"] == "success"
+            first = indexes[position][0]
+            for index in indexes[position]:
+                yield "item", {"index": index, "duplicate_of": None if index == first else first, "response": response}
+        await task
+    finally:
+        # The client went away (or the batch finished): stop any analyses still running
+        task.cancel()
+
+    yield "summary", {
+        "items": len(request.scenarios),
+        "distinct": len(unique),
+        "succeeded": succeeded,
+        "failed": len(unique) - succeeded,
+        "duration": time.perf_counter() - started,
+        "inserts": inserter.counters
+    }
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchRequest):
+    """Analyze a list of scenarios, streaming each result as a server-sent event as soon as it is ready."""
+    if len(request.scenarios) > BATCH_MAX_ITEMS:
+        return {"status": "error", "message": f"A batch may hold at most {BATCH_MAX_ITEMS} scenarios"}
+
+    async def events():
+        async for event, payload in stream_batch(request):
+            yield format_sse(event, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def run_analysis_job(payload: Dict[str, Any], report) -> Dict[str, Any]:
+    """Job handler: run one queued analysis, reporting stage events as progress."""
+    request = ScenarioRequest(**payload)
+    # Jobs are not bound by the gateway timeout, so they only get a deadline when one was asked for.
+    # A retried or reclaimed job resumes from the stages its earlier attempts checkpointed.
+    with request_fanout(), hedge_budget(), request_deadline(request.deadline or 0):
+        response = await run_analysis_pipeline(request, progress_listener(report), payload.get("checkpoint_id"))
+    if response["status"] == "error":
+        raise JobFailed(response["message"])
+    return response
+
+job_queue = JobQueue()
+job_workers = JobWorkerPool(job_queue, run_analysis_job)
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start this process's share of the job workers (none with JOB_WORKERS=0)."""
+    if JOB_WORKERS > 0:
+        job_workers.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    """Hand running jobs back to the queue so another worker picks them up."""
+    await job_workers.stop()
+
+@app.post("/api/jobs")
+async def create_job(request: ScenarioRequest):
+    """Queue an analysis and return its job id straight away."""
+    payload = {**request.model_dump(), "checkpoint_id": str(uuid.uuid4())}
+    job_id = await asyncio.to_thread(job_queue.enqueue, payload)
+    job_workers.notify()
+    return {"status": "queued", "job_id": job_id}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress (stream events so far) and, once finished, the /api/analyze response of a job."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        return {
+            "status": "error",
+            "message": f"No job found with ID: {job_id}"
         }
+    return {
+        "status": "success",
+        "job": {
+            "id": job["id"],
+            "state": job["status"],
+            "attempts": job["attempts"],
+            "progress": job["progress"],
+            "result": job["result"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"]
+        }
+    }
+
+@app.get("/api/pipeline-stats")
+def pipeline_stats():
+    """Per-stage outcome counts, durations and critical-path share of the analysis pipeline."""
+    return {
+        **analysis_pipeline.stats.stats(),
+        "speculation": speculation_stats.stats(),
+        "idempotency": request_deduplicator.stats(),
+        "similarity": similarity_index.stats() if similarity_index is not None else {"enabled": False},
+        "checkpoints": checkpoint_store.stats() if checkpoint_store is not None else {"enabled": False}
+    }
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    """Release the pooled LLM connections when the server stops."""
+    await get_service().aclose()
 
 @app.get("/")
 def test():
@@ -571,7 +1101,7 @@ async def submit_question_answers(record_id: str, request: QuestionAnswersReques
         print(f"Received answers: {request.answers}")
         
         # Get the existing analysis from the database
-        analysis = db.get_complete_analysis(record_id)
+        analysis = await asyncio.to_thread(db.get_complete_analysis, record_id)
         if not analysis:
             return {
                 "status": "error",
@@ -595,7 +1125,7 @@ async def submit_question_answers(record_id: str, request: QuestionAnswersReques
         questioner_data["has_answers"] = True
         
         # Update the database
-        db.update_questioner_data(record_id, json.dumps(questioner_data))
+        await asyncio.to_thread(db.update_questioner_data, record_id, json.dumps(questioner_data))
         
         print(f"✅ Updated questioner data with answers for record ID: {record_id}")
         
@@ -603,7 +1133,7 @@ async def submit_question_answers(record_id: str, request: QuestionAnswersReques
         inspector_result = await run_inspectors(record_id)
         
         # Get the complete updated record data for response
-        complete_data = db.get_complete_analysis(record_id)
+        complete_data = await asyncio.to_thread(db.get_complete_analysis, record_id)
         if complete_data:
             # First try to get inspector results from the dedicated column
             if 'inspector_results' in complete_data and complete_data['inspector_results']:
@@ -666,7 +1196,7 @@ async def trigger_inspectors(record_id: str):
         inspector_result = await run_inspectors(record_id)
         
         # Get complete record data for response
-        complete_data = db.get_complete_analysis(record_id)
+        complete_data = await asyncio.to_thread(db.get_complete_analysis, record_id)
         if complete_data:
             # Parse JSON data
             questioner_data = json.loads(complete_data.get("questioner_data", "{}"))
@@ -728,7 +1258,7 @@ async def run_inspectors(record_id: str):
     print(f"\n*************************** RUNNING INSPECTORS FOR RECORD {record_id} ***************************")
     
     # Get the required data from the database
-    analysis = db.get_complete_analysis(record_id)
+    analysis = await asyncio.to_thread(db.get_complete_analysis, record_id)
     if not analysis:
         raise ValueError(f"No analysis found with ID: {record_id}")
     
@@ -747,6 +1277,17 @@ async def run_inspectors(record_id: str):
             "icd_inspector": None
         }
     
+    inspector_results = await inspect_analysis(processed_scenario, cdt_result, icd_result, questioner_data)
+    await save_inspector_results(record_id, cdt_result, icd_result, inspector_results)
+    
+    return {
+        "status": "success",
+        "inspector_results": inspector_results
+    }
+
+async def inspect_analysis(processed_scenario: str, cdt_result: Dict[str, Any], icd_result: Dict[str, Any],
+                           questioner_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Run both inspectors in parallel on stored-format CDT and ICD results."""
     # Format data for CDT inspector - proper dictionary format expected
     cdt_topic_analysis = {}
     if cdt_result and "topics_results" in cdt_result:
@@ -789,7 +1330,7 @@ async def run_inspectors(record_id: str):
     async def run_cdt_inspector():
         print("⏳ Running CDT Inspector...")
         try:
-            return cdt_inspector.process(processed_scenario, cdt_topic_analysis, questioner_data)
+            return await cdt_inspector.process_async(processed_scenario, cdt_topic_analysis, questioner_data)
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -805,7 +1346,7 @@ async def run_inspectors(record_id: str):
     async def run_icd_inspector():
         print("⏳ Running ICD Inspector...")
         try:
-            return icd_inspector.process(processed_scenario, icd_topic_analysis, questioner_data)
+            return await icd_inspector.process_async(processed_scenario, icd_topic_analysis, questioner_data)
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -831,39 +1372,36 @@ async def run_inspectors(record_id: str):
     print(f"✅ CDT INSPECTOR COMPLETE - Found {len(cdt_codes)} validated codes")
     print(f"✅ ICD INSPECTOR COMPLETE - Found {len(icd_codes)} validated codes")
     
-    # Save inspector results to the database
-    inspector_results = {
+    return {
         "cdt": cdt_inspector_result,
         "icd": icd_inspector_result,
         "timestamp": str(datetime.datetime.now())
     }
-    
-    # Save to the dedicated inspector_results column
+
+async def save_inspector_results(record_id: str, cdt_result: Dict[str, Any], icd_result: Dict[str, Any],
+                                 inspector_results: Dict[str, Any]):
+    """Save inspector results to the database."""
     try:
         # Save the inspector results to the dedicated column
-        db.update_inspector_results(record_id, json.dumps(inspector_results))
+        await asyncio.to_thread(db.update_inspector_results, record_id, json.dumps(inspector_results))
         print(f"✅ Saved inspector results to database for record ID: {record_id}")
         
         # For backward compatibility, also update the existing fields
         # This can be removed later when all code is migrated to use the dedicated column
-        cdt_data = json.loads(analysis.get("cdt_result", "{}"))
-        cdt_data["inspector_results"] = cdt_inspector_result
+        cdt_data = dict(cdt_result)
+        cdt_data["inspector_results"] = inspector_results["cdt"]
         
-        icd_data = json.loads(analysis.get("icd_result", "{}"))
-        icd_data["inspector_results"] = icd_inspector_result
+        icd_data = dict(icd_result)
+        icd_data["inspector_results"] = inspector_results["icd"]
         
-        db.update_analysis_results(
+        await asyncio.to_thread(
+            db.update_analysis_results,
             record_id, 
             json.dumps(cdt_data), 
             json.dumps(icd_data)
         )
     except Exception as e:
         print(f"❌ Error saving inspector results: {str(e)}")
-    
-    return {
-        "status": "success",
-        "inspector_results": inspector_results
-    }
 
 # Run the application
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+"""
+Helpers for analysing many scenarios in one request.
+
+Scenarios that are identical, or differ only in case, spacing or Unicode
+form, are analysed once and share the result. The dental_report rows of a
+batch are collected and inserted together instead of one round trip per
+analysis.
+"""
+
+import os
+import re
+import asyncio
+import logging
+import unicodedata
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple, Callable, Optional
+from dotenv import load_dotenv
+
+from rate_limiter import LLM_REQUEST_FANOUT
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "2000"))
+# Scenarios of one batch analysed at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# LLM calls one batch may have in flight, across all of its scenarios (the rate limiter's fan-out cap)
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", str(LLM_REQUEST_FANOUT)))
+# Rows per bulk insert, and the longest a row waits for others before it is inserted anyway
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "50"))
+BATCH_INSERT_INTERVAL = float(os.getenv("BATCH_INSERT_INTERVAL", "1"))
+
+def normalize_scenario(text: str) -> str:
+    """Scenario text with Unicode form, case and spacing made uniform, for duplicate detection"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"\s+([,.;:!?)])", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def dedupe(scenarios: List[str]) -> Tuple[List[str], List[int]]:
+    """The distinct scenarios (first occurrence of each), and for every input the index of its distinct scenario"""
+    unique: List[str] = []
+    positions: Dict[str, int] = {}
+    mapping: List[int] = []
+    for scenario in scenarios:
+        key = normalize_scenario(scenario)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(scenario)
+        mapping.append(positions[key])
+    return unique, mapping
+
+class BulkInserter:
+    """Collects rows from concurrent callers and inserts them in bulk; each caller gets back its own inserted row.
+
+    insert takes a list of rows and returns the inserted rows in the same order, or None on failure.
+    """
+
+    def __init__(self, insert: Callable[[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]],
+                 size: int = BATCH_INSERT_SIZE, interval: float = BATCH_INSERT_INTERVAL):
+        self.insert = insert
+        self.size = size
+        self.interval = interval
+        self.counters = {"rows": 0, "inserts": 0, "failed_rows": 0}
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+    async def add(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue row for the next bulk insert and wait for it; raises RuntimeError if it could not be inserted"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.interval, self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.create_task(self._flush(pending))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, pending: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        rows = [row for row, _ in pending]
+        inserted = await self._insert(rows)
+        if inserted is None and len(rows) > 1:
+            # One bad row fails the whole statement; insert them one by one so the rest still land
+            logger.warning(f"Bulk insert of {len(rows)} rows failed, inserting them individually")
+            inserted = [(await self._insert([row]) or [None])[0] for row in rows]
+        for index, (_, future) in enumerate(pending):
+            record = inserted[index] if inserted else None
+            if future.done():
+                continue
+            if record is None:
+                self.counters["failed_rows"] += 1
+                future.set_exception(RuntimeError("Failed to save data to database"))
+            else:
+                future.set_result(record)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        self.counters["inserts"] += 1
+        try:
+            inserted = await asyncio.to_thread(self.insert, rows)
+        except Exception as e:
+            logger.warning(f"Bulk insert failed: {e}")
+            return None
+        if not inserted or len(inserted) != len(rows):
+            return None
+        self.counters["rows"] += len(rows)
+        return inserted
+
+    async def close(self):
+        """Insert whatever is still queued and wait for every insert in progress"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+_inserter: contextvars.ContextVar = contextvars.ContextVar("bulk_inserter", default=None)
+
+@contextmanager
+def bulk_inserts(inserter: BulkInserter):
+    """Send the analysis rows saved inside this block through inserter"""
+    token = _inserter.set(inserter)
+    try:
+        yield inserter
+    finally:
+        _inserter.reset(token)
+
+def current_inserter() -> Optional[BulkInserter]:
+    return _inserter.get()
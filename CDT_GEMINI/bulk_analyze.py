@@ -0,0 +1,199 @@
+"""
+Bulk analysis of a JSONL file of scenarios through the full pipeline.
+
+Each input line is a JSON object with a "scenario" (and optionally "id" and
+"cleaner_bypass"), or a bare JSON string. Results are appended to the output
+JSONL as each line finishes, so the output file is also the checkpoint: run
+the same command again after a crash, Ctrl-C or rate-limit stop and only the
+lines without a successful result are analysed.
+
+    python bulk_analyze.py scenarios.jsonl results.jsonl --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+# Consecutive failed lines after which the run stops (e.g. the provider is rate limiting), to be resumed later
+BULK_MAX_CONSECUTIVE_FAILURES = int(os.getenv("BULK_MAX_CONSECUTIVE_FAILURES", "10"))
+
+# Exit status of a run stopped after too many consecutive failures
+EXIT_STOPPED = 2
+
+def scenario_hash(scenario: str) -> str:
+    return hashlib.sha1(scenario.encode("utf-8")).hexdigest()
+
+def read_scenarios(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (line number, item, error) for every non-blank input line, reading the file lazily"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(item, str):
+                item = {"scenario": item}
+            if not isinstance(item, dict) or not isinstance(item.get("scenario"), str):
+                yield number, None, "Line has no scenario"
+                continue
+            yield number, item, None
+
+def load_checkpoint(path: str) -> Set[Tuple[int, Optional[str]]]:
+    """(line, scenario hash) of every line already analysed successfully in an earlier run,
+    and (line, None) of every line already reported as invalid.
+
+    A line cut off by a crash is dropped from the file so new results start on a line of their own.
+    """
+    done: Set[Tuple[int, Optional[str]]] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        content = f.read()
+        end = content.rfind(b"\n") + 1
+        if end < len(content):
+            logger.warning(f"Dropping an incomplete last line from {path}")
+            f.truncate(end)
+    for line in content[:end].decode("utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record.get("status") == "success":
+            done.add((record["line"], record["scenario_hash"]))
+        elif record.get("status") == "invalid":
+            done.add((record["line"], None))
+    return done
+
+class BulkRun:
+    """Feeds input lines to a fixed number of pipeline workers and appends each result to the output"""
+
+    def __init__(self, input_path: str, output_path: str, workers: int = BULK_WORKERS,
+                 max_consecutive_failures: int = BULK_MAX_CONSECUTIVE_FAILURES):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.workers = workers
+        self.max_consecutive_failures = max_consecutive_failures
+        self.counters = {"skipped": 0, "succeeded": 0, "failed": 0, "invalid": 0}
+        self.consecutive_failures = 0
+        self.stopped = False
+
+    async def run(self) -> Dict[str, Any]:
+        # Imported here so the app (and its clients) only load for an actual run
+        from app import run_analysis_pipeline, ScenarioRequest, db
+        from batch_analysis import BulkInserter, bulk_inserts
+        from llm_services import get_call_stats
+        from rate_limiter import request_fanout
+        from hedging import hedge_budget
+
+        done = load_checkpoint(self.output_path)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        started = time.perf_counter()
+
+        with open(self.output_path, "a", encoding="utf-8") as output:
+            def write(record: Dict[str, Any]):
+                output.write(json.dumps(record, default=str) + "\n")
+                output.flush()
+
+            async def work():
+                while True:
+                    number, item = await queue.get()
+                    try:
+                        if self.stopped:
+                            continue
+                        try:
+                            with request_fanout(), hedge_budget():
+                                response = await run_analysis_pipeline(ScenarioRequest(**item))
+                        except Exception as e:
+                            response = {"status": "error", "message": str(e)}
+                        self._record(response["status"] == "success")
+                        write({
+                            "line": number,
+                            "id": item.get("id"),
+                            "scenario_hash": scenario_hash(item["scenario"]),
+                            "status": response["status"],
+                            "response": response
+                        })
+                    finally:
+                        queue.task_done()
+
+            inserter = BulkInserter(db.create_analysis_records)
+            with bulk_inserts(inserter):
+                tasks = [asyncio.create_task(work()) for _ in range(self.workers)]
+            try:
+                for number, item, error in read_scenarios(self.input_path):
+                    if self.stopped:
+                        break
+                    if error is not None:
+                        if (number, None) not in done:
+                            self.counters["invalid"] += 1
+                            write({"line": number, "status": "invalid", "error": error})
+                        continue
+                    if (number, scenario_hash(item["scenario"])) in done:
+                        self.counters["skipped"] += 1
+                        continue
+                    await queue.put((number, item))
+                await queue.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await inserter.close()
+
+        elapsed = time.perf_counter() - started
+        analysed = self.counters["succeeded"] + self.counters["failed"]
+        totals = get_call_stats()["totals"]
+        return {
+            **self.counters,
+            "stopped": self.stopped,
+            "elapsed": elapsed,
+            "lines_per_second": analysed / elapsed if elapsed else 0.0,
+            "llm_calls": totals["calls"],
+            "prompt_tokens": totals["prompt_tokens"],
+            "completion_tokens": totals["completion_tokens"],
+            "cached_tokens": totals["cached_tokens"],
+            "cost": totals["cost"]
+        }
+
+    def _record(self, succeeded: bool):
+        self.counters["succeeded" if succeeded else "failed"] += 1
+        self.consecutive_failures = 0 if succeeded else self.consecutive_failures + 1
+        if self.consecutive_failures >= self.max_consecutive_failures and not self.stopped:
+            logger.error(f"Stopping after {self.consecutive_failures} consecutive failures; rerun to resume")
+            self.stopped = True
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"\nAnalysed {summary['succeeded'] + summary['failed']} lines in {summary['elapsed']:.1f}s "
+          f"({summary['lines_per_second']:.2f} lines/s): {summary['succeeded']} succeeded, {summary['failed']} failed, "
+          f"{summary['invalid']} invalid, {summary['skipped']} already done")
+    print(f"LLM calls: {summary['llm_calls']}, prompt tokens: {summary['prompt_tokens']} "
+          f"({summary['cached_tokens']} cached), completion tokens: {summary['completion_tokens']}, "
+          f"cost: ${summary['cost']:.4f}")
+    if summary["stopped"]:
+        print("Stopped early after repeated failures; run the same command again to resume.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Analyze a JSONL file of scenarios, resuming where a previous run stopped")
+    parser.add_argument("input", help="JSONL file of scenarios")
+    parser.add_argument("output", help="JSONL file results are appended to (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+    parser.add_argument("--max-consecutive-failures", type=int, default=BULK_MAX_CONSECUTIVE_FAILURES)
+    args = parser.parse_args()
+    summary = asyncio.run(BulkRun(args.input, args.output, args.workers, args.max_consecutive_failures).run())
+    print_summary(summary)
+    sys.exit(EXIT_STOPPED if summary["stopped"] else 0)
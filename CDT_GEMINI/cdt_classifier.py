@@ -2,19 +2,24 @@ import os
 import logging
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import generate_response, get_service, set_model, set_temperature
+from llm_services import generate_response_async, get_service, ModelConfig, blocking
+from structured_output import use_structured_output
 from typing import Dict, Any, Optional, List
-from llm_services import OPENROUTER_MODEL, DEFAULT_TEMP
 import re
 
 load_dotenv()
 
+# Doubt recorded on code ranges added by keyword detection rather than chosen by the model
+KEYWORD_DETECTED_DOUBT = "Added automatically based on keyword detection."
+
 # You can set a specific model for this file only
 # Uncomment and modify the line below to use a specific model
 # set_model_for_file("gemini-1.5-pro")
 
 class CDTClassifier:
     """Class to handle CDT code classification for dental scenarios"""
+
+    STAGE = "cdt_classifier"
     
     # DEFAULT_TEMP = 0.0
     
@@ -180,9 +185,10 @@ CODE_RANGE: D0100-D0999 - Diagnostic Services
 Repeat this exact format for each relevant code range. Do not add additional text, comments, or summaries outside of this format.
         """
 
-    def __init__(self, model: str = OPENROUTER_MODEL, temperature: float = DEFAULT_TEMP):
-        """Initialize the classifier with model and temperature settings"""
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Initialize the classifier with optional model and temperature overrides"""
         self.service = get_service()
+        self.model_config = ModelConfig()
         self.configure(model, temperature)
         self.logger = self._setup_logging()
 
@@ -196,11 +202,8 @@ Repeat this exact format for each relevant code range. Do not add additional tex
         return logging.getLogger(__name__)
 
     def configure(self, model: Optional[str] = None, temperature: Optional[float] = None) -> None:
-        """Configure model and temperature settings"""
-        if model:
-            set_model(model)
-        if temperature is not None:
-            set_temperature(temperature)
+        """Configure model and temperature overrides for this instance's calls only"""
+        self.model_config = self.model_config.merged(ModelConfig(model=model, temperature=temperature))
 
     def format_prompt(self, scenario: str) -> str:
         """Format the prompt template with the given scenario"""
@@ -264,6 +267,18 @@ Repeat this exact format for each relevant code range. Do not add additional tex
             "range_codes_string": ",".join(range_codes)
         }
         
+    def _from_structured(self, classification) -> Dict[str, Any]:
+        """Convert a validated CDTClassification into the parse_response format"""
+        formatted_results = [
+            {"code_range": item.code_range, "explanation": item.explanation, "doubt": item.doubt}
+            for item in classification.code_ranges
+        ]
+        self.logger.info(f"Parsed {len(formatted_results)} code ranges")
+        return {
+            "formatted_results": formatted_results,
+            "range_codes_string": ",".join(item["code_range"] for item in formatted_results)
+        }
+
     def _ensure_all_code_ranges(self, formatted_results: list, scenario: str) -> None:
         """Ensure all relevant code ranges are included based on keywords in the scenario"""
         scenario_lower = scenario.lower()
@@ -278,7 +293,7 @@ Repeat this exact format for each relevant code range. Do not add additional tex
             formatted_results.append({
                 "code_range": "D1000-D1999",
                 "explanation": "The scenario mentions prophylaxis/cleaning services which are classified under preventive services.",
-                "doubt": "Added automatically based on keyword detection."
+                "doubt": KEYWORD_DETECTED_DOUBT
             })
         
         # Check for endodontic services (D3000-D3999)
@@ -288,7 +303,7 @@ Repeat this exact format for each relevant code range. Do not add additional tex
             formatted_results.append({
                 "code_range": "D3000-D3999",
                 "explanation": "The scenario mentions root canal therapy or related procedures which fall under endodontic services.",
-                "doubt": "Added automatically based on keyword detection."
+                "doubt": KEYWORD_DETECTED_DOUBT
             })
         
         # Check for diagnostic services (D0100-D0999)
@@ -298,7 +313,7 @@ Repeat this exact format for each relevant code range. Do not add additional tex
             formatted_results.append({
                 "code_range": "D0100-D0999",
                 "explanation": "The scenario mentions radiographic imaging or examination procedures.",
-                "doubt": "Added automatically based on keyword detection."
+                "doubt": KEYWORD_DETECTED_DOUBT
             })
             
         # Check for oral surgery (D7000-D7999)
@@ -311,39 +326,54 @@ Repeat this exact format for each relevant code range. Do not add additional tex
             formatted_results.append({
                 "code_range": "D7000-D7999",
                 "explanation": "The scenario mentions surgical procedures, extraction, or drainage of infection.",
-                "doubt": "Added automatically based on keyword detection."
+                "doubt": KEYWORD_DETECTED_DOUBT
             })
 
-    def process(self, scenario: str) -> Dict[str, Any]:
+    async def _classify_async(self, formatted_prompt: str) -> Dict[str, Any]:
+        """Run the classification prompt and parse the answer"""
+        if use_structured_output(self.STAGE):
+            return self._from_structured(
+                await self.service.generate_structured_async(formatted_prompt, self.STAGE, self.model_config)
+            )
+        response = await generate_response_async(formatted_prompt, stage=self.STAGE, config=self.model_config)
+        return self.parse_response(response)
+
+    def _finalize(self, result: Dict[str, Any], scenario: str) -> Dict[str, Any]:
+        """Add keyword-detected code ranges and rebuild range_codes_string"""
+        # Check for missing important code ranges based on scenario keywords
+        self._ensure_all_code_ranges(result["formatted_results"], scenario)
+        
+        # Update the range_codes_string after potentially adding new codes
+        result["range_codes_string"] = ",".join([item["code_range"] for item in result["formatted_results"]])
+        
+        self.logger.info("Successfully processed dental scenario")
+        return result
+
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        self.logger.error(f"Error processing scenario: {str(e)}")
+        return {
+            "formatted_results": [],
+            "range_codes_string": "",
+            "error": str(e)
+        }
+
+    async def process_async(self, scenario: str) -> Dict[str, Any]:
         """Process a dental scenario and return CDT classifications"""
         try:
             self.logger.info("Processing dental scenario")
-            formatted_prompt = self.format_prompt(scenario)
-            response = generate_response(formatted_prompt)
-            result = self.parse_response(response)
-            
-            # Check for missing important code ranges based on scenario keywords
-            self._ensure_all_code_ranges(result["formatted_results"], scenario)
-            
-            # Update the range_codes_string after potentially adding new codes
-            result["range_codes_string"] = ",".join([item["code_range"] for item in result["formatted_results"]])
-            
-            self.logger.info("Successfully processed dental scenario")
-            return result
+            return self._finalize(await self._classify_async(self.format_prompt(scenario)), scenario)
         except Exception as e:
-            self.logger.error(f"Error processing scenario: {str(e)}")
-            return {
-                "formatted_results": [],
-                "range_codes_string": "",
-                "error": str(e)
-            }
+            return self._error_result(e)
+
+    process = blocking(process_async)
 
     @property
     def current_settings(self) -> Dict[str, Any]:
         """Get current model settings"""
+        config = self.service.resolve_config(self.STAGE, self.model_config)
         return {
-            "model": self.service.model,
-            "temperature": self.service.temperature
+            "model": config.model,
+            "temperature": config.temperature
         }
 
 class CDTClassifierCLI:
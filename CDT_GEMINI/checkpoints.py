@@ -0,0 +1,153 @@
+"""
+Stage checkpoints for resuming interrupted analyses.
+
+Every analysis run gets a checkpoint id, and each stage output it completes
+(cleaned scenario, classifications, topic results, questions, inspector
+verdicts, the record id once saved) is written under that id as soon as the
+stage finishes. Running the pipeline again with the same id restores those
+outputs, so a retry after a failed questioner call or a crashed process only
+pays for the stages that are missing. Once the analysis is saved the run can
+also be looked up by its dental_report record id.
+
+Checkpoints live in a SQLite (WAL) file next to the app and are dropped
+CHECKPOINT_TTL seconds after the run last changed.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint completed stages so failed or interrupted analyses can be resumed
+PIPELINE_CHECKPOINTS = os.getenv("PIPELINE_CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_PATH = os.getenv(
+    "CHECKPOINT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints.sqlite3")
+)
+# Seconds a run's checkpoints are kept after its last completed stage
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", "604800"))
+
+def _json_default(value: Any) -> Any:
+    # Topic results carry their category ranges as a set
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Cannot checkpoint a {type(value).__name__}")
+
+def encode_output(output: Any) -> str:
+    """A stage output as stored in a checkpoint"""
+    return json.dumps(output, default=_json_default)
+
+class CheckpointStore:
+    """SQLite table of runs (their request and record id) and the stage outputs each has completed"""
+
+    def __init__(self, path: str = CHECKPOINT_PATH, ttl: float = CHECKPOINT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counters = {"runs": 0, "resumed_runs": 0, "restored_stages": 0, "saved_stages": 0}
+        self._initialize_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _initialize_db(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id TEXT PRIMARY KEY, record_id TEXT, request TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "run_id TEXT NOT NULL, stage TEXT NOT NULL, output TEXT NOT NULL, saved_at REAL NOT NULL, "
+            "PRIMARY KEY (run_id, stage))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_record ON runs(record_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_updated ON runs(updated_at)")
+        logger.info(f"Checkpoints at {self.path}")
+
+    def open(self, run_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Register the run if it is new and return the stage outputs it already completed"""
+        conn = self._connection()
+        now = time.time()
+        self._prune(now)
+        conn.execute(
+            "INSERT OR IGNORE INTO runs (id, request, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (run_id, json.dumps(request), now, now)
+        )
+        restored = {
+            row["stage"]: json.loads(row["output"])
+            for row in conn.execute("SELECT stage, output FROM checkpoints WHERE run_id = ?", (run_id,))
+        }
+        with self._lock:
+            self.counters["runs"] += 1
+            if restored:
+                self.counters["resumed_runs"] += 1
+                self.counters["restored_stages"] += len(restored)
+        return restored
+
+    def save(self, run_id: str, stage: str, output: Any):
+        """Checkpoint one completed stage's output"""
+        self.save_encoded(run_id, stage, encode_output(output))
+
+    def save_encoded(self, run_id: str, stage: str, encoded: str):
+        """Checkpoint a stage output already passed through encode_output"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (run_id, stage, output, saved_at) VALUES (?, ?, ?, ?)",
+            (run_id, stage, encoded, now)
+        )
+        conn.execute("UPDATE runs SET updated_at = ? WHERE id = ?", (now, run_id))
+        with self._lock:
+            self.counters["saved_stages"] += 1
+
+    def link_record(self, run_id: str, record_id: str):
+        """Make the run findable by the id of the dental_report record it saved"""
+        self._connection().execute("UPDATE runs SET record_id = ? WHERE id = ?", (str(record_id), run_id))
+
+    def find(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
+        """The run with this checkpoint id or record id: its id, record id, request and completed stages"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT * FROM runs WHERE id = ? OR record_id = ? ORDER BY updated_at DESC LIMIT 1",
+            (checkpoint_id, checkpoint_id)
+        ).fetchone()
+        if row is None:
+            return None
+        stages = [r["stage"] for r in conn.execute("SELECT stage FROM checkpoints WHERE run_id = ?", (row["id"],))]
+        return {
+            "id": row["id"],
+            "record_id": row["record_id"],
+            "request": json.loads(row["request"]),
+            "stages": stages,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    def _prune(self, now: float):
+        conn = self._connection()
+        cutoff = now - self.ttl
+        conn.execute("DELETE FROM checkpoints WHERE run_id IN (SELECT id FROM runs WHERE updated_at < ?)", (cutoff,))
+        conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
@@ -0,0 +1,151 @@
+"""
+Circuit breakers per (provider, model) for LLM calls, plus the fallback model
+chains used while a model's circuit is open.
+
+A breaker opens after LLM_BREAKER_FAILURES consecutive retryable failures,
+rejects calls for LLM_BREAKER_RESET seconds, then lets a limited number of
+half-open probes through; a successful probe closes it again.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+LLM_BREAKER_HALF_OPEN_CALLS = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "1"))
+# Fallback chains by model, e.g. {"openai/gpt-4o": ["anthropic/claude-3.5-sonnet"], "default": ["openai/gpt-4o-mini"]}
+LLM_FALLBACK_MODELS = json.loads(os.getenv("LLM_FALLBACK_MODELS", "{}"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its model's circuit is open"""
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one provider and model"""
+
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURES,
+                 reset_timeout: float = LLM_BREAKER_RESET, half_open_calls: int = LLM_BREAKER_HALF_OPEN_CALLS,
+                 on_transition=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.on_transition = on_transition
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self.counters = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.counters["opened"] += 1
+        if state != HALF_OPEN:
+            self._probes = 0
+        logger.warning(f"Circuit {self.name}: {previous} -> {state}")
+        if self.on_transition:
+            self.on_transition(self.name, previous, state)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open state this claims a probe slot"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                # A probe that never reported back (e.g. cancelled) stops blocking after a reset period
+                if self._probes < self.half_open_calls or now - self._probe_started >= self.reset_timeout:
+                    self._probes = min(self._probes + 1, self.half_open_calls)
+                    self._probe_started = now
+                    return True
+            self.counters["rejected"] += 1
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.counters["successes"] += 1
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.counters["failures"] += 1
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self.failures
+            if self.state == OPEN:
+                stats["retry_in"] = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return stats
+
+class BreakerRegistry:
+    """Breakers keyed by (provider, model), with a log of recent state transitions"""
+
+    def __init__(self, enabled: bool = LLM_BREAKER_ENABLED, fallbacks: Dict[str, List[str]] = None):
+        self.enabled = enabled
+        self.fallbacks = fallbacks if fallbacks is not None else LLM_FALLBACK_MODELS
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.transitions = deque(maxlen=100)
+        self.counters = {"fallbacks": 0, "short_circuited": 0}
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get((provider, model))
+            if breaker is None:
+                breaker = CircuitBreaker(f"{provider}/{model}", on_transition=self._record_transition)
+                self._breakers[(provider, model)] = breaker
+            return breaker
+
+    def _record_transition(self, name: str, previous: str, state: str):
+        self.transitions.append({"breaker": name, "from": previous, "to": state, "at": time.time()})
+
+    def fallback_chain(self, model: str) -> List[str]:
+        """model followed by its configured fallbacks, without duplicates"""
+        chain = [model] + self.fallbacks.get(model, self.fallbacks.get("default", []))
+        return list(dict.fromkeys(chain))
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = dict(self._breakers)
+            stats = dict(self.counters)
+        stats["enabled"] = self.enabled
+        stats["breakers"] = {breaker.name: breaker.stats() for breaker in breakers.values()}
+        stats["open"] = sorted(name for name, b in stats["breakers"].items() if b["state"] != CLOSED)
+        stats["transitions"] = list(self.transitions)
+        return stats
@@ -1,12 +1,23 @@
 import os
+import logging
 from dotenv import load_dotenv
-from llm_services import generate_response, get_service, set_model, set_temperature
+from llm_services import generate_response_async, get_service, ModelConfig, blocking
+from structured_notes import parse_note
 from typing import Dict, Any, Optional
-from llm_services import OPENROUTER_MODEL, DEFAULT_TEMP
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Normalize already-structured (SOAP-style) notes locally instead of calling the LLM
+CLEANER_BYPASS = os.getenv("CLEANER_BYPASS", "true").lower() in ("1", "true", "yes")
+# Minimum share of the note under recognised headings (scaled down below CLEANER_BYPASS_MIN_SECTIONS sections)
+CLEANER_BYPASS_MIN_CONFIDENCE = float(os.getenv("CLEANER_BYPASS_MIN_CONFIDENCE", "0.9"))
+CLEANER_BYPASS_MIN_SECTIONS = int(os.getenv("CLEANER_BYPASS_MIN_SECTIONS", "3"))
+
 class DentalScenarioProcessor:
     """Class to handle dental scenario processing with configurable prompts and settings"""
+
+    STAGE = "cleaner"
     
     PROMPT_TEMPLATE = """
 You are a specialized dental data processor designed to transform raw dental scenarios into clearly structured, comprehensive datasets for medical coding purposes. Your task is to process the provided input scenario dynamically and accurately, adhering to the following strict guidelines:
@@ -56,34 +67,54 @@ Follow-up appointments, further diagnostics, referrals.
 e.g., "Schedule for full root canal and crown in 1 week."
 """
 
-    def __init__(self, model: str = OPENROUTER_MODEL, temperature: float = DEFAULT_TEMP):
-        """Initialize the processor with model and temperature settings"""
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Initialize the processor with optional model and temperature overrides"""
         self.service = get_service()
+        self.model_config = ModelConfig()
         self.configure(model, temperature)
 
     def configure(self, model: Optional[str] = None, temperature: Optional[float] = None) -> None:
-        """Configure model and temperature settings"""
-        if model:
-            set_model(model)
-        if temperature is not None:
-            set_temperature(temperature)
+        """Configure model and temperature overrides for this instance's calls only"""
+        self.model_config = self.model_config.merged(ModelConfig(model=model, temperature=temperature))
 
     def format_prompt(self, scenario: str) -> str:
         """Format the prompt template with the given scenario"""
         return self.PROMPT_TEMPLATE.format(scenario=scenario)
 
-    def process(self, scenario: str) -> Dict[str, str]:
+    def normalize_locally(self, scenario: str, bypass: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """The structured output built without the LLM, or None when the note should go to the LLM.
+
+        bypass=None decides by confidence, True forces local normalization of any
+        note with recognisable sections, False always uses the LLM.
+        """
+        if bypass is False or (bypass is None and not CLEANER_BYPASS):
+            return None
+        note = parse_note(scenario)
+        confidence = note.confidence(CLEANER_BYPASS_MIN_SECTIONS)
+        if not note.sections or (not bypass and confidence < CLEANER_BYPASS_MIN_CONFIDENCE):
+            logger.info(f"Cleaner bypass declined (confidence {confidence:.2f})")
+            return None
+        logger.info(f"Cleaner bypassed for structured note (confidence {confidence:.2f})")
+        return {"standardized_scenario": note.normalized(), "bypassed": True, "confidence": confidence}
+
+    async def process_async(self, scenario: str, bypass: Optional[bool] = None) -> Dict[str, Any]:
         """Process a dental scenario and return structured output"""
+        local = self.normalize_locally(scenario, bypass)
+        if local:
+            return local
         formatted_prompt = self.format_prompt(scenario)
-        result = generate_response(formatted_prompt)
-        return {"standardized_scenario": result}
+        result = await generate_response_async(formatted_prompt, stage=self.STAGE, config=self.model_config)
+        return {"standardized_scenario": result, "bypassed": False}
+
+    process = blocking(process_async)
 
     @property
     def current_settings(self) -> Dict[str, Any]:
         """Get current model settings"""
+        config = self.service.resolve_config(self.STAGE, self.model_config)
         return {
-            "model": self.service.model,
-            "temperature": self.service.temperature
+            "model": config.model,
+            "temperature": config.temperature
         }
 
 class ScenarioProcessorCLI:
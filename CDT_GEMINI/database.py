@@ -22,18 +22,23 @@ class MedicalCodingDB:
         if not self.supabase:
             self.connect()
 
+    @staticmethod
+    def _analysis_row(data: dict) -> dict:
+        """A dental_report row for an analysis, with defaults for the columns data leaves out."""
+        return {
+            "user_question": data.get("user_question", ""),
+            "processed_clean_data": data.get("processed_clean_data", ""),
+            "cdt_result": data.get("cdt_result", "{}"),
+            "icd_result": data.get("icd_result", "{}"),
+            "questioner_data": data.get("questioner_data", "{}"),
+            "inspector_results": data.get("inspector_results", "{}")
+        }
+
     def create_analysis_record(self, data: dict):
         """Insert a new record into the dental_report table."""
         self.ensure_connection()
         try:
-            record_data = {
-                "user_question": data.get("user_question", ""),
-                "processed_clean_data": data.get("processed_clean_data", ""),
-                "cdt_result": data.get("cdt_result", "{}"),
-                "icd_result": data.get("icd_result", "{}"),
-                "questioner_data": data.get("questioner_data", "{}"),
-                "inspector_results": data.get("inspector_results", "{}")        
-            }
+            record_data = self._analysis_row(data)
             
             result = self.supabase.table("dental_report").insert(record_data).execute()
             print(f"✅ Analysis record added successfully with ID: {result.data[0]['id']}")
@@ -42,6 +47,19 @@ class MedicalCodingDB:
             print(f"❌ Error creating analysis record: {str(e)}")
             return None
 
+    def create_analysis_records(self, records: list):
+        """Insert several records into the dental_report table in one statement; returns them in input order."""
+        self.ensure_connection()
+        try:
+            result = self.supabase.table("dental_report").insert(
+                [self._analysis_row(data) for data in records]
+            ).execute()
+            print(f"✅ {len(result.data)} analysis records added successfully")
+            return result.data
+        except Exception as e:
+            print(f"❌ Error creating {len(records)} analysis records: {str(e)}")
+            return None
+
     def update_processed_scenario(self, record_id, processed_scenario):
         """Update the processed scenario for a given record."""
         self.ensure_connection()
@@ -0,0 +1,87 @@
+"""
+Per-request latency budget.
+
+A request opens a deadline scope when it starts. Every LLM call made inside
+it caps its timeout at the time left and gives up instead of retrying past it,
+pipeline stages cap their timeouts the same way, and low-priority stages are
+skipped outright when too little budget remains. Whatever was skipped or cut
+short is recorded on the deadline so the response can say which stages were
+degraded.
+"""
+
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Seconds an interactive request may take, kept under the gateway's 60s limit (0 for no deadline)
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "55"))
+# Budget in seconds a low-priority stage (questioner, inspectors) needs left to start
+DEADLINE_LOW_PRIORITY_MIN = float(os.getenv("DEADLINE_LOW_PRIORITY_MIN", "15"))
+# Seconds kept back from topic activation, so slow topics are cut short rather than failing the request
+DEADLINE_TOPIC_RESERVE = float(os.getenv("DEADLINE_TOPIC_RESERVE", "3"))
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's latency budget runs out before some work could finish"""
+
+class Deadline:
+    """Expiry time of one request, and the stages degraded to meet it"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self._lock = threading.Lock()
+        self.degraded: List[Dict[str, str]] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def degrade(self, stage: str, reason: str):
+        with self._lock:
+            self.degraded.append({"stage": stage, "reason": reason})
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+@contextmanager
+def request_deadline(seconds: Optional[float] = None):
+    """Give the work done inside this block a deadline of seconds (REQUEST_DEADLINE if None, none if <= 0)"""
+    if seconds is None:
+        seconds = REQUEST_DEADLINE
+    deadline = Deadline(seconds) if seconds > 0 else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+def time_left() -> Optional[float]:
+    """Seconds left in the current request's budget, or None outside a deadline scope"""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+def capped_timeout(timeout: Optional[float]) -> Optional[float]:
+    """timeout, shortened to the time left in the current request; raises DeadlineExceeded once none is left"""
+    left = time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+def degrade(stage: str, reason: str):
+    """Record that stage was skipped or cut short to meet the current request's deadline"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.degrade(stage, reason)
+
+def degraded_stages() -> List[Dict[str, str]]:
+    deadline = _current.get()
+    return list(deadline.degraded) if deadline is not None else []
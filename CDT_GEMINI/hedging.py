@@ -0,0 +1,163 @@
+"""
+Hedged requests for the async LLM path: when a call runs past a percentile of
+its template's latency history, a duplicate is fired and the first answer wins.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Awaitable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Hedging configuration (opt-in)
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Hedges allowed per primary call within one request, so spend can't double
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+
+class LatencyTracker:
+    """Sliding window of call latencies per prompt template"""
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, template_id: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(template_id)
+            if samples is None:
+                samples = self._samples[template_id] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, template_id: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Latency at the given percentile, or None without enough history"""
+        with self._lock:
+            samples = sorted(self._samples.get(template_id, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Sample count, p50 and p95 for every tracked template"""
+        with self._lock:
+            templates = list(self._samples)
+        return {
+            template_id: {
+                "samples": len(self._samples[template_id]),
+                "p50": self.percentile(template_id, 50),
+                "p95": self.percentile(template_id, 95)
+            }
+            for template_id in templates
+        }
+
+class HedgeBudget:
+    """Caps hedges at a fraction of the primary calls made in one scope"""
+
+    def __init__(self, ratio: float = LLM_HEDGE_BUDGET):
+        self.ratio = ratio
+        self.primaries = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_primary(self):
+        with self._lock:
+            self.primaries += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.ratio * self.primaries:
+                return False
+            self.hedges += 1
+            return True
+
+_process_budget = HedgeBudget()
+_request_budget: contextvars.ContextVar = contextvars.ContextVar("llm_hedge_budget", default=None)
+
+@contextmanager
+def hedge_budget(ratio: float = LLM_HEDGE_BUDGET):
+    """Give the calls made inside this block their own hedge budget"""
+    token = _request_budget.set(HedgeBudget(ratio))
+    try:
+        yield
+    finally:
+        _request_budget.reset(token)
+
+class Hedger:
+    """Runs an async call, hedging it once if it outlives its template's latency percentile"""
+
+    def __init__(self, tracker: LatencyTracker = None, percentile: float = LLM_HEDGE_PERCENTILE,
+                 min_samples: int = LLM_HEDGE_MIN_SAMPLES, enabled: bool = LLM_HEDGING):
+        self.tracker = tracker or LatencyTracker()
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "budget_denied": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    async def _timed(self, template_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await fn()
+        self.tracker.record(template_id, time.monotonic() - start)
+        return result
+
+    async def run(self, template_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), firing one duplicate if it is slower than the hedge threshold"""
+        self._count("calls")
+        budget = _request_budget.get() or _process_budget
+        budget.record_primary()
+        threshold = self.tracker.percentile(template_id, self.percentile, self.min_samples) if self.enabled else None
+        if threshold is None:
+            return await self._timed(template_id, fn)
+
+        primary = asyncio.ensure_future(self._timed(template_id, fn))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done:
+                return primary.result()
+            if not budget.try_spend():
+                self._count("budget_denied")
+                return await primary
+
+            self._count("hedges")
+            logger.info(f"Hedging {template_id} after {threshold:.2f}s")
+            hedge = asyncio.ensure_future(self._timed(template_id, fn))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+            # Both attempts failed; surface the primary's error
+            return primary.result()
+        finally:
+            # Cancel the losing attempt (or both, if the caller was cancelled)
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["enabled"] = self.enabled
+        stats["latency"] = self.tracker.summary()
+        return stats
@@ -1,44 +1,46 @@
 import os
 import logging
 from dotenv import load_dotenv
-from llm_services import generate_response, get_service, set_model, set_temperature
-from typing import Dict, Any, Optional, List
-from llm_services import OPENROUTER_MODEL, DEFAULT_TEMP
+from llm_services import generate_response_async, get_service, ModelConfig, blocking
+from structured_output import ICDCodeSelection, use_structured_output
+from typing import Dict, Any, Optional, List, Union
 # Import all ICD topic functions 
-from icdtopics.dentalencounters import activate_dental_encounters
-from icdtopics.dentalcaries import activate_dental_caries
-from icdtopics.disordersofteeth import activate_disorders_of_teeth
-from icdtopics.disordersofpulpandperiapicaltissues import activate_pulp_periapical_disorders
-from icdtopics.diseasesandconditionsoftheperiodontium import activate_periodontium_disorders
-from icdtopics.alveolarridgedisorders import activate_alveolar_ridge_disorders
-from icdtopics.findingsofbostteeth import activate_lost_teeth
-from icdtopics.developmentdisordersofteethandjaws import activate_developmental_disorders
-from icdtopics.treatmentcomplications import activate_treatment_complications
-from icdtopics.inflammatoryconditionsofthmucosa import activate_inflammatory_mucosa_conditions
-from icdtopics.tmjdiseasesandconditions import activate_tmj_disorders
-from icdtopics.breathingspeechandsleepdisorders import activate_breathing_speech_sleep_disorders
-from icdtopics.traumaandrelatedconditions import activate_trauma_conditions
-from icdtopics.oralneoplasms import activate_oral_neoplasms
-from icdtopics.pathologies import activate_pathologies
-from icdtopics.medicalfindingsrelatedtodentaltreatment import activate_medical_findings
-from icdtopics.socialdeterminants import activate_social_determinants
-from icdtopics.symptomsanddisorderspertienttoorthodontiacases import activate_orthodontia_cases
+from icdtopics.dentalencounters import activate_dental_encounters_async
+from icdtopics.dentalcaries import activate_dental_caries_async
+from icdtopics.disordersofteeth import activate_disorders_of_teeth_async
+from icdtopics.disordersofpulpandperiapicaltissues import activate_pulp_periapical_disorders_async
+from icdtopics.diseasesandconditionsoftheperiodontium import activate_periodontium_disorders_async
+from icdtopics.alveolarridgedisorders import activate_alveolar_ridge_disorders_async
+from icdtopics.findingsofbostteeth import activate_lost_teeth_async
+from icdtopics.developmentdisordersofteethandjaws import activate_developmental_disorders_async
+from icdtopics.treatmentcomplications import activate_treatment_complications_async
+from icdtopics.inflammatoryconditionsofthmucosa import activate_inflammatory_mucosa_conditions_async
+from icdtopics.tmjdiseasesandconditions import activate_tmj_disorders_async
+from icdtopics.breathingspeechandsleepdisorders import activate_breathing_speech_sleep_disorders_async
+from icdtopics.traumaandrelatedconditions import activate_trauma_conditions_async
+from icdtopics.oralneoplasms import activate_oral_neoplasms_async
+from icdtopics.pathologies import activate_pathologies_async
+from icdtopics.medicalfindingsrelatedtodentaltreatment import activate_medical_findings_async
+from icdtopics.socialdeterminants import activate_social_determinants_async
+from icdtopics.symptomsanddisorderspertienttoorthodontiacases import activate_orthodontia_cases_async
 
 load_dotenv()
 
 class ICDClassifier:
     """Class to handle ICD code classification for dental scenarios"""
+
+    STAGE = "icd_classifier"
     
     # Keep your existing category mappings as class attributes
     ICD_CATEGORY_FUNCTIONS = {
-        "1": activate_dental_encounters, "2": activate_dental_caries, "3": activate_disorders_of_teeth,
-        "4": activate_pulp_periapical_disorders, "5": activate_periodontium_disorders, 
-        "6": activate_alveolar_ridge_disorders, "7": activate_lost_teeth, 
-        "8": activate_developmental_disorders, "9": activate_treatment_complications,
-        "10": activate_inflammatory_mucosa_conditions, "11": activate_tmj_disorders,
-        "12": activate_breathing_speech_sleep_disorders, "13": activate_trauma_conditions,
-        "14": activate_oral_neoplasms, "15": activate_pathologies, "16": activate_medical_findings,
-        "17": activate_social_determinants, "18": activate_orthodontia_cases
+        "1": activate_dental_encounters_async, "2": activate_dental_caries_async, "3": activate_disorders_of_teeth_async,
+        "4": activate_pulp_periapical_disorders_async, "5": activate_periodontium_disorders_async,
+        "6": activate_alveolar_ridge_disorders_async, "7": activate_lost_teeth_async,
+        "8": activate_developmental_disorders_async, "9": activate_treatment_complications_async,
+        "10": activate_inflammatory_mucosa_conditions_async, "11": activate_tmj_disorders_async,
+        "12": activate_breathing_speech_sleep_disorders_async, "13": activate_trauma_conditions_async,
+        "14": activate_oral_neoplasms_async, "15": activate_pathologies_async, "16": activate_medical_findings_async,
+        "17": activate_social_determinants_async, "18": activate_orthodontia_cases_async
     }
 
     ICD_CATEGORY_NAMES = {
@@ -91,9 +93,10 @@ CATEGORY: [Category Number and Name, e.g., "2. Dental Caries"]
 
 """
 
-    def __init__(self, model: str = OPENROUTER_MODEL, temperature: float = DEFAULT_TEMP):
-        """Initialize the classifier with model and temperature settings"""
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Initialize the classifier with optional model and temperature overrides"""
         self.service = get_service()
+        self.model_config = ModelConfig()
         self.configure(model, temperature)
         self.logger = self._setup_logging()
 
@@ -106,11 +109,8 @@ CATEGORY: [Category Number and Name, e.g., "2. Dental Caries"]
         return logging.getLogger(__name__)
 
     def configure(self, model: Optional[str] = None, temperature: Optional[float] = None) -> None:
-        """Configure model and temperature settings"""
-        if model:
-            set_model(model)
-        if temperature is not None:
-            set_temperature(temperature)
+        """Configure model and temperature overrides for this instance's calls only"""
+        self.model_config = self.model_config.merged(ModelConfig(model=model, temperature=temperature))
 
     def format_prompt(self, scenario: str) -> str:
         """Format the prompt template with the given scenario"""
@@ -168,7 +168,21 @@ CATEGORY: [Category Number and Name, e.g., "2. Dental Caries"]
             "all_icd_codes": all_icd_codes
         }
 
-    def _activate_topic(self, category_num: str, scenario: str) -> Dict[str, Any]:
+    def _from_structured(self, classification) -> Dict[str, Any]:
+        """Convert a validated ICDClassification into the _parse_category_response format"""
+        categories = [item for item in classification.categories if str(item.category_number) in self.ICD_CATEGORY_NAMES]
+        for item in categories:
+            self.logger.info(f"Found ICD Category: {item.category_number} - {self.ICD_CATEGORY_NAMES[str(item.category_number)]}")
+        return {
+            "categories": [f"{item.category_number}. {item.category_name}" for item in categories],
+            "code_lists": [[] for _ in categories],
+            "explanations": [item.explanation for item in categories],
+            "doubts": [item.doubt for item in categories],
+            "category_numbers": [str(item.category_number) for item in categories],
+            "all_icd_codes": []
+        }
+
+    async def _activate_topic_async(self, category_num: str, scenario: str) -> Dict[str, Any]:
         """Activate and process a specific ICD topic"""
         try:
             activation_function = self.ICD_CATEGORY_FUNCTIONS[category_num]
@@ -176,9 +190,12 @@ CATEGORY: [Category Number and Name, e.g., "2. Dental Caries"]
             
             self.logger.info(f"Activating: {category_name} (Category {category_num})")
             
-            activation_result = activation_function(scenario)
+            activation_result = await activation_function(scenario)
             parsed_result = self._parse_activation_result(activation_result)
             
+            if isinstance(activation_result, ICDCodeSelection):
+                # Keep the stored result JSON-serializable
+                activation_result = activation_result.model_dump_json()
             return {
                 "name": category_name,
                 "result": activation_result,
@@ -192,11 +209,17 @@ CATEGORY: [Category Number and Name, e.g., "2. Dental Caries"]
                 "parsed_result": {"error": str(e)}
             }
 
-    def _parse_activation_result(self, result: str) -> Dict[str, Any]:
+    def _parse_activation_result(self, result: Union[str, ICDCodeSelection]) -> Dict[str, Any]:
         """Parse the activation result into structured format"""
         parsed_result = {}
         
-        if isinstance(result, str):
+        if isinstance(result, ICDCodeSelection):
+            parsed_result = {
+                "code": ", ".join(result.codes) or "none",
+                "explanation": result.explanation,
+                "doubt": result.doubt
+            }
+        elif isinstance(result, str):
             for line in result.split('\n'):
                 line = line.strip()
                 if not line:
@@ -211,57 +234,79 @@ CATEGORY: [Category Number and Name, e.g., "2. Dental Caries"]
         
         return parsed_result
 
-    def process(self, scenario: str) -> Dict[str, Any]:
+    async def _classify_async(self, formatted_prompt: str) -> Dict[str, Any]:
+        """Run the category prompt and parse the answer"""
+        if use_structured_output(self.STAGE):
+            return self._from_structured(
+                await self.service.generate_structured_async(formatted_prompt, self.STAGE, self.model_config)
+            )
+        response = await generate_response_async(formatted_prompt, stage=self.STAGE, config=self.model_config)
+        return self._parse_category_response(response)
+
+    def _primary_category(self, parsed_response: Dict[str, Any]) -> Optional[str]:
+        """The first category found, if it has a topic to activate"""
+        if parsed_response["category_numbers"]:
+            primary_category_num = parsed_response["category_numbers"][0]
+            if primary_category_num in self.ICD_CATEGORY_FUNCTIONS:
+                return primary_category_num
+        return None
+
+    def _build_result(self, parsed_response: Dict[str, Any], icd_topics_results: Dict[str, Any]) -> Dict[str, Any]:
+        result = {
+            "categories": parsed_response["categories"],
+            "code_lists": parsed_response["code_lists"],
+            "explanations": parsed_response["explanations"],
+            "doubts": parsed_response["doubts"],
+            "category_numbers_string": ",".join(parsed_response["category_numbers"]),
+            "icd_topics_results": icd_topics_results,
+            "icd_codes": parsed_response["all_icd_codes"]
+        }
+        
+        self.logger.info("ICD Classification Completed")
+        return result
+
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        self.logger.error(f"Error in process: {str(e)}")
+        return {
+            "error": str(e),
+            "categories": [],
+            "code_lists": [],
+            "explanations": [],
+            "doubts": [],
+            "category_numbers_string": "",
+            "icd_topics_results": {},
+            "icd_codes": []
+        }
+
+    async def process_async(self, scenario: str) -> Dict[str, Any]:
         """Process a dental scenario and return ICD classifications"""
         try:
             self.logger.info("Starting ICD Classification")
             
             # Get initial classification
-            formatted_prompt = self.format_prompt(scenario)
-            response = generate_response(formatted_prompt)
-            parsed_response = self._parse_category_response(response)
+            parsed_response = await self._classify_async(self.format_prompt(scenario))
             
             # Process the primary category
             icd_topics_results = {}
-            if parsed_response["category_numbers"]:
-                primary_category_num = parsed_response["category_numbers"][0]
-                if primary_category_num in self.ICD_CATEGORY_FUNCTIONS:
-                    icd_topics_results[primary_category_num] = self._activate_topic(
-                        primary_category_num, scenario
-                    )
-            
-            result = {
-                "categories": parsed_response["categories"],
-                "code_lists": parsed_response["code_lists"],
-                "explanations": parsed_response["explanations"],
-                "doubts": parsed_response["doubts"],
-                "category_numbers_string": ",".join(parsed_response["category_numbers"]),
-                "icd_topics_results": icd_topics_results,
-                "icd_codes": parsed_response["all_icd_codes"]
-            }
-            
-            self.logger.info("ICD Classification Completed")
-            return result
+            primary_category_num = self._primary_category(parsed_response)
+            if primary_category_num:
+                icd_topics_results[primary_category_num] = await self._activate_topic_async(
+                    primary_category_num, scenario
+                )
             
+            return self._build_result(parsed_response, icd_topics_results)
         except Exception as e:
-            self.logger.error(f"Error in process: {str(e)}")
-            return {
-                "error": str(e),
-                "categories": [],
-                "code_lists": [],
-                "explanations": [],
-                "doubts": [],
-                "category_numbers_string": "",
-                "icd_topics_results": {},
-                "icd_codes": []
-            }
+            return self._error_result(e)
+
+    process = blocking(process_async)
 
     @property
     def current_settings(self) -> Dict[str, Any]:
         """Get current model settings"""
+        config = self.service.resolve_config(self.STAGE, self.model_config)
         return {
-            "model": self.service.model,
-            "temperature": self.service.temperature
+            "model": config.model,
+            "temperature": config.temperature
         }
 
 class ICDClassifierCLI:
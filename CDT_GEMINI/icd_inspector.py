@@ -1,9 +1,9 @@
 import os
 import logging
 from dotenv import load_dotenv
-from llm_services import generate_response, get_service, set_model, set_temperature
+from llm_services import generate_response_async, get_service, ModelConfig, blocking
+from structured_output import use_structured_output
 from typing import Dict, Any, Optional
-from llm_services import OPENROUTER_MODEL, DEFAULT_TEMP
 
 # Load environment variables
 load_dotenv()
@@ -13,6 +13,8 @@ load_dotenv()
 
 class ICDInspector:
     """Class to handle ICD code inspection with configurable prompts and settings"""
+
+    STAGE = "icd_inspector"
     
     PROMPT_TEMPLATE = """
 You are a highly experienced medical coding expert with over 15 years of expertise in ICD-10-CM codes for dental scenarios. 
@@ -47,9 +49,10 @@ CODES: K05.1, Z91.89
 EXPLANATION: K05.1 (Chronic gingivitis) is appropriate as the scenario describes inflammation of the gums that has persisted for several months. Z91.89 (Other specified personal risk factors) is included to document the patient's tobacco use which is significant for their periodontal condition. K05.2 was rejected because while there is gum disease, there is no evidence of destruction of the supporting structures required for periodontitis diagnosis.
 """
 
-    def __init__(self, model: str = OPENROUTER_MODEL, temperature: float = DEFAULT_TEMP):
-        """Initialize the inspector with model and temperature settings"""
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Initialize the inspector with optional model and temperature overrides"""
         self.service = get_service()
+        self.model_config = ModelConfig()
         self.configure(model, temperature)
         self.logger = self._setup_logging()
 
@@ -63,11 +66,8 @@ EXPLANATION: K05.1 (Chronic gingivitis) is appropriate as the scenario describes
         return logging.getLogger(__name__)
 
     def configure(self, model: Optional[str] = None, temperature: Optional[float] = None) -> None:
-        """Configure model and temperature settings"""
-        if model:
-            set_model(model)
-        if temperature is not None:
-            set_temperature(temperature)
+        """Configure model and temperature overrides for this instance's calls only"""
+        self.model_config = self.model_config.merged(ModelConfig(model=model, temperature=temperature))
 
     def _format_topic_analysis(self, topic_analysis: Any) -> str:
         """Format topic analysis data into string"""
@@ -196,37 +196,56 @@ EXPLANATION: K05.1 (Chronic gingivitis) is appropriate as the scenario describes
         
         return ""
 
-    def process(self, scenario: str, topic_analysis: Any = None, questioner_data: Any = None) -> Dict[str, Any]:
+    def format_prompt(self, scenario: str, topic_analysis: Any = None, questioner_data: Any = None) -> str:
+        return self.PROMPT_TEMPLATE.format(
+            scenario=scenario,
+            topic_analysis=self._format_topic_analysis(topic_analysis),
+            questioner_data=self._format_questioner_data(questioner_data)
+        )
+
+    def _from_structured(self, inspection) -> Dict[str, Any]:
+        """Convert a validated ICDInspection into the _parse_response format"""
+        return {
+            "codes": self._clean_codes(",".join(inspection.codes)),
+            "explanation": inspection.explanation
+        }
+
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        self.logger.error(f"Error in process: {str(e)}")
+        return {
+            "error": str(e),
+            "codes": [],
+            "explanation": f"Error occurred: {str(e)}",
+            "type": "error",
+            "data_source": "error"
+        }
+
+    async def process_async(self, scenario: str, topic_analysis: Any = None, questioner_data: Any = None) -> Dict[str, Any]:
         """Process a scenario and return ICD inspection results"""
         try:
-            formatted_prompt = self.PROMPT_TEMPLATE.format(
-                scenario=scenario,
-                topic_analysis=self._format_topic_analysis(topic_analysis),
-                questioner_data=self._format_questioner_data(questioner_data)
-            )
-            
-            response = generate_response(formatted_prompt)
-            result = self._parse_response(response)
+            formatted_prompt = self.format_prompt(scenario, topic_analysis, questioner_data)
+            if use_structured_output(self.STAGE):
+                result = self._from_structured(
+                    await self.service.generate_structured_async(formatted_prompt, self.STAGE, self.model_config)
+                )
+            else:
+                response = await generate_response_async(formatted_prompt, stage=self.STAGE, config=self.model_config)
+                result = self._parse_response(response)
             
             self.logger.info("ICD analysis completed for scenario")
             return result
-            
         except Exception as e:
-            self.logger.error(f"Error in process: {str(e)}")
-            return {
-                "error": str(e),
-                "codes": [],
-                "explanation": f"Error occurred: {str(e)}",
-                "type": "error",
-                "data_source": "error"
-            }
+            return self._error_result(e)
+
+    process = blocking(process_async)
 
     @property
     def current_settings(self) -> Dict[str, Any]:
         """Get current model settings"""
+        config = self.service.resolve_config(self.STAGE, self.model_config)
         return {
-            "model": self.service.model,
-            "temperature": self.service.temperature
+            "model": config.model,
+            "temperature": config.temperature
         }
 
 class ICDInspectorCLI:
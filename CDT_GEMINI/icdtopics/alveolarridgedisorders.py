@@ -4,24 +4,16 @@ Module for extracting alveolar ridge disorders ICD-10 codes.
 
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
+from llm_services import get_service, ModelConfig, blocking
 from icdtopics.prompt import PROMPT
 
 # Load environment variables
 load_dotenv()
 
-# Get model name from environment variable, default to gpt-4o if not set
- 
-def create_alveolar_ridge_disorders_extractor(temperature=0.0):
-    """
-    Create a LangChain-based alveolar ridge disorders code extractor.
-    """
-    llm = ChatGoogleGenerativeAI(model="models/gemini-2.5-pro-exp-03-25", temperature=temperature)
-    
-    prompt_template = PromptTemplate(
-        template="""
+# Built once per process and reused by every extraction
+ALVEOLAR_RIDGE_DISORDERS_PROMPT_TEMPLATE = PromptTemplate(
+    template="""
 You are a highly experienced medical coding expert specializing in alveolar ridge disorders. 
 Analyze the given scenario and determine the most applicable ICD-10 code(s).
 
@@ -45,47 +37,45 @@ Scenario: {{scenario}}
 
 {prompt}
 """,
-        input_variables=["scenario", "prompt"]
-    )
-    
-    return LLMChain(llm=llm, prompt=prompt_template.partial(prompt=PROMPT))
+    input_variables=["scenario", "prompt"]
+).partial(prompt=PROMPT)
+
+def create_alveolar_ridge_disorders_extractor(temperature=0.0):
+    """
+    Return the shared alveolar ridge disorders prompt template and the model settings for one extraction.
+    """
+    return ALVEOLAR_RIDGE_DISORDERS_PROMPT_TEMPLATE, ModelConfig(temperature=temperature)
 
-def extract_alveolar_ridge_disorders_code(scenario, temperature=0.0):
+async def extract_alveolar_ridge_disorders_code_async(scenario, temperature=0.0):
     """
     Extract alveolar ridge disorders code(s) for a given scenario.
     """
     try:
-        chain = create_alveolar_ridge_disorders_extractor(temperature)
-        result = chain.invoke({"scenario": scenario})
-        # Handle different return formats from LangChain
-        if isinstance(result, dict):
-            if "text" in result:
-                result_text = result["text"]
-            elif "output_text" in result:
-                result_text = result["output_text"]
-            else:
-                result_text = str(result)
-        elif hasattr(result, "content"):
-            result_text = result.content
-        else:
-            result_text = str(result)
-        
+        prompt_template, config = create_alveolar_ridge_disorders_extractor(temperature)
+        result_text = await get_service().invoke_chain_async(
+            prompt_template, {"scenario": scenario}, stage="icd_topic:alveolarridgedisorders", config=config
+        )
+
         print(f"Result: {result_text}")
-        return result_text.strip()
+        return result_text.strip() if isinstance(result_text, str) else result_text
     except Exception as e:
         print(f"Error in extract_alveolar_ridge_disorders_code: {str(e)}")
         return ""
 
-def activate_alveolar_ridge_disorders(scenario):
+extract_alveolar_ridge_disorders_code = blocking(extract_alveolar_ridge_disorders_code_async)
+
+async def activate_alveolar_ridge_disorders_async(scenario):
     """
     Activate alveolar ridge disorders analysis and return results.
     """
     try:
-        return extract_alveolar_ridge_disorders_code(scenario)
+        return await extract_alveolar_ridge_disorders_code_async(scenario)
     except Exception as e:
         print(f"Error in activate_alveolar_ridge_disorders: {str(e)}")
         return ""
 
+activate_alveolar_ridge_disorders = blocking(activate_alveolar_ridge_disorders_async)
+
 # Example usage
 if __name__ == "__main__":
     scenario = "Patient presents with moderate bone loss in the upper jaw following tooth loss."
@@ -4,24 +4,16 @@ Module for extracting dental caries ICD-10 codes.
 
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
+from llm_services import get_service, ModelConfig, blocking
 from icdtopics.prompt import PROMPT
 
 # Load environment variables
 load_dotenv()
 
-# Get model name from environment variable, default to gpt-4o if not set
- 
-def create_dental_caries_extractor(temperature=0.0):
-    """
-    Create a LangChain-based dental caries code extractor.
-    """
-    llm = ChatGoogleGenerativeAI(model="models/gemini-2.5-pro-exp-03-25", temperature=temperature)
-    
-    prompt_template = PromptTemplate(
-        template="""
+# Built once per process and reused by every extraction
+DENTAL_CARIES_PROMPT_TEMPLATE = PromptTemplate(
+    template="""
 You are a highly experienced medical coding expert specializing in dental caries. 
 Analyze the given scenario and determine the most applicable ICD-10 code(s).
 
@@ -49,50 +41,45 @@ Scenario: {scenario}
 
 {prompt}
 """,
-        input_variables=["scenario", "prompt"]
-    )
-    
-    return LLMChain(llm=llm, prompt=prompt_template.partial(prompt=PROMPT))
+    input_variables=["scenario", "prompt"]
+).partial(prompt=PROMPT)
+
+def create_dental_caries_extractor(temperature=0.0):
+    """
+    Return the shared dental caries prompt template and the model settings for one extraction.
+    """
+    return DENTAL_CARIES_PROMPT_TEMPLATE, ModelConfig(temperature=temperature)
 
-def extract_dental_caries_code(scenario, temperature=0.0):
+async def extract_dental_caries_code_async(scenario, temperature=0.0):
     """
     Extract dental caries code(s) for a given scenario.
     """
     try:
-        chain = create_dental_caries_extractor(temperature)
-        result = chain.invoke({"scenario": scenario})
-        result_text = ""
-        
-        # LangChain 0.1.x format: should return dict with keys that might include 'text' or 'output_text'
-        if isinstance(result, dict):
-            if "text" in result:
-                result_text = result["text"]
-            elif "output_text" in result:
-                result_text = result["output_text"]
-            else:
-                result_text = str(result)
-        # New version may return an object with content attribute
-        elif hasattr(result, "content"):
-            result_text = result.content
-        else:
-            result_text = str(result)
-            
+        prompt_template, config = create_dental_caries_extractor(temperature)
+        result_text = await get_service().invoke_chain_async(
+            prompt_template, {"scenario": scenario}, stage="icd_topic:dentalcaries", config=config
+        )
+
         print(f"Dental caries code result: {result_text}")
-        return result_text.strip()
+        return result_text.strip() if isinstance(result_text, str) else result_text
     except Exception as e:
         print(f"Error in extract_dental_caries_code: {str(e)}")
         return ""
 
-def activate_dental_caries(scenario):
+extract_dental_caries_code = blocking(extract_dental_caries_code_async)
+
+async def activate_dental_caries_async(scenario):
     """
     Activate dental caries analysis and return results.
     """
     try:
-        return extract_dental_caries_code(scenario)
+        return await extract_dental_caries_code_async(scenario)
     except Exception as e:
         print(f"Error in activate_dental_caries: {str(e)}")
         return ""
 
+activate_dental_caries = blocking(activate_dental_caries_async)
+
 # Example usage
 if __name__ == "__main__":
     scenario = "Patient presents with deep cavity on a primary molar penetrating into the pulp."
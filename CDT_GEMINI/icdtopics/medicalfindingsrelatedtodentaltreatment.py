@@ -4,24 +4,16 @@ Module for extracting medical findings related to dental treatment ICD-10 codes.
 
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
+from llm_services import get_service, ModelConfig, blocking
 from icdtopics.prompt import PROMPT
 
 # Load environment variables
 load_dotenv()
 
-# Get model name from environment variable, default to gpt-4o if not set
- 
-def create_medical_findings_dental_treatment_extractor(temperature=0.0):
-    """
-    Create a LangChain-based medical findings related to dental treatment code extractor.
-    """
-    llm = ChatGoogleGenerativeAI(model="models/gemini-2.5-pro-exp-03-25", temperature=temperature)
-    
-    prompt_template = PromptTemplate(
-        template="""
+# Built once per process and reused by every extraction
+MEDICAL_FINDINGS_DENTAL_TREATMENT_PROMPT_TEMPLATE = PromptTemplate(
+    template="""
 You are a highly experienced medical coding expert specializing in medical findings related to dental treatment. 
 Analyze the given scenario and determine the most applicable ICD-10 code(s).
 
@@ -60,47 +52,45 @@ Scenario: {{scenario}}
 
 {prompt}
 """,
-        input_variables=["scenario", "prompt"]
-    )
-    
-    return LLMChain(llm=llm, prompt=prompt_template.partial(prompt=PROMPT))
+    input_variables=["scenario", "prompt"]
+).partial(prompt=PROMPT)
+
+def create_medical_findings_dental_treatment_extractor(temperature=0.0):
+    """
+    Return the shared medical findings dental treatment prompt template and the model settings for one extraction.
+    """
+    return MEDICAL_FINDINGS_DENTAL_TREATMENT_PROMPT_TEMPLATE, ModelConfig(temperature=temperature)
 
-def extract_medical_findings_dental_treatment_code(scenario, temperature=0.0):
+async def extract_medical_findings_dental_treatment_code_async(scenario, temperature=0.0):
     """
     Extract medical findings related to dental treatment code(s) for a given scenario.
     """
     try:
-        chain = create_medical_findings_dental_treatment_extractor(temperature)
-        result = chain.invoke({"scenario": scenario})
-        # Handle different return formats from LangChain
-        if isinstance(result, dict):
-            if "text" in result:
-                result_text = result["text"]
-            elif "output_text" in result:
-                result_text = result["output_text"]
-            else:
-                result_text = str(result)
-        elif hasattr(result, "content"):
-            result_text = result.content
-        else:
-            result_text = str(result)
-        
+        prompt_template, config = create_medical_findings_dental_treatment_extractor(temperature)
+        result_text = await get_service().invoke_chain_async(
+            prompt_template, {"scenario": scenario}, stage="icd_topic:medicalfindingsrelatedtodentaltreatment", config=config
+        )
+
         print(f"Result: {result_text}")
-        return result_text.strip()
+        return result_text.strip() if isinstance(result_text, str) else result_text
     except Exception as e:
         print(f"Error in extract_medical_findings_dental_treatment_code: {str(e)}")
         return ""
 
-def activate_medical_findings(scenario):
+extract_medical_findings_dental_treatment_code = blocking(extract_medical_findings_dental_treatment_code_async)
+
+async def activate_medical_findings_async(scenario):
     """
     Activate medical findings related to dental treatment analysis and return results.
     """
     try:
-        return extract_medical_findings_dental_treatment_code(scenario)
+        return await extract_medical_findings_dental_treatment_code_async(scenario)
     except Exception as e:
         print(f"Error in activate_medical_findings: {str(e)}")
         return ""
 
+activate_medical_findings = blocking(activate_medical_findings_async)
+
 # Example usage
 if __name__ == "__main__":
     scenario = "Patient presents for routine dental examination and cleaning, no abnormal findings noted."
@@ -0,0 +1,107 @@
+"""
+Request-level deduplication for /api/analyze.
+
+A request is keyed by its Idempotency-Key header or, without one, by a hash
+of its normalized scenario. A duplicate that arrives while the first request
+is still running attaches to that run; one that arrives after it completed
+gets the stored response (and so the same dental_report record) back.
+Explicit keys are remembered for IDEMPOTENCY_KEY_TTL, automatic ones only for
+IDEMPOTENCY_WINDOW, since the same note may legitimately be resubmitted later.
+
+Completed responses are kept in process memory, so with several API
+processes a duplicate only finds the run of the process it lands on.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Awaitable, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Key requests without an Idempotency-Key by their normalized scenario
+IDEMPOTENCY_AUTO = os.getenv("IDEMPOTENCY_AUTO", "true").lower() in ("1", "true", "yes")
+# Seconds a completed response answers automatically keyed duplicates
+IDEMPOTENCY_WINDOW = float(os.getenv("IDEMPOTENCY_WINDOW", "60"))
+# Seconds a completed response answers requests with the same Idempotency-Key
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+# How a request was answered
+LEADER = "leader"
+IN_FLIGHT = "in_flight"
+COMPLETED = "completed"
+
+class IdempotencyConflict(Exception):
+    """Raised when an Idempotency-Key is reused for a different request"""
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of the request fields that decide its result"""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+class RequestDeduplicator:
+    """Runs one request per key: concurrent duplicates share the run, later ones get its stored result"""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        # key -> (expires at, fingerprint, result)
+        self._completed: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self.counters = {"requests": 0, LEADER: 0, IN_FLIGHT: 0, COMPLETED: 0, "conflicts": 0}
+
+    async def run(self, key: str, request_fingerprint: str, ttl: float, fn: Callable[[], Awaitable[Any]],
+                  keep: Callable[[Any], bool] = lambda result: True) -> Tuple[Any, str]:
+        """Result for the request under key, and whether it was run (LEADER), shared (IN_FLIGHT) or
+        replayed (COMPLETED). Only results that pass keep are stored for ttl seconds."""
+        now = time.monotonic()
+        with self._lock:
+            self.counters["requests"] += 1
+            self._expire(now)
+            stored = self._completed.get(key)
+            flight = self._in_flight.get(key)
+            owner = stored[1] if stored else flight[0] if flight else None
+            if owner is not None and owner != request_fingerprint:
+                self.counters["conflicts"] += 1
+                raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+            if stored is not None:
+                self.counters[COMPLETED] += 1
+                return stored[2], COMPLETED
+            if flight is not None:
+                self.counters[IN_FLIGHT] += 1
+                task, source = flight[1], IN_FLIGHT
+            else:
+                self.counters[LEADER] += 1
+                task, source = asyncio.create_task(fn()), LEADER
+                self._in_flight[key] = (request_fingerprint, task)
+                task.add_done_callback(lambda done: self._finish(key, request_fingerprint, ttl, keep, done))
+        # Shielded so a caller that goes away doesn't cancel the run the others are waiting on
+        return await asyncio.shield(task), source
+
+    def _finish(self, key: str, request_fingerprint: str, ttl: float, keep: Callable[[Any], bool],
+                task: asyncio.Task):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if task.cancelled() or task.exception() is not None or not keep(task.result()):
+                return
+            self._completed[key] = (time.monotonic() + ttl, request_fingerprint, task.result())
+            self._completed.move_to_end(key)
+            while len(self._completed) > self.max_entries:
+                self._completed.popitem(last=False)
+
+    def _expire(self, now: float):
+        for key in [key for key, (expires, _, _) in self._completed.items() if expires <= now]:
+            del self._completed[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["in_flight_runs"] = len(self._in_flight)
+            stats["stored"] = len(self._completed)
+        stats["deduplicated"] = stats[IN_FLIGHT] + stats[COMPLETED]
+        stats["auto"] = IDEMPOTENCY_AUTO
+        return stats
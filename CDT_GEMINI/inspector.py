@@ -1,9 +1,9 @@
 import os
 import logging
 from dotenv import load_dotenv
-from llm_services import generate_response, get_service, set_model, set_temperature
+from llm_services import generate_response_async, get_service, ModelConfig, blocking
+from structured_output import use_structured_output
 from typing import Dict, Any, Optional
-from llm_services import OPENROUTER_MODEL, DEFAULT_TEMP
 
 # Load environment variables
 load_dotenv()
@@ -13,6 +13,8 @@ load_dotenv()
 
 class DentalInspector:
     """Class to handle dental code inspection with configurable prompts and settings"""
+
+    STAGE = "cdt_inspector"
     
     PROMPT_TEMPLATE = """
 You are the final code selector ("Inspector") with extensive expertise in dental coding. Your task is to perform a thorough analysis of the provided scenario along with the candidate CDT code outputs—including all explanations and doubts—from previous subtopics. Your final output must include only the CDT code(s) that are justified by the scenario, with minimal assumptions.
@@ -67,9 +69,10 @@ CODES: D0120, D0274, D1110
 REJECTED CODES: D0140,D0220,D0230
 """
 
-    def __init__(self, model: str = OPENROUTER_MODEL, temperature: float = DEFAULT_TEMP):
-        """Initialize the inspector with model and temperature settings"""
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Initialize the inspector with optional model and temperature overrides"""
         self.service = get_service()
+        self.model_config = ModelConfig()
         self.configure(model, temperature)
         self.logger = self._setup_logging()
 
@@ -83,11 +86,8 @@ REJECTED CODES: D0140,D0220,D0230
         return logging.getLogger(__name__)
 
     def configure(self, model: Optional[str] = None, temperature: Optional[float] = None) -> None:
-        """Configure model and temperature settings"""
-        if model:
-            set_model(model)
-        if temperature is not None:
-            set_temperature(temperature)
+        """Configure model and temperature overrides for this instance's calls only"""
+        self.model_config = self.model_config.merged(ModelConfig(model=model, temperature=temperature))
 
     def format_prompt(self, scenario: str, topic_analysis: Any, questioner_data: Any = None) -> str:
         """Format the prompt template with the given inputs"""
@@ -181,37 +181,56 @@ REJECTED CODES: D0140,D0220,D0230
                     cleaned.append(clean_code)
         return cleaned
 
-    def process(self, scenario: str, topic_analysis: Any = None, questioner_data: Any = None) -> Dict[str, Any]:
+    def _from_structured(self, inspection) -> Dict[str, Any]:
+        """Convert a validated CDTInspection into the parse_response format"""
+        return {
+            "codes": self._clean_codes(",".join(inspection.codes)),
+            "rejected_codes": self._clean_codes(",".join(inspection.rejected_codes)),
+            "explanation": inspection.explanation
+        }
+
+    def _log_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        self.logger.info(f"Dental analysis completed for scenario")
+        self.logger.info(f"Extracted codes: {result['codes']}")
+        self.logger.info(f"Extracted rejected codes: {result['rejected_codes']}")
+        self.logger.info(f"Extracted explanation: {result['explanation']}")
+        return result
+
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        self.logger.error(f"Error in process: {str(e)}")
+        return {
+            "error": str(e),
+            "codes": [],
+            "rejected_codes": [],
+            "explanation": f"Error occurred: {str(e)}",
+            "type": "error",
+            "data_source": "error"
+        }
+
+    async def process_async(self, scenario: str, topic_analysis: Any = None, questioner_data: Any = None) -> Dict[str, Any]:
         """Process a dental scenario and return inspection results"""
         try:
             formatted_prompt = self.format_prompt(scenario, topic_analysis, questioner_data)
-            response = generate_response(formatted_prompt)
-            result = self.parse_response(response)
-            
-            self.logger.info(f"Dental analysis completed for scenario")
-            self.logger.info(f"Extracted codes: {result['codes']}")
-            self.logger.info(f"Extracted rejected codes: {result['rejected_codes']}")
-            self.logger.info(f"Extracted explanation: {result['explanation']}")
-            
-            return result
-            
+            if use_structured_output(self.STAGE):
+                result = self._from_structured(
+                    await self.service.generate_structured_async(formatted_prompt, self.STAGE, self.model_config)
+                )
+            else:
+                response = await generate_response_async(formatted_prompt, stage=self.STAGE, config=self.model_config)
+                result = self.parse_response(response)
+            return self._log_result(result)
         except Exception as e:
-            self.logger.error(f"Error in process: {str(e)}")
-            return {
-                "error": str(e),
-                "codes": [],
-                "rejected_codes": [],
-                "explanation": f"Error occurred: {str(e)}",
-                "type": "error",
-                "data_source": "error"
-            }
+            return self._error_result(e)
+
+    process = blocking(process_async)
 
     @property
     def current_settings(self) -> Dict[str, Any]:
         """Get current model settings"""
+        config = self.service.resolve_config(self.STAGE, self.model_config)
         return {
-            "model": self.service.model,
-            "temperature": self.service.temperature
+            "model": config.model,
+            "temperature": config.temperature
         }
 
 class InspectorCLI:
@@ -0,0 +1,291 @@
+"""
+Persistent job queue and worker pool for analyses.
+
+Jobs live in a SQLite (WAL) database, so queued and half-finished work
+survives a restart and several API or worker processes can share one queue.
+A worker claims a job by taking a lease on it; a job whose lease runs out
+(its process died) goes back to the queue, and workers that shut down cleanly
+hand their jobs back straight away. Failed attempts are retried with
+backoff up to JOB_MAX_ATTEMPTS.
+
+Run standalone workers, separately from the API processes, with
+    python job_queue.py --workers 4
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")
+)
+# Workers run inside each API process (0 to leave jobs to standalone workers)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Seconds a claimed job may run before another worker assumes its process died
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class JobFailed(Exception):
+    """Raised by a job handler for a failed attempt; the job is retried while attempts remain"""
+
+JobHandler = Callable[[Dict[str, Any], Callable[[str, Any], None]], Awaitable[Dict[str, Any]]]
+
+class JobQueue:
+    """SQLite-backed job table with lease-based claiming"""
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._initialize_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _initialize_db(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "progress TEXT, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "available_at REAL NOT NULL, lease_until REAL, created_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs(status, available_at)")
+        logger.info(f"Job queue at {self.path}")
+
+    def enqueue(self, payload: Dict[str, Any], kind: str = "analysis") -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, status, payload, available_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), now, now)
+        )
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job (queued, or running with an expired lease) and count the attempt"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row["status"] == RUNNING:
+                logger.warning(f"Job {row['id']} lease expired, reclaiming")
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        job = self._row(row)
+        job["attempts"] += 1
+        job["status"] = RUNNING
+        return job
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]):
+        self._connection().execute(
+            "UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress, default=str), job_id)
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, finished_at = ? WHERE id = ?",
+            (SUCCEEDED, json.dumps(result, default=str), time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str, attempts: int, backoff: float = JOB_RETRY_BACKOFF) -> bool:
+        """Record a failed attempt; requeue with backoff while attempts remain. Returns whether it was requeued"""
+        now = time.time()
+        if attempts < self.max_attempts:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, available_at = ? WHERE id = ?",
+                (QUEUED, error, now + backoff * 2 ** (attempts - 1), job_id)
+            )
+            return True
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, finished_at = ? WHERE id = ?",
+            (FAILED, error, now, job_id)
+        )
+        return False
+
+    def release(self, job_id: str):
+        """Put a claimed job back in the queue without counting its attempt"""
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, attempts = attempts - 1, lease_until = NULL, available_at = ? "
+            "WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), job_id, RUNNING)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in ("payload", "progress", "result"):
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+class JobWorkerPool:
+    """A bounded number of asyncio workers draining a JobQueue"""
+
+    def __init__(self, queue: JobQueue, handler: JobHandler, workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(n)) for n in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers, e.g. right after a job was enqueued in this process"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, number: int):
+        while True:
+            try:
+                job = await self._claim()
+            except sqlite3.Error as e:
+                logger.warning(f"Job worker {number} could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Claim a job in a worker thread; a job claimed while the worker is being stopped is handed back"""
+        claim = asyncio.ensure_future(asyncio.to_thread(self.queue.claim))
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            job = await claim
+            if job is not None:
+                await asyncio.to_thread(self.queue.release, job["id"])
+            raise
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        progress: Dict[str, Any] = {"attempt": job["attempts"]}
+        # Progress is written by one task per job, which always writes the latest state; events
+        # arriving while a write is in flight are folded into the next one
+        writer: Optional[asyncio.Task] = None
+        stale = False
+
+        async def write_progress():
+            nonlocal stale
+            while stale:
+                stale = False
+                snapshot = {**progress, "events": list(progress["events"]), "partial": dict(progress["partial"])}
+                try:
+                    await asyncio.to_thread(self.queue.update_progress, job_id, snapshot)
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not record progress of job {job_id}: {e}")
+
+        def report(event: str, data: Any):
+            nonlocal writer, stale
+            progress.setdefault("events", []).append(event)
+            progress.setdefault("partial", {})[event] = data
+            stale = True
+            if writer is None or writer.done():
+                writer = asyncio.create_task(write_progress())
+
+        async def settle_progress():
+            # Let the last progress write land before the job's final state
+            if writer is not None:
+                await asyncio.gather(writer, return_exceptions=True)
+
+        try:
+            result = await asyncio.wait_for(self.handler(job["payload"], report), self.queue.lease_seconds)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without counting the interrupted attempt
+            await settle_progress()
+            await asyncio.to_thread(self.queue.release, job_id)
+            raise
+        except Exception as e:
+            await settle_progress()
+            error = str(e) or e.__class__.__name__
+            requeued = await asyncio.to_thread(self.queue.fail, job_id, error, job["attempts"])
+            logger.warning(f"Job {job_id} attempt {job['attempts']} failed ({error}); {'retrying' if requeued else 'giving up'}")
+            return
+        await settle_progress()
+        await asyncio.to_thread(self.queue.complete, job_id, result)
+        logger.info(f"Job {job_id} succeeded after {job['attempts']} attempt(s)")
+
+async def _serve(workers: int):
+    from app import run_analysis_job
+    pool = JobWorkerPool(JobQueue(), run_analysis_job, workers)
+    pool.start()
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run analysis job workers")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1))
+    args = parser.parse_args()
+    asyncio.run(_serve(args.workers))
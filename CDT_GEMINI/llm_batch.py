@@ -0,0 +1,258 @@
+"""
+Offline batch execution for LLMService. Prompts issued anywhere in the
+pipeline are collected into JSONL batches, submitted to a batch endpoint,
+polled until done, and each result is routed back to the call waiting on it.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, List, Callable, Optional
+from dotenv import load_dotenv
+from openai import OpenAI
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Batch configuration (opt-in; meant for bulk re-coding jobs, not interactive traffic)
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "false").lower() in ("1", "true", "yes")
+# "openai" for a provider batch endpoint, "local" for the offline stand-in
+LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND", "openai")
+LLM_BATCH_BASE_URL = os.getenv("LLM_BATCH_BASE_URL", "https://api.openai.com/v1")
+LLM_BATCH_API_KEY = os.getenv("LLM_BATCH_API_KEY", os.getenv("OPENAI_API_KEY"))
+LLM_BATCH_COMPLETION_WINDOW = os.getenv("LLM_BATCH_COMPLETION_WINDOW", "24h")
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1000"))
+# Seconds to keep collecting prompts after the first one before submitting
+LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "5"))
+LLM_BATCH_POLL_INTERVAL = float(os.getenv("LLM_BATCH_POLL_INTERVAL", "30"))
+LLM_BATCH_DIR = os.getenv(
+    "LLM_BATCH_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_batches")
+)
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+class OpenAIBatchBackend:
+    """Provider Batch API: upload the JSONL, create a batch, poll it, download the output"""
+
+    def __init__(self, base_url: str = LLM_BATCH_BASE_URL, api_key: str = LLM_BATCH_API_KEY,
+                 completion_window: str = LLM_BATCH_COMPLETION_WINDOW):
+        if not api_key:
+            raise ValueError("Batch API key not found in environment variables")
+        self.client = OpenAI(base_url=base_url, api_key=api_key)
+        self.completion_window = completion_window
+
+    def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            batch_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Output and error lines of a finished batch"""
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                text = self.client.files.content(file_id).text
+                lines.extend(json.loads(line) for line in text.splitlines() if line.strip())
+        return lines
+
+def canned_response(body: Dict[str, Any]) -> str:
+    """Default stand-in answer for a batched chat-completions request"""
+    return "Batch stand-in response"
+
+class LocalBatchBackend:
+    """Offline stand-in for a batch endpoint; answers every line with responder(body)"""
+
+    def __init__(self, directory: str = LLM_BATCH_DIR, responder: Callable[[Dict[str, Any]], str] = None,
+                 delay: float = 0.0):
+        self.directory = directory
+        self.responder = responder or canned_response
+        self.delay = delay
+        self._ready_at: Dict[str, float] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.output.jsonl")
+
+    def submit(self, path: str) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        with open(path, encoding="utf-8") as src, open(self._output_path(batch_id), "w", encoding="utf-8") as out:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                out.write(json.dumps(self._answer(request), ensure_ascii=False) + "\n")
+        self._ready_at[batch_id] = time.monotonic() + self.delay
+        return batch_id
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        body = request["body"]
+        try:
+            content = self.responder(body)
+        except Exception as e:
+            return {"id": uuid.uuid4().hex, "custom_id": request["custom_id"], "response": None,
+                    "error": {"code": "stand_in_error", "message": str(e)}}
+        return {
+            "id": uuid.uuid4().hex,
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}]
+                }
+            },
+            "error": None
+        }
+
+    def status(self, batch_id: str) -> str:
+        return "completed" if time.monotonic() >= self._ready_at[batch_id] else "in_progress"
+
+    def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        with open(self._output_path(batch_id), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+def create_backend(name: str = LLM_BATCH_BACKEND):
+    if name == "local":
+        # Answer in each prompt's own output format, like the stand-in server
+        from llm_stub_server import template_response, structured_response, prompt_text
+        return LocalBatchBackend(responder=lambda body: (
+            structured_response if body.get("response_format") else template_response
+        )(prompt_text(body["messages"])))
+    if name == "openai":
+        return OpenAIBatchBackend()
+    raise ValueError(f"Unknown batch backend: {name}")
+
+def _result_content(line: Dict[str, Any]) -> str:
+    """Completion text of one output line, raising if the line failed"""
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or response.get("body", {}).get("error")
+        raise Exception(f"Batch request {line.get('custom_id')} failed: {error}")
+    return response["body"]["choices"][0]["message"]["content"].strip()
+
+class BatchCollector:
+    """Groups concurrent requests into batches and resolves each caller's future when its batch is done"""
+
+    def __init__(self, backend=None, directory: str = LLM_BATCH_DIR, batch_size: int = LLM_BATCH_SIZE,
+                 window: float = LLM_BATCH_WINDOW, poll_interval: float = LLM_BATCH_POLL_INTERVAL):
+        self.backend = backend or create_backend()
+        self.directory = directory
+        self.batch_size = batch_size
+        self.window = window
+        self.poll_interval = poll_interval
+        self._pending: List[tuple] = []
+        self._first_pending_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._flusher = None
+        self.counters = {"requests": 0, "batches": 0, "completed": 0, "failed": 0, "in_flight_batches": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def submit(self, body: Dict[str, Any]) -> Future:
+        """Queue a chat-completions body; the returned future resolves to the completion text"""
+        future = Future()
+        with self._condition:
+            self._pending.append((uuid.uuid4().hex, body, future))
+            self.counters["requests"] += 1
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="llm-batch-flusher", daemon=True)
+                self._flusher.start()
+            self._condition.notify()
+        return future
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._pending:
+                        # Exit when idle; the next submit starts a new flusher
+                        self._flusher = None
+                        return
+                    waited = time.monotonic() - self._first_pending_at
+                    if len(self._pending) >= self.batch_size or waited >= self.window:
+                        break
+                    self._condition.wait(self.window - waited)
+                items = self._pending[:self.batch_size]
+                self._pending = self._pending[self.batch_size:]
+                self._first_pending_at = time.monotonic() if self._pending else None
+                self.counters["batches"] += 1
+                self.counters["in_flight_batches"] += 1
+            # Batches run independently so a slow one doesn't hold up the next
+            threading.Thread(target=self._execute, args=(items,), name="llm-batch", daemon=True).start()
+
+    def _write_batch(self, items: List[tuple]) -> str:
+        path = os.path.join(self.directory, f"batch-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, body, _ in items:
+                f.write(json.dumps(
+                    {"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": body},
+                    ensure_ascii=False
+                ) + "\n")
+        return path
+
+    def _execute(self, items: List[tuple]):
+        completed = failed = 0
+        # Requests whose callers already gave up are left out; the rest can no longer be cancelled
+        items = [item for item in items if item[2].set_running_or_notify_cancel()]
+        try:
+            if not items:
+                return
+            path = self._write_batch(items)
+            batch_id = self.backend.submit(path)
+            logger.info(f"Submitted LLM batch {batch_id} with {len(items)} requests")
+            status = self.backend.status(batch_id)
+            while status not in TERMINAL_STATUSES:
+                time.sleep(self.poll_interval)
+                status = self.backend.status(batch_id)
+
+            lines = {line.get("custom_id"): line for line in self.backend.results(batch_id)}
+            logger.info(f"LLM batch {batch_id} finished with status {status}")
+            for custom_id, _, future in items:
+                line = lines.get(custom_id)
+                try:
+                    if line is None:
+                        raise Exception(f"Batch {batch_id} ({status}) returned no result for {custom_id}")
+                    result = _result_content(line)
+                except Exception as e:
+                    future.set_exception(e)
+                    failed += 1
+                else:
+                    future.set_result(result)
+                    completed += 1
+        except Exception as e:
+            logger.error(f"LLM batch failed: {e}")
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+                    failed += 1
+        finally:
+            with self._condition:
+                self.counters["completed"] += completed
+                self.counters["failed"] += failed
+                self.counters["in_flight_batches"] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self.counters)
+            stats["pending"] = len(self._pending)
+        stats["backend"] = type(self.backend).__name__
+        return stats
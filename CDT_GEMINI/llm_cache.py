@@ -0,0 +1,221 @@
+"""
+Two-tier response cache for LLMService: a bounded in-process LRU in front of
+a persistent SQLite (WAL) store that survives restarts and is shared by workers.
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+)
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "2048"))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "200000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+# Bump to invalidate every cached response after a prompt wording change
+LLM_PROMPT_VERSION = os.getenv("LLM_PROMPT_VERSION", "1")
+# Eviction runs on the disk tier after this many writes
+EVICTION_INTERVAL = 500
+
+def make_cache_key(model: str, temperature: float, prompt: Any, prompt_version: str = LLM_PROMPT_VERSION) -> str:
+    """Content-address a request by model, temperature, formatted prompt and prompt version"""
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "prompt": prompt, "version": prompt_version},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """LRU memory tier backed by a SQLite WAL tier, with TTL and size eviction"""
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH, memory_size: int = LLM_CACHE_MEMORY_SIZE,
+                 max_rows: int = LLM_CACHE_MAX_ROWS, ttl: float = LLM_CACHE_TTL):
+        self.path = path
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_eviction = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+        if self.path:
+            self._initialize_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _initialize_db(self):
+        try:
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+            logger.info(f"LLM response cache at {self.path}")
+        except sqlite3.Error as e:
+            logger.error(f"Disabling persistent LLM cache tier: {e}")
+            self.path = None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Look a response up in memory, then on disk (promoting disk hits to memory)"""
+        value = self._memory_get(key)
+        return value if value is not None else self._disk_get(key)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """Awaitable counterpart of get; the disk tier is read in a worker thread"""
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        if self.path:
+            return await asyncio.to_thread(self._disk_get, key)
+        return self._disk_get(key)
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+        return value
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self.path:
+            try:
+                row = self._connection().execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and time.time() - row[1] < self.ttl:
+                    with self._lock:
+                        self.memory[key] = row[0]
+                    self._count("disk_hits")
+                    return row[0]
+            except sqlite3.Error as e:
+                self._count("errors")
+                logger.warning(f"LLM cache read failed: {e}")
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str, model: str = None):
+        """Store a response in both tiers"""
+        run_eviction = self._memory_set(key, value)
+        if self.path:
+            self._disk_set(key, value, model, run_eviction)
+
+    async def set_async(self, key: str, value: str, model: str = None):
+        """Awaitable counterpart of set; the disk tier is written in a worker thread"""
+        run_eviction = self._memory_set(key, value)
+        if self.path:
+            await asyncio.to_thread(self._disk_set, key, value, model, run_eviction)
+
+    def _memory_set(self, key: str, value: str) -> bool:
+        """Store in memory and return whether this write is due to run disk eviction"""
+        with self._lock:
+            self.memory[key] = value
+            self.counters["writes"] += 1
+            self._writes_since_eviction += 1
+            run_eviction = self._writes_since_eviction >= EVICTION_INTERVAL
+            if run_eviction:
+                self._writes_since_eviction = 0
+        return run_eviction
+
+    def _disk_set(self, key: str, value: str, model: str, run_eviction: bool):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, value, time.time())
+            )
+            if run_eviction:
+                self.evict()
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def delete(self, key: str):
+        """Drop one entry from both tiers"""
+        with self._lock:
+            self.memory.pop(key, None)
+        if self.path:
+            self._disk_delete(key)
+
+    async def delete_async(self, key: str):
+        """Awaitable counterpart of delete; the disk tier is updated in a worker thread"""
+        with self._lock:
+            self.memory.pop(key, None)
+        if self.path:
+            await asyncio.to_thread(self._disk_delete, key)
+
+    def _disk_delete(self, key: str):
+        try:
+            self._connection().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning(f"LLM cache delete failed: {e}")
+
+    def evict(self) -> int:
+        """Drop expired rows and trim the disk tier to max_rows, oldest first"""
+        if not self.path:
+            return 0
+        conn = self._connection()
+        removed = conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,)
+        ).rowcount
+        removed += conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,)
+        ).rowcount
+        with self._lock:
+            self.counters["evictions"] += removed
+        if removed:
+            logger.info(f"Evicted {removed} LLM cache rows")
+        return removed
+
+    def clear(self):
+        """Empty both tiers"""
+        with self._lock:
+            self.memory.clear()
+        if self.path:
+            self._connection().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current tier sizes"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self.memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        if self.path:
+            try:
+                stats["disk_entries"] = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error:
+                stats["disk_entries"] = None
+        return stats
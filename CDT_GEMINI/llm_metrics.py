@@ -0,0 +1,261 @@
+"""
+Per-call accounting for LLMService: tokens, latency, queue wait, retries,
+cache status and cost for every call, aggregated per stage/template.
+
+Token counts come from the provider's usage block; calls without one (batch
+results, providers that omit it) are counted with tiktoken instead.
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_METRICS_ENABLED = os.getenv("LLM_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Most recent call records kept for inspection
+LLM_METRICS_RECENT = int(os.getenv("LLM_METRICS_RECENT", "1000"))
+# USD per million tokens, e.g. {"openai/gpt-4o": {"prompt": 2.5, "completion": 10}}; used when usage has no cost
+LLM_MODEL_PRICES = json.loads(os.getenv("LLM_MODEL_PRICES", "{}"))
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+TOKEN_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# Cache status of a call
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+COALESCED = "coalesced"
+
+_encodings: Dict[str, Any] = {}
+_encoding_lock = threading.Lock()
+
+def _encoding(model: str):
+    """tiktoken encoding for model (cl100k_base for unknown models), or None if tiktoken can't load one"""
+    name = (model or "").split("/")[-1]
+    with _encoding_lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[name] = tiktoken.encoding_for_model(name)
+                except KeyError:
+                    _encodings[name] = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable for {model}, estimating tokens from length: {e}")
+                _encodings[name] = None
+        return _encodings[name]
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Token count of text for model; falls back to a length estimate without tiktoken"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def price(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Cost in USD from LLM_MODEL_PRICES, or None for models without a price"""
+    prices = LLM_MODEL_PRICES.get(model) or LLM_MODEL_PRICES.get("default")
+    if not prices:
+        return None
+    return (prompt_tokens * prices.get("prompt", 0) + completion_tokens * prices.get("completion", 0)) / 1_000_000
+
+@dataclass
+class CallRecord:
+    """Accounting for one generate_response call, filled in as the call proceeds"""
+    stage: str
+    model: Optional[str] = None
+    requested_model: Optional[str] = None
+    cache: str = CACHE_MISS
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    # "usage" when every attempt reported usage, otherwise "estimate"
+    token_source: str = "usage"
+    queue_wait: float = 0.0
+    provider_latency: float = 0.0
+    latency: float = 0.0
+    attempts: int = 0
+    retries: int = 0
+    cost: Optional[float] = None
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+    def add_usage(self, model: str, usage, prompt_text: str, completion: str):
+        """Add one provider response's tokens and cost, estimating with tiktoken when usage is missing"""
+        self.model = model
+        if usage is not None and usage.prompt_tokens is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens or 0
+            cost = getattr(usage, "cost", None)
+        else:
+            prompt_tokens, completion_tokens = count_tokens(prompt_text, model), count_tokens(completion, model)
+            cost = None
+            self.token_source = "estimate"
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if cost is None:
+            cost = price(model, prompt_tokens, completion_tokens)
+        if cost is not None:
+            self.cost = (self.cost or 0.0) + cost
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class Histogram:
+    """Fixed-bucket histogram with count and sum"""
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None past the last bound)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+def _totals() -> Dict[str, Any]:
+    return {
+        "calls": 0, "errors": 0, "cache_hits": 0, "coalesced": 0, "provider_calls": 0,
+        "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "estimated_token_calls": 0,
+        "retries": 0, "queue_wait": 0.0, "latency": 0.0, "cost": 0.0
+    }
+
+class TemplateMetrics:
+    """Totals and histograms for one stage/template"""
+
+    def __init__(self):
+        self.totals = _totals()
+        self.models: Dict[str, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+
+    def add(self, record: CallRecord):
+        _accumulate(self.totals, record)
+        self.latency.observe(record.latency)
+        if record.model:
+            self.models[record.model] = self.models.get(record.model, 0) + 1
+        if record.attempts:
+            self.queue_wait.observe(record.queue_wait)
+            self.prompt_tokens.observe(record.prompt_tokens)
+            self.completion_tokens.observe(record.completion_tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "totals": dict(self.totals),
+            "models": dict(self.models),
+            "latency": self.latency.snapshot(),
+            "queue_wait": self.queue_wait.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "completion_tokens": self.completion_tokens.snapshot()
+        }
+
+def _accumulate(totals: Dict[str, Any], record: CallRecord):
+    totals["calls"] += 1
+    totals["errors"] += record.error is not None
+    totals["cache_hits"] += record.cache == CACHE_HIT
+    totals["coalesced"] += record.cache == COALESCED
+    totals["provider_calls"] += record.attempts
+    totals["prompt_tokens"] += record.prompt_tokens
+    totals["completion_tokens"] += record.completion_tokens
+    totals["cached_tokens"] += record.cached_tokens
+    totals["estimated_token_calls"] += bool(record.attempts) and record.token_source == "estimate"
+    totals["retries"] += record.retries
+    totals["queue_wait"] += record.queue_wait
+    totals["latency"] += record.latency
+    totals["cost"] += record.cost or 0.0
+
+class CallMetrics:
+    """In-process aggregation of call records per stage/template and per model"""
+
+    def __init__(self, enabled: bool = LLM_METRICS_ENABLED, recent: int = LLM_METRICS_RECENT):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset(recent)
+
+    def reset(self, recent: int = None):
+        """Drop everything recorded so far, e.g. before measuring a change.
+
+        recent sets how many call records to keep (0 keeps none); by default the current limit is kept.
+        """
+        with self._lock:
+            if recent is None:
+                current = getattr(self, "recent", None)
+                recent = current.maxlen if current is not None else LLM_METRICS_RECENT
+            self.totals = _totals()
+            self.templates: Dict[str, TemplateMetrics] = {}
+            self.models: Dict[str, Dict[str, Any]] = {}
+            self.recent = deque(maxlen=recent)
+
+    def record(self, record: CallRecord):
+        if not self.enabled:
+            return
+        with self._lock:
+            _accumulate(self.totals, record)
+            self.templates.setdefault(record.stage, TemplateMetrics()).add(record)
+            if record.model:
+                _accumulate(self.models.setdefault(record.model, _totals()), record)
+            self.recent.append(record)
+
+    def records(self, stage: str = None, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """Most recent call records, optionally for one stage (or stage family); limit=None returns them all"""
+        if limit is not None and limit <= 0:
+            return []
+        with self._lock:
+            records = [
+                r for r in self.recent
+                if stage is None or r.stage == stage or r.stage.split(":", 1)[0] == stage
+            ]
+        return [r.as_dict() for r in (records if limit is None else records[-limit:])]
+
+    def stats(self, stage: str = None) -> Dict[str, Any]:
+        """Totals, per-model totals and per-template histograms (optionally for one stage family)"""
+        with self._lock:
+            templates = {
+                name: metrics.snapshot() for name, metrics in self.templates.items()
+                if stage is None or name == stage or name.split(":", 1)[0] == stage
+            }
+            stats = {
+                "enabled": self.enabled,
+                "totals": dict(self.totals),
+                "models": {model: dict(totals) for model, totals in self.models.items()}
+            }
+        stats["templates"] = templates
+        return stats
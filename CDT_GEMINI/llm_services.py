@@ -1,11 +1,36 @@
 import os
+import re
+import hashlib
 import time
+import asyncio
 import logging
-from typing import Dict, Any, Union
+import functools
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Dict, Any, Optional, Union, Tuple
+from urllib.parse import urlparse
+import httpx
+import openai
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
+from llm_cache import LLMResponseCache, make_cache_key, LLM_CACHE_ENABLED
+from single_flight import SingleFlight
+from rate_limiter import rate_limiter, is_retryable, backoff_delay, estimate_tokens
+from hedging import Hedger
+from model_config import ModelConfig, stage_config
+from llm_batch import BatchCollector, LLM_BATCH_MODE
+from circuit_breaker import BreakerRegistry, CircuitOpenError
+from structured_output import (
+    StageResult, StructuredOutputError, StructuredOutputStats, schema_for_stage, use_structured_output,
+    response_format, with_schema_instructions, repair_prompt, parse_structured
+)
+from llm_metrics import CallMetrics, CallRecord, CACHE_HIT, CACHE_BYPASS, COALESCED
+from prompt_layout import SplitPrompt, PromptCacheStats, split_template, split_content, cached_tokens, LLM_PROMPT_LAYOUT
+from deadline import DeadlineExceeded, capped_timeout, time_left, degrade
 
 # Basic logging configuration
 logging.basicConfig(level=logging.INFO)
@@ -14,93 +39,551 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# A raw prompt string, a ready-made message dict, or a template split into static prefix and inputs
+Prompt = Union[str, Dict, SplitPrompt]
+
 # OpenRouter configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo-0613")
 OPENROUTER_TEMPERATURE = float(os.getenv("OPENROUTER_TEMPERATURE", "0.0"))
 OPENROUTER_SITE_URL = os.getenv("OPENROUTER_SITE_URL", "")
 OPENROUTER_SITE_NAME = os.getenv("OPENROUTER_SITE_NAME", "")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 DEFAULT_TEMP = 0.0
 
+# HTTP connection pool configuration for the async clients
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "100"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+# Only deterministic calls are cached; raise to also cache sampled responses
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.0"))
+# Coalesce identical deterministic prompts that are in flight at the same time
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+# Completion tokens reserved per call when budgeting tokens-per-minute
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "512"))
+
+# Event loop each thread reuses for blocking entry points
+_blocking_loops = threading.local()
+
+def run_sync(coroutine):
+    """Run a coroutine to completion from synchronous code (scripts, CLIs, worker threads)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coroutine.close()
+        raise RuntimeError("Blocking entry point called inside a running event loop; await the async variant instead")
+    loop = getattr(_blocking_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _blocking_loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coroutine)
+
+def blocking(async_function):
+    """Synchronous entry point for an ``*_async`` function or method, run through run_sync"""
+    @functools.wraps(async_function)
+    def call(*args, **kwargs):
+        return run_sync(async_function(*args, **kwargs))
+    call.__name__ = async_function.__name__.removesuffix("_async")
+    call.__qualname__ = async_function.__qualname__.removesuffix("_async")
+    return call
+
 class LLMService:
-    def __init__(self, temperature=DEFAULT_TEMP, max_retries=3, 
-                 retry_delay=2, model=OPENROUTER_MODEL):
+    def __init__(self, temperature=DEFAULT_TEMP, max_retries=3,
+                 retry_delay=2, model=OPENROUTER_MODEL, pool_size=LLM_POOL_SIZE,
+                 http2=LLM_HTTP2, timeout=LLM_REQUEST_TIMEOUT, cache=None):
         if not OPENROUTER_API_KEY:
             raise ValueError("OpenRouter API key not found in environment variables")
-        
+
         self.temperature = temperature
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.model = model
-        self._initialize_client()
-    
-    def _initialize_client(self):
-        try:
-            self.client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=OPENROUTER_API_KEY
+        self.pool_size = pool_size
+        self.http2 = http2
+        self.timeout = timeout
+        # Pooled connections belong to the loop that opened them, so each loop (the app's, or the
+        # one a blocking caller's thread runs) gets its own client
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.cache = cache if cache is not None else (LLMResponseCache() if LLM_CACHE_ENABLED else None)
+        self.single_flight = SingleFlight() if LLM_SINGLE_FLIGHT else None
+        self.rate_limiter = rate_limiter
+        self.hedger = Hedger()
+        self.batcher = BatchCollector() if LLM_BATCH_MODE else None
+        self.breakers = BreakerRegistry()
+        self.structured = StructuredOutputStats()
+        self.prompt_cache = PromptCacheStats()
+        self.metrics = CallMetrics()
+        # Models that rejected a response_format; they get schema instructions only
+        self._no_response_format = set()
+        self.provider = urlparse(OPENROUTER_BASE_URL).netloc or OPENROUTER_BASE_URL
+        logger.info(f"Initialized OpenRouter with model: {self.model} (temp: {self.temperature})")
+
+    def _http_settings(self) -> Dict[str, Any]:
+        """Connection pool, protocol and timeout settings for the httpx clients"""
+        return {
+            "http2": self.http2,
+            "limits": httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=min(LLM_KEEPALIVE_CONNECTIONS, self.pool_size),
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            "timeout": httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT)
+        }
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Return the pooled async client for the running event loop, creating it if needed"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncOpenAI(
+                base_url=OPENROUTER_BASE_URL,
+                api_key=OPENROUTER_API_KEY,
+                max_retries=0,
+                http_client=httpx.AsyncClient(**self._http_settings())
             )
-            logger.info(f"Initialized OpenRouter with model: {self.model} (temp: {self.temperature})")
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenRouter: {e}")
-            raise ValueError(f"Failed to initialize client: {e}")
-    
+            logger.info(f"Initialized async OpenRouter client (pool size: {self.pool_size}, http2: {self.http2})")
+        return client
+
     def set_model(self, model_name: str):
         if model_name and model_name != self.model:
             self.model = model_name
             logger.info(f"Updated model to: {model_name}")
             return True
         return False
-    
+
     def set_temperature(self, temperature: float):
         if temperature is not None and temperature != self.temperature:
             self.temperature = temperature
             logger.info(f"Updated temperature to: {temperature}")
             return True
         return False
-    
-    def generate_response(self, prompt: Union[str, Dict], image_url: str = None):
-        for attempt in range(self.max_retries + 1):
+
+    def _build_messages(self, prompt: Prompt, image_url: str = None, model: str = None) -> list:
+        """Build the chat-completions message list for a prompt"""
+        messages = []
+        if isinstance(prompt, (str, SplitPrompt)):
+            if isinstance(prompt, SplitPrompt):
+                # Static prefix first so the provider can reuse its cached prefix across calls
+                content = split_content(prompt, model)
+            else:
+                content = [{"type": "text", "text": prompt}]
+            if image_url:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {"url": image_url}
+                })
+            messages.append({"role": "user", "content": content})
+        elif isinstance(prompt, dict):
+            messages.append(prompt)
+        return messages
+
+    def default_config(self) -> ModelConfig:
+        """The service-wide defaults that stage and per-call configs are layered on"""
+        return ModelConfig(model=self.model, temperature=self.temperature, timeout=self.timeout)
+
+    def resolve_config(self, stage: str = None, config: ModelConfig = None) -> ModelConfig:
+        """Service defaults, overlaid with the stage's table entry, overlaid with the caller's config"""
+        resolved = self.default_config().merged(stage_config(stage))
+        return resolved.merged(config) if config else resolved
+
+    def _request_kwargs(self, prompt: Prompt, image_url: str, config: ModelConfig) -> Dict[str, Any]:
+        """Keyword arguments for a chat-completions request"""
+        kwargs = {
+            "model": config.model,
+            "messages": self._build_messages(prompt, image_url, config.model),
+            "temperature": config.temperature,
+            "timeout": config.timeout,
+            "extra_headers": {
+                "HTTP-Referer": OPENROUTER_SITE_URL,
+                "X-Title": OPENROUTER_SITE_NAME
+            }
+        }
+        if config.max_tokens:
+            kwargs["max_tokens"] = config.max_tokens
+        if config.response_format:
+            kwargs["response_format"] = config.response_format
+        return kwargs
+
+    def _batch_body(self, prompt: Prompt, image_url: str, config: ModelConfig) -> Dict[str, Any]:
+        """Request body for one line of a batch file"""
+        body = {
+            "model": config.model,
+            "messages": self._build_messages(prompt, image_url, config.model),
+            "temperature": config.temperature
+        }
+        if config.max_tokens:
+            body["max_tokens"] = config.max_tokens
+        if config.response_format:
+            body["response_format"] = config.response_format
+        return body
+
+    def enable_batch_mode(self, collector: BatchCollector = None) -> BatchCollector:
+        """Route every call through offline batches until disable_batch_mode is called"""
+        self.batcher = collector or BatchCollector()
+        logger.info(f"LLM batch mode enabled ({type(self.batcher.backend).__name__})")
+        return self.batcher
+
+    def disable_batch_mode(self):
+        self.batcher = None
+
+    def _request_key(self, prompt: Prompt, image_url: str, config: ModelConfig):
+        """Content hash of a deterministic request, or None for sampled (temperature > 0) requests"""
+        if config.temperature > LLM_CACHE_MAX_TEMPERATURE:
+            return None
+        return make_cache_key(
+            config.model, config.temperature,
+            [self._build_messages(prompt, image_url, config.model), config.max_tokens, config.response_format]
+        )
+
+    def _prompt_text(self, prompt: Prompt) -> str:
+        if isinstance(prompt, SplitPrompt):
+            return prompt.text()
+        return prompt if isinstance(prompt, str) else str(prompt.get("content", ""))
+
+    def _estimate_request_tokens(self, prompt: Prompt, config: ModelConfig) -> int:
+        """Prompt tokens plus an allowance for the completion, for tokens-per-minute budgeting"""
+        return estimate_tokens(self._prompt_text(prompt)) + (config.max_tokens or LLM_COMPLETION_TOKEN_ESTIMATE)
+
+    def _handle_failure(self, error: Exception, attempt: int) -> float:
+        """Raise if error is final, otherwise return how long to back off before retrying"""
+        if not is_retryable(error):
+            logger.error(f"Non-retryable LLM error: {error}")
+            raise Exception(f"Non-retryable error: {error}") from error
+        if attempt >= self.max_retries:
+            raise Exception(f"Failed after {self.max_retries} attempts: {error}") from error
+        delay = backoff_delay(error, attempt, self.retry_delay)
+        logger.warning(f"Attempt {attempt + 1} failed: {error}. Retrying in {delay:.1f}s...")
+        return delay
+
+    def _model_chain(self, config: ModelConfig):
+        """Yield (config, breaker) for the requested model and then its fallbacks, skipping open circuits"""
+        for index, model in enumerate(self.breakers.fallback_chain(config.model)):
+            breaker = self.breakers.get(self.provider, model)
+            if self.breakers.enabled and not breaker.allow():
+                self.breakers.count("short_circuited")
+                continue
+            if index:
+                self.breakers.count("fallbacks")
+                logger.warning(f"Falling back from {config.model} to {model}")
+            yield config.merged(ModelConfig(model=model)), breaker
+
+    def _record_attempt(self, breaker, error: Exception = None):
+        """Feed a call outcome to its breaker; only provider-side failures count against it"""
+        if not self.breakers.enabled:
+            return
+        if error is None:
+            breaker.record_success()
+        elif is_retryable(error):
+            breaker.record_failure()
+
+    def _failover_error(self, error: Exception) -> bool:
+        """Whether a failed model should be abandoned for the next model in its chain"""
+        if isinstance(error, DeadlineExceeded):
+            return False
+        return is_retryable(error.__cause__ or error)
+
+    def _bounded(self, config: ModelConfig, call: CallRecord) -> Tuple[ModelConfig, bool]:
+        """config with its timeout cut to the request's remaining budget, and whether it was cut"""
+        try:
+            timeout = capped_timeout(config.timeout)
+        except DeadlineExceeded as e:
+            degrade(call.stage, str(e))
+            raise
+        if timeout == config.timeout:
+            return config, False
+        return config.merged(ModelConfig(timeout=timeout)), True
+
+    def _deadline_error(self, error: Exception, call: CallRecord) -> DeadlineExceeded:
+        """Record a call abandoned because the request's budget ran out"""
+        reason = f"Request deadline reached: {error}"
+        degrade(call.stage, reason)
+        return DeadlineExceeded(reason)
+
+    def _retry_delay(self, error: Exception, attempt: int, call: CallRecord, capped: bool) -> float:
+        """Backoff before the next attempt; raises when the error is final or the budget can't cover the retry"""
+        if capped and isinstance(error, openai.APITimeoutError):
+            raise self._deadline_error(error, call) from error
+        delay = self._handle_failure(error, attempt)
+        left = time_left()
+        if left is not None and delay >= left:
+            raise self._deadline_error(error, call) from error
+        return delay
+
+    def _record_usage(self, call: CallRecord, prompt: Prompt, config: ModelConfig, response, content: str,
+                      latency: float):
+        """Add a provider response's tokens, prompt-cache hits and latency to the call's record"""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            cached = cached_tokens(usage)
+            call.cached_tokens += cached
+            self.prompt_cache.record(call.stage, usage.prompt_tokens or 0, cached, latency)
+        call.add_usage(config.model, usage, self._prompt_text(prompt), content)
+        call.provider_latency += latency
+
+    async def _complete_async(self, prompt: Prompt, image_url: str, config: ModelConfig,
+                              call: CallRecord) -> Tuple[str, str]:
+        if self.batcher is not None:
+            start = time.monotonic()
+            call.attempts += 1
+            result = await asyncio.wrap_future(self.batcher.submit(self._batch_body(prompt, image_url, config)))
+            self._record_usage(call, prompt, config, None, result, time.monotonic() - start)
+            return result, config.model
+        last_error = None
+        for model_config, breaker in self._model_chain(config):
             try:
-                messages = []
-                if isinstance(prompt, str):
-                    content = [{"type": "text", "text": prompt}]
-                    if image_url:
-                        content.append({
-                            "type": "image_url",
-                            "image_url": {"url": image_url}
-                        })
-                    messages.append({"role": "user", "content": content})
-                elif isinstance(prompt, dict):
-                    messages.append(prompt)
-                
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=self.temperature,
-                    extra_headers={
-                        "HTTP-Referer": OPENROUTER_SITE_URL,
-                        "X-Title": OPENROUTER_SITE_NAME
-                    }
+                return (
+                    await self._complete_model_async(prompt, image_url, model_config, breaker, call),
+                    model_config.model
                 )
-                return response.choices[0].message.content.strip()
             except Exception as e:
-                if attempt < self.max_retries:
-                    logger.warning(f"Attempt {attempt + 1} failed: {e}. Retrying...")
-                    time.sleep(self.retry_delay)
+                if not self._failover_error(e):
+                    raise
+                last_error = e
+        raise CircuitOpenError(f"No available model for {config.model}: {last_error or 'all circuits open'}") from last_error
+
+    async def _complete_model_async(self, prompt: Prompt, image_url: str, config: ModelConfig,
+                                    breaker, call: CallRecord) -> str:
+        client = self._get_async_client()
+        tokens = self._estimate_request_tokens(prompt, config)
+        for attempt in range(self.max_retries + 1):
+            attempt_config, capped = self._bounded(config, call)
+            try:
+                async with self.rate_limiter.acquire_async(config.model, tokens) as waited:
+                    call.queue_wait += waited
+                    call.attempts += 1
+                    start = time.monotonic()
+                    response = await client.chat.completions.create(
+                        **self._request_kwargs(prompt, image_url, attempt_config)
+                    )
+            except Exception as e:
+                if not (capped and isinstance(e, openai.APITimeoutError)):
+                    self._record_attempt(breaker, e)
+                if self.breakers.enabled and breaker.is_open:
+                    raise CircuitOpenError(f"Circuit opened for {config.model}: {e}") from e
+                await asyncio.sleep(self._retry_delay(e, attempt, call, capped))
+                call.retries += 1
+                continue
+            self._record_attempt(breaker)
+            content = response.choices[0].message.content.strip()
+            self._record_usage(call, prompt, config, response, content, time.monotonic() - start)
+            return content
+
+    def _template_id(self, prompt_template: Union[str, PromptTemplate]) -> str:
+        """Stable identifier for a prompt template, used to group latency history"""
+        text = prompt_template if isinstance(prompt_template, str) else prompt_template.template
+        return "template-" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+    @contextmanager
+    def _accounted(self, stage: str, config: ModelConfig, cache_key):
+        """Yield the CallRecord for one generate_response call and add it to the metrics when the call ends"""
+        call = CallRecord(stage=stage or "default", requested_model=config.model)
+        if not cache_key:
+            call.cache = CACHE_BYPASS
+        start = time.monotonic()
+        try:
+            yield call
+        except Exception as e:
+            call.error = str(e)
+            raise
+        finally:
+            call.latency = time.monotonic() - start
+            if call.cache != CACHE_HIT and not call.attempts and call.error is None:
+                # Answered by another caller's identical in-flight request
+                call.cache = COALESCED
+            self.metrics.record(call)
+
+    async def generate_response_async(self, prompt: Prompt, image_url: str = None, use_cache: bool = True,
+                                      stage: str = None, config: ModelConfig = None):
+        """Run one completion. The model settings come from the stage table and config,
+        never from mutable service state shared with concurrent callers.
+
+        Slow calls may be hedged (see hedging.py); stage groups their latency history.
+        """
+        config = self.resolve_config(stage, config)
+        key = self._request_key(prompt, image_url, config)
+        cache_key = key if use_cache and self.cache else None
+        with self._accounted(stage, config, cache_key) as call:
+            if cache_key:
+                cached = await self.cache.get_async(cache_key)
+                if cached is not None:
+                    call.cache = CACHE_HIT
+                    return cached
+
+            async def fetch():
+                if self.batcher is not None:
+                    # Hedging a call that waits on a batch would only submit it twice
+                    result, model = await self._complete_async(prompt, image_url, config, call)
                 else:
-                    raise Exception(f"Failed after {self.max_retries} attempts: {e}")
-    
-    def invoke_chain(self, prompt_template: Union[str, PromptTemplate], inputs: Dict[str, Any]):
+                    result, model = await self.hedger.run(
+                        stage or "default", lambda: self._complete_async(prompt, image_url, config, call)
+                    )
+                if cache_key and model == config.model:
+                    await self.cache.set_async(cache_key, result, config.model)
+                return result
+
+            if key and self.single_flight:
+                return await self.single_flight.do_async(key, fetch)
+            return await fetch()
+
+    generate_response = blocking(generate_response_async)
+
+    def _structured_request(self, prompt: Prompt, stage: str, config: ModelConfig, schema):
+        """Prompt and config for a structured call, honouring models that rejected response_format"""
+        config = self.resolve_config(stage, config)
+        if config.model not in self._no_response_format:
+            config = config.merged(ModelConfig(response_format=response_format(schema)))
+        if isinstance(prompt, SplitPrompt):
+            # The schema is the same for every call of a stage, so it belongs to the cacheable prefix
+            return replace(prompt, static=with_schema_instructions(prompt.static, schema)), config
+        return with_schema_instructions(prompt, schema), config
+
+    def _repair_prompt(self, prompt: Prompt, answer: str, error: Exception) -> Prompt:
+        if isinstance(prompt, SplitPrompt):
+            return replace(prompt, dynamic=repair_prompt(prompt.dynamic, answer, error))
+        return repair_prompt(prompt, answer, error)
+
+    def _rejected_response_format(self, error: Exception, config: ModelConfig) -> bool:
+        """Whether error is the provider refusing response_format; if so, stop sending it to that model"""
+        cause = error.__cause__
+        if not config.response_format or not isinstance(cause, openai.BadRequestError):
+            return False
+        # Other bad requests (context length, bad model id, ...) are not a reason to drop the schema
+        detail = f"{cause.message} {cause.body}".lower()
+        if "response_format" not in detail and "json_schema" not in detail:
+            return False
+        logger.warning(f"{config.model} rejected response_format, using schema instructions only: {error}")
+        self._no_response_format.add(config.model)
+        self.structured.count("provider_downgrades")
+        return True
+
+    async def _validate_structured_async(self, prompt: Prompt, answer: str, image_url: str, config: ModelConfig,
+                                         schema):
+        """Parse an answer, returning (result, None) or (None, error) after forgetting the bad answer"""
+        try:
+            return parse_structured(answer, schema), None
+        except StructuredOutputError as e:
+            key = self._request_key(prompt, image_url, config)
+            if key and self.cache:
+                await self.cache.delete_async(key)
+            return None, e
+
+    async def generate_structured_async(self, prompt: Prompt, stage: str, config: ModelConfig = None,
+                                        image_url: str = None, schema=None) -> StageResult:
+        """Run a completion that must answer with JSON for the stage's schema and return the typed result.
+
+        An invalid answer gets one repair attempt that quotes the validation errors;
+        if that also fails, StructuredOutputError is raised.
+        """
+        schema = schema or schema_for_stage(stage)
+        if schema is None:
+            raise ValueError(f"No output schema for stage {stage}")
+        self.structured.count("calls")
+        structured_prompt, structured_config = self._structured_request(prompt, stage, config, schema)
+        try:
+            answer = await self.generate_response_async(
+                structured_prompt, image_url, stage=stage, config=structured_config
+            )
+        except Exception as e:
+            if not self._rejected_response_format(e, structured_config):
+                raise
+            structured_config = replace(structured_config, response_format=None)
+            answer = await self.generate_response_async(
+                structured_prompt, image_url, stage=stage, config=structured_config
+            )
+
+        result, error = await self._validate_structured_async(structured_prompt, answer, image_url, structured_config, schema)
+        if result is not None:
+            self.structured.count("valid")
+            return result
+
+        logger.warning(f"Invalid structured answer for {stage}, repairing: {error}")
+        fix_prompt = self._repair_prompt(structured_prompt, answer, error)
+        answer = await self.generate_response_async(fix_prompt, image_url, stage=stage, config=structured_config)
+        result, error = await self._validate_structured_async(fix_prompt, answer, image_url, structured_config, schema)
+        if result is None:
+            self.structured.count("failed")
+            raise StructuredOutputError(f"Invalid {schema.__name__} answer for {stage} after repair: {error}")
+        self.structured.count("repaired")
+        return result
+
+    generate_structured = blocking(generate_structured_async)
+
+    def _format_chain_prompt(self, prompt_template: Union[str, PromptTemplate], inputs: Dict[str, Any]) -> Prompt:
+        """Format a prompt template (or raw template string) with the given inputs.
+
+        In the split layout the inputs are moved behind the template's static text (see prompt_layout.py).
+        """
         if isinstance(prompt_template, str):
-            import re
             variables = list(set(re.findall(r'\{([^{}]*)\}', prompt_template)))
             prompt_template = PromptTemplate(
                 template=prompt_template,
                 input_variables=variables
             )
-        formatted_prompt = prompt_template.format(**inputs)
-        return self.generate_response(formatted_prompt)
+        if LLM_PROMPT_LAYOUT == "split" and inputs:
+            return split_template(prompt_template, inputs)
+        return prompt_template.format(**inputs)
+
+    async def invoke_chain_async(self, prompt_template: Union[str, PromptTemplate], inputs: Dict[str, Any],
+                                 stage: str = None, config: ModelConfig = None) -> Union[str, StageResult]:
+        """Run a prompt template; structured stages get their validated StageResult instead of text"""
+        formatted_prompt = self._format_chain_prompt(prompt_template, inputs)
+        if use_structured_output(stage):
+            return await self.generate_structured_async(formatted_prompt, stage, config)
+        return await self.generate_response_async(
+            formatted_prompt, stage=stage or self._template_id(prompt_template), config=config
+        )
+
+    invoke_chain = blocking(invoke_chain_async)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Response cache hit/miss counters"""
+        return self.cache.stats() if self.cache else {"enabled": False}
+
+    def single_flight_stats(self) -> Dict[str, Any]:
+        """How many calls led a flight and how many were coalesced onto one"""
+        return self.single_flight.stats() if self.single_flight else {"enabled": False}
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        """Queue-wait time and in-flight counts from the shared rate limiter"""
+        return self.rate_limiter.stats()
+
+    def hedging_stats(self) -> Dict[str, Any]:
+        """Hedges fired and won, plus per-template latency percentiles"""
+        return self.hedger.stats()
+
+    def breaker_stats(self) -> Dict[str, Any]:
+        """Circuit breaker states, recent transitions and fallback counts"""
+        return self.breakers.stats()
+
+    def structured_stats(self) -> Dict[str, Any]:
+        """Structured answers that validated first time, needed a repair, or failed"""
+        return self.structured.stats()
+
+    def prompt_cache_stats(self) -> Dict[str, Any]:
+        """Per-template prompt tokens served from the provider's prompt cache, and the latency difference"""
+        return self.prompt_cache.stats()
+
+    def call_stats(self, stage: str = None) -> Dict[str, Any]:
+        """Per-call accounting: totals, per-model totals and per-template histograms"""
+        return self.metrics.stats(stage)
+
+    def call_records(self, stage: str = None, limit: Optional[int] = 100) -> list:
+        """The most recent call records, newest last"""
+        return self.metrics.records(stage, limit)
+
+    def batch_stats(self) -> Dict[str, Any]:
+        """Requests and batches submitted in batch mode"""
+        return self.batcher.stats() if self.batcher else {"enabled": False}
+
+    async def aclose(self):
+        """Close the pooled connections held by the running loop's async client"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
 
 # Singleton instance
 llm_service = LLMService()
@@ -110,13 +593,76 @@ def get_service():
     return llm_service
 
 def set_model(model_name: str):
+    """Change the default model; stages with their own model are unaffected"""
     return llm_service.set_model(model_name)
 
 def set_temperature(temperature: float):
+    """Change the default temperature; per-call configs still take precedence"""
     return llm_service.set_temperature(temperature)
 
-def generate_response(prompt: Union[str, Dict], image_url: str = None):
-    return llm_service.generate_response(prompt, image_url)
+def generate_response(prompt: Prompt, image_url: str = None, use_cache: bool = True, stage: str = None,
+                      config: ModelConfig = None):
+    return llm_service.generate_response(prompt, image_url, use_cache, stage, config)
+
+async def generate_response_async(prompt: Prompt, image_url: str = None, use_cache: bool = True,
+                                  stage: str = None, config: ModelConfig = None):
+    return await llm_service.generate_response_async(prompt, image_url, use_cache, stage, config)
+
+def invoke_chain(prompt_template: Union[str, PromptTemplate], inputs: Dict[str, Any], stage: str = None,
+                 config: ModelConfig = None):
+    return llm_service.invoke_chain(prompt_template, inputs, stage, config)
+
+async def invoke_chain_async(prompt_template: Union[str, PromptTemplate], inputs: Dict[str, Any], stage: str = None,
+                             config: ModelConfig = None):
+    return await llm_service.invoke_chain_async(prompt_template, inputs, stage, config)
+
+def get_stage_config(stage: str) -> ModelConfig:
+    return llm_service.resolve_config(stage)
+
+def get_cache_stats():
+    return llm_service.cache_stats()
+
+def get_single_flight_stats():
+    return llm_service.single_flight_stats()
+
+def get_rate_limit_stats():
+    return llm_service.rate_limit_stats()
+
+def get_hedging_stats():
+    return llm_service.hedging_stats()
+
+def enable_batch_mode(collector: BatchCollector = None) -> BatchCollector:
+    return llm_service.enable_batch_mode(collector)
+
+def disable_batch_mode():
+    return llm_service.disable_batch_mode()
+
+def get_breaker_stats():
+    return llm_service.breaker_stats()
+
+def generate_structured(prompt: Prompt, stage: str, config: ModelConfig = None, image_url: str = None):
+    return llm_service.generate_structured(prompt, stage, config, image_url)
+
+async def generate_structured_async(prompt: Prompt, stage: str, config: ModelConfig = None, image_url: str = None):
+    return await llm_service.generate_structured_async(prompt, stage, config, image_url)
+
+def get_structured_stats():
+    return llm_service.structured_stats()
+
+def get_prompt_cache_stats():
+    return llm_service.prompt_cache_stats()
+
+def get_call_stats(stage: str = None):
+    return llm_service.call_stats(stage)
+
+def get_call_records(stage: str = None, limit: int = 100):
+    return llm_service.call_records(stage, limit)
+
+def reset_call_stats():
+    llm_service.metrics.reset()
+
+def get_batch_stats():
+    return llm_service.batch_stats()
 
 def process_prompt(prompt_template: Union[str, PromptTemplate], inputs: Dict[str, Any]):
-    return llm_service.process_prompt(prompt_template, inputs)
\ No newline at end of file
+    return llm_service.process_prompt(prompt_template, inputs)
@@ -0,0 +1,347 @@
+"""
+Local stand-in for the chat-completions endpoint LLMService talks to, for
+benchmarks and load tests that must not spend real tokens.
+
+Responses are canned but follow the output format of the prompt that was sent
+(cleaner, CDT/ICD classifiers, topics, subtopics, ICD topics, questioner and
+inspectors), and pick codes that appear in the prompt itself, so the whole
+pipeline parses them. Latency, error rate and 429s are configurable.
+
+Run it and point the service at it:
+    python llm_stub_server.py --port 8765
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 python app.py
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Latency distribution: "lognormal", "exponential", "uniform" or "fixed"
+LLM_STUB_LATENCY = os.getenv("LLM_STUB_LATENCY", "lognormal")
+LLM_STUB_LATENCY_MEDIAN = float(os.getenv("LLM_STUB_LATENCY_MEDIAN", "0.8"))
+# Spread: sigma for lognormal, +/- fraction of the median for uniform
+LLM_STUB_LATENCY_SPREAD = float(os.getenv("LLM_STUB_LATENCY_SPREAD", "0.5"))
+# Per-template overrides, e.g. {"subtopic": {"median": 2.0}, "cleaner": {"distribution": "fixed", "median": 0.3}}
+LLM_STUB_TEMPLATE_LATENCY = json.loads(os.getenv("LLM_STUB_TEMPLATE_LATENCY", "{}"))
+# Fraction of requests answered with a 5xx / a 429
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+LLM_STUB_RATE_LIMIT_RATE = float(os.getenv("LLM_STUB_RATE_LIMIT_RATE", "0"))
+# Requests per second above which every request gets a 429 (0 disables)
+LLM_STUB_RPS = float(os.getenv("LLM_STUB_RPS", "0"))
+LLM_STUB_RETRY_AFTER = float(os.getenv("LLM_STUB_RETRY_AFTER", "1"))
+LLM_STUB_SEED = os.getenv("LLM_STUB_SEED", "0")
+# Fraction of structured (JSON) answers cut short, to exercise validation and repair
+LLM_STUB_INVALID_JSON_RATE = float(os.getenv("LLM_STUB_INVALID_JSON_RATE", "0"))
+# Prompt-cache simulation: a repeated first content part of at least this many tokens is reported as cached
+LLM_STUB_PROMPT_CACHE_MIN_TOKENS = int(os.getenv("LLM_STUB_PROMPT_CACHE_MIN_TOKENS", "1024"))
+# Fraction of the latency removed when the whole prompt is served from the cache
+LLM_STUB_CACHE_LATENCY_SAVING = float(os.getenv("LLM_STUB_CACHE_LATENCY_SAVING", "0.5"))
+
+CDT_CODE = re.compile(r"\bD\d{4}\b")
+CDT_RANGE = re.compile(r"\bD\d{4}\s*-\s*D\d{4}\b")
+ICD_CODE = re.compile(r"\b[A-Z]\d{2}(?:\.[0-9A-Z]{1,4})?\b")
+ICD_CATEGORY = re.compile(r"^(\d{1,2})\. ([^\n(]+)", re.M)
+
+def _section(text: str, start: str, end: Optional[str] = None) -> str:
+    """The part of text between the start and end markers ("" if start is missing)"""
+    index = text.find(start)
+    if index < 0:
+        return ""
+    rest = text[index + len(start):]
+    if end and end in rest:
+        rest = rest[:rest.find(end)]
+    return rest
+
+def _unique(items: List[str]) -> List[str]:
+    return list(dict.fromkeys(item.replace(" ", "") for item in items))
+
+def _pick(rng: random.Random, options: List[str], most: int) -> List[str]:
+    if not options:
+        return []
+    return rng.sample(options, rng.randint(1, min(most, len(options))))
+
+def detect_template(prompt: str) -> str:
+    """Which pipeline stage a prompt belongs to, judged by its output-format instructions"""
+    if "CDT_QUESTIONS:" in prompt:
+        return "questioner"
+    if "REJECTED CODES:" in prompt:
+        return "cdt_inspector"
+    if "CODES:" in prompt and "ICD-10-CM" in prompt and "Topic Analysis" in prompt:
+        return "icd_inspector"
+    if "CODE_RANGE:" in prompt:
+        return "cdt_classifier"
+    if "CATEGORY:" in prompt and "ICD-10-CM CATEGORIES" in prompt:
+        return "icd_classifier"
+    if "CODE RANGE:" in prompt:
+        return "topic"
+    if "CODE: [exact CDT code" in prompt:
+        return "subtopic"
+    if "CODE: [specific ICD-10 code" in prompt:
+        return "icd_topic"
+    if "INPUT SCENARIO:" in prompt:
+        return "cleaner"
+    return "generic"
+
+def template_answer(prompt: str, template: str = None) -> Dict[str, Any]:
+    """The canned decision for a prompt: template name plus the ranges, codes or category picked"""
+    template = template or detect_template(prompt)
+    # Seeded by the prompt so the same request always gets the same answer
+    rng = random.Random(hashlib.sha256(f"{LLM_STUB_SEED}:{prompt}".encode("utf-8")).hexdigest())
+    answer: Dict[str, Any] = {"template": template}
+
+    if template == "cleaner":
+        answer["scenario"] = _section(prompt, "INPUT SCENARIO:", "\n\n").strip() or prompt[-500:].strip()
+    elif template == "cdt_classifier":
+        answer["ranges"] = _pick(rng, _unique(CDT_RANGE.findall(prompt)), 3)
+    elif template == "icd_classifier":
+        categories = ICD_CATEGORY.findall(_section(prompt, "ICD-10-CM CATEGORIES", "# SCENARIO"))
+        number, name = rng.choice(categories) if categories else ("1", "Dental Encounters")
+        answer["category"] = (int(number), name.strip())
+    elif template == "topic":
+        answer["ranges"] = _pick(rng, _unique(CDT_RANGE.findall(_section(prompt, "", "### **Scenario") or prompt)), 2)
+    elif template == "subtopic":
+        # Codes listed before the scenario, i.e. the subtopic's own code list
+        codes = _unique(CDT_CODE.findall(re.split(r"(?i)scenario:", prompt)[0])) or _unique(CDT_CODE.findall(prompt))
+        answer["codes"] = [rng.choice(codes)] if codes else []
+    elif template == "icd_topic":
+        answer["codes"] = _pick(rng, _unique(ICD_CODE.findall(_section(prompt, "", "Scenario:") or prompt)), 1)
+    elif template == "cdt_inspector":
+        analysis = _section(prompt, "Topic Analysis", "IMPORTANT: You must format") or prompt
+        codes = _unique(CDT_CODE.findall(analysis))
+        answer["codes"] = _pick(rng, codes, 4)
+        answer["rejected"] = [code for code in codes if code not in answer["codes"]][:2]
+    elif template == "icd_inspector":
+        analysis = _section(prompt, "Topic Analysis", "IMPORTANT: You must format") or prompt
+        codes = [code for code in _unique(ICD_CODE.findall(analysis)) if not code.startswith("D")]
+        answer["codes"] = _pick(rng, codes, 2)
+    return answer
+
+def template_response(prompt: str, template: str = None) -> str:
+    """Canned free-text answer in the format the given (or detected) template asks for"""
+    answer = template_answer(prompt, template)
+    template = answer["template"]
+
+    if template == "cleaner":
+        return f"Patient Information:\n{answer['scenario']}\n\nProcedures Performed:\nAs documented in the scenario.\n\nFollow-up:\nNone documented."
+    if template == "cdt_classifier":
+        return "\n\n".join(
+            f"CODE_RANGE: {code_range} - Stand-in Category\n\nEXPLANATION:\nThe scenario describes procedures in this range.\n\nDOUBT:\nNone"
+            for code_range in answer["ranges"]
+        )
+    if template == "icd_classifier":
+        number, name = answer["category"]
+        return f"EXPLANATION: The findings in the scenario fall under this category.\nDOUBT: None\nCATEGORY: {number}. {name}"
+    if template == "topic":
+        return (
+            "EXPLANATION: The scenario mentions procedures covered by these ranges.\n"
+            "DOUBT: None\n"
+            f"CODE RANGE: {', '.join(answer['ranges']) or 'none'}"
+        )
+    if template == "subtopic":
+        code = answer["codes"][0] if answer["codes"] else "none"
+        return f"EXPLANATION: {code} matches the procedure described in the scenario.\nDOUBT: None\nCODE: {code}"
+    if template == "icd_topic":
+        return (
+            f"CODE: {', '.join(answer['codes']) or 'none'}\n"
+            "EXPLANATION: The scenario documents this condition.\n"
+            "DOUBT: None"
+        )
+    if template == "questioner":
+        return (
+            "CDT_QUESTIONS:\nNone\nCDT_EXPLANATION: The scenario is specific enough for CDT coding.\n"
+            "ICD_QUESTIONS:\nNone\nICD_EXPLANATION: The scenario is specific enough for ICD coding."
+        )
+    if template == "cdt_inspector":
+        return (
+            "EXPLANATION: The accepted codes are supported by the scenario.\n"
+            f"CODES: {', '.join(answer['codes']) or 'none'}\n"
+            f"REJECTED CODES: {', '.join(answer['rejected']) or 'none'}"
+        )
+    if template == "icd_inspector":
+        return (
+            f"CODES: {', '.join(answer['codes']) or 'none'}\n\n"
+            "EXPLANATION: The accepted codes are documented in the scenario."
+        )
+    return "OK"
+
+def structured_response(prompt: str, template: str = None) -> str:
+    """Canned JSON answer matching the stage schemas in structured_output.py"""
+    answer = template_answer(prompt, template)
+    template = answer["template"]
+    explanation = "Stand-in structured answer."
+    if template == "cdt_classifier":
+        data = {"code_ranges": [
+            {"code_range": code_range, "category": "Stand-in Category", "explanation": explanation, "doubt": ""}
+            for code_range in answer["ranges"]
+        ]}
+    elif template == "icd_classifier":
+        number, name = answer["category"]
+        data = {"categories": [{"category_number": number, "category_name": name, "explanation": explanation, "doubt": ""}]}
+    elif template == "topic":
+        data = {"code_ranges": answer["ranges"], "explanation": explanation, "doubt": ""}
+    elif template == "subtopic":
+        data = {"codes": [{"code": code, "explanation": explanation, "doubt": ""} for code in answer["codes"]]}
+    elif template == "icd_topic":
+        data = {"codes": answer["codes"], "explanation": explanation, "doubt": ""}
+    elif template == "questioner":
+        data = {"cdt_questions": [], "cdt_explanation": explanation, "icd_questions": [], "icd_explanation": explanation}
+    elif template == "cdt_inspector":
+        data = {"codes": answer["codes"], "rejected_codes": answer["rejected"], "explanation": explanation}
+    elif template == "icd_inspector":
+        data = {"codes": answer["codes"], "explanation": explanation}
+    else:
+        data = {"answer": "OK"}
+    return json.dumps(data)
+
+def prompt_text(messages: List[Dict[str, Any]]) -> str:
+    """Flatten chat messages (string or multi-part content) into one string"""
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if part.get("type") == "text")
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+def sample_latency(template: str, rng: random.Random = random) -> float:
+    """Draw a response delay from the configured (or per-template) distribution"""
+    settings = LLM_STUB_TEMPLATE_LATENCY.get(template, {})
+    distribution = settings.get("distribution", LLM_STUB_LATENCY)
+    median = float(settings.get("median", LLM_STUB_LATENCY_MEDIAN))
+    spread = float(settings.get("spread", LLM_STUB_LATENCY_SPREAD))
+    if distribution == "fixed":
+        return median
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(median * (1 - spread), median * (1 + spread)))
+    if distribution == "exponential":
+        return rng.expovariate(1 / median) if median > 0 else 0.0
+    return rng.lognormvariate(0, spread) * median
+
+class StubStats:
+    """Request counters per template and per status"""
+
+    def __init__(self):
+        self.templates = Counter()
+        self.statuses = Counter()
+        self.window: List[float] = []
+        self.prefixes = set()
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, template: str, status: int):
+        with self._lock:
+            self.templates[template] += 1
+            self.statuses[status] += 1
+
+    def over_rps(self, rps: float) -> bool:
+        """Record an arrival and report whether the last second exceeded rps"""
+        now = time.monotonic()
+        with self._lock:
+            self.window = [t for t in self.window if now - t < 1.0]
+            self.window.append(now)
+            return len(self.window) > rps
+
+    def cached_prefix_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Tokens of the leading content part if it was seen before, like a provider's prefix cache"""
+        content = messages[0].get("content") if messages else None
+        if not isinstance(content, list) or len(content) < 2:
+            return 0
+        prefix = content[0].get("text", "")
+        tokens = len(prefix) // 4
+        if tokens < LLM_STUB_PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        digest = hashlib.sha1(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest not in self.prefixes:
+                self.prefixes.add(digest)
+                return 0
+            # Providers cache in 128-token blocks
+            cached = tokens - tokens % 128
+            self.cached_tokens += cached
+            return cached
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"templates": dict(self.templates), "statuses": dict(self.statuses),
+                    "cached_prefixes": len(self.prefixes), "cached_tokens": self.cached_tokens}
+
+app = FastAPI(title="LLM stand-in server")
+stats = StubStats()
+
+def _error(status: int, message: str, headers: Dict[str, str] = None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "code": status}}, status_code=status, headers=headers)
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = prompt_text(body.get("messages", []))
+    template = detect_template(prompt)
+
+    if LLM_STUB_RPS and stats.over_rps(LLM_STUB_RPS) or random.random() < LLM_STUB_RATE_LIMIT_RATE:
+        stats.record(template, 429)
+        return _error(429, "Rate limit exceeded", {"retry-after": str(LLM_STUB_RETRY_AFTER)})
+
+    prompt_tokens = max(1, len(prompt) // 4)
+    cached_tokens = stats.cached_prefix_tokens(body.get("messages", []))
+    await asyncio.sleep(sample_latency(template) * (1 - LLM_STUB_CACHE_LATENCY_SAVING * cached_tokens / prompt_tokens))
+
+    if random.random() < LLM_STUB_ERROR_RATE:
+        stats.record(template, 503)
+        return _error(503, "Stand-in upstream error")
+
+    if body.get("response_format") or "matches this JSON schema" in prompt:
+        content = structured_response(prompt, template)
+        if random.random() < LLM_STUB_INVALID_JSON_RATE:
+            content = content[:len(content) // 2]
+    else:
+        content = template_response(prompt, template)
+    completion_tokens = max(1, len(content) // 4)
+    stats.record(template, 200)
+    return {
+        "id": f"chatcmpl-stub-{hashlib.sha1(f'{time.time()}:{prompt}'.encode('utf-8')).hexdigest()[:16]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+    }
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+@app.get("/stats")
+async def get_stats():
+    return stats.snapshot()
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,67 @@
+"""
+Immutable per-call model configuration and the stage -> model table.
+
+Stages are named "<family>" or "<family>:<name>" (e.g. "topic:restorative",
+"subtopic:crowns"); a stage without its own entry falls back to its family.
+"""
+
+import os
+import json
+from dataclasses import dataclass, replace, asdict
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Model tiers; unset tiers fall back to the service's default model
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL")
+# Per-stage overrides, e.g. {"subtopic:crowns": {"model": "openai/gpt-4o", "max_tokens": 800}}
+LLM_STAGE_MODELS = json.loads(os.getenv("LLM_STAGE_MODELS", "{}"))
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """Model settings for a single LLM call"""
+    model: Optional[str] = None
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+    # Chat-completions response_format, e.g. {"type": "json_object"}
+    response_format: Optional[Dict[str, Any]] = None
+
+    def merged(self, override: "ModelConfig") -> "ModelConfig":
+        """A copy of this config with every field that override sets replaced"""
+        return replace(self, **{key: value for key, value in asdict(override).items() if value is not None})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+FAST = ModelConfig(model=LLM_FAST_MODEL)
+STRONG = ModelConfig(model=LLM_STRONG_MODEL)
+
+# Routing stages are the bulk of the calls and only pick code ranges, so they
+# run on the fast tier; stages that choose or approve final codes run on the strong tier
+STAGE_MODEL_CONFIGS: Dict[str, ModelConfig] = {
+    "cleaner": FAST,
+    "cdt_classifier": FAST,
+    "icd_classifier": FAST,
+    "topic": FAST,
+    "subtopic": STRONG,
+    "icd_topic": STRONG,
+    # Short code list; this extractor already ran on a flash-class model before the move to LLMService
+    "icd_topic:inflammatoryconditionsofthmucosa": FAST,
+    "questioner": STRONG,
+    "cdt_inspector": STRONG,
+    "icd_inspector": STRONG,
+}
+
+for _stage, _settings in LLM_STAGE_MODELS.items():
+    STAGE_MODEL_CONFIGS[_stage] = ModelConfig(**_settings)
+
+def stage_config(stage: Optional[str]) -> ModelConfig:
+    """Configured overrides for a stage, falling back to its family, else an empty config"""
+    if not stage:
+        return ModelConfig()
+    if stage in STAGE_MODEL_CONFIGS:
+        return STAGE_MODEL_CONFIGS[stage]
+    return STAGE_MODEL_CONFIGS.get(stage.split(":", 1)[0], ModelConfig())
@@ -0,0 +1,344 @@
+"""
+Declarative stage scheduler for the analysis pipeline.
+
+Each stage names the values it needs (run inputs or the outputs of other
+stages) and produces one output under its own name. A run starts every stage
+as soon as its dependencies resolve, applies the stage's timeout and retries,
+and records when each stage started and how long it took, so the critical
+path of every run can be read off its timings. A listener passed to a run
+hears about every stage as it finishes, and about any progress the stages
+report through emit() while they are still running.
+
+A run can be handed the outputs of an earlier, interrupted run of the same
+inputs. Those stages are not run again, nor are stages only they needed.
+
+Inside a request deadline (see deadline.py) stage timeouts are capped at the
+time left, and stages that set min_budget are skipped when less than that is
+left. Both count as degraded rather than failed.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from dataclasses import dataclass, field, replace, asdict
+from typing import Dict, Any, List, Tuple, Callable, Awaitable, Optional
+from dotenv import load_dotenv
+
+from llm_metrics import Histogram, LATENCY_BUCKETS
+from deadline import DeadlineExceeded, time_left, degrade
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Per-stage overrides, e.g. {"questioner_result": {"timeout": 60, "retries": 1}}
+PIPELINE_STAGE_SETTINGS = json.loads(os.getenv("PIPELINE_STAGE_SETTINGS", "{}"))
+# Timeout in seconds for stages without their own (0 for none)
+PIPELINE_STAGE_TIMEOUT = float(os.getenv("PIPELINE_STAGE_TIMEOUT", "0"))
+
+# Stage outcomes
+STAGE_OK = "ok"
+STAGE_FAILED = "failed"
+STAGE_SKIPPED = "skipped"
+# Skipped or cut short to meet the request deadline
+STAGE_DEGRADED = "degraded"
+# Output taken from an earlier run of the same inputs
+STAGE_RESTORED = "restored"
+
+# Events a run reports to its listener, besides those emitted by stages
+STAGE_DONE = "stage_done"
+STAGE_ERROR = "stage_error"
+
+Listener = Callable[[str, Any], None]
+
+_listener: contextvars.ContextVar = contextvars.ContextVar("pipeline_listener", default=None)
+
+def emit(event: str, data: Any):
+    """Report progress from inside a stage to the current run's listener, if it has one"""
+    listener = _listener.get()
+    if listener is not None:
+        try:
+            listener(event, data)
+        except Exception as e:
+            logger.warning(f"Pipeline listener failed on {event}: {e}")
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline step; func is awaited with the values named in requires as keyword arguments"""
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    requires: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    retries: int = 0
+    # Called with the error when the stage fails; its return value stands in for the output
+    # so dependents still run. Without one, dependents of a failed stage are skipped.
+    fallback: Optional[Callable[[Exception], Any]] = None
+    # Seconds of request budget the stage needs left to start; with less it is skipped (low-priority work)
+    min_budget: Optional[float] = None
+    # Whether the request deadline caps the stage's timeout (off for writes that must happen regardless)
+    bounded: bool = True
+
+@dataclass
+class StageTiming:
+    """When a stage ran, relative to the start of its run, and how it ended"""
+    name: str
+    status: str = STAGE_SKIPPED
+    start: Optional[float] = None
+    end: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
+    def as_dict(self) -> Dict[str, Any]:
+        timing = asdict(self)
+        timing["duration"] = self.duration
+        return timing
+
+@dataclass
+class PipelineRun:
+    """Outputs and per-stage timings of one pipeline run"""
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, StageTiming] = field(default_factory=dict)
+    requires: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    duration: float = 0.0
+
+    def critical_path(self) -> List[str]:
+        """Stages the run actually waited on: from the last stage to finish, back through its latest dependency"""
+        finished = [t for t in self.timings.values() if t.end is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda t: t.end).name]
+        while True:
+            dependencies = [
+                self.timings[name] for name in self.requires.get(path[-1], ())
+                if name in self.timings and self.timings[name].end is not None
+            ]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda t: t.end).name)
+        return path[::-1]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "duration": self.duration,
+            "critical_path": self.critical_path(),
+            "stages": {name: timing.as_dict() for name, timing in self.timings.items()}
+        }
+
+class PipelineStats:
+    """Per-stage outcome counts and duration histograms, and how often each stage is on the critical path"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, run: PipelineRun):
+        critical_path = set(run.critical_path())
+        with self._lock:
+            self.runs += 1
+            self.duration.observe(run.duration)
+            for name, timing in run.timings.items():
+                entry = self.stages.setdefault(name, {
+                    STAGE_OK: 0, STAGE_FAILED: 0, STAGE_SKIPPED: 0, STAGE_DEGRADED: 0, STAGE_RESTORED: 0, "retries": 0,
+                    "critical_path": 0, "duration": Histogram(LATENCY_BUCKETS)
+                })
+                entry[timing.status] += 1
+                entry["retries"] += max(timing.attempts - 1, 0)
+                entry["critical_path"] += name in critical_path
+                if timing.duration is not None:
+                    entry["duration"].observe(timing.duration)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "duration": self.duration.snapshot(),
+                "stages": {
+                    name: {key: value.snapshot() if isinstance(value, Histogram) else value for key, value in entry.items()}
+                    for name, entry in self.stages.items()
+                }
+            }
+
+class Pipeline:
+    """A set of stages run as a dependency graph"""
+
+    def __init__(self, stages: List[Stage], inputs: Tuple[str, ...] = ()):
+        self.inputs = tuple(inputs)
+        self.stages = self._order([self._configured(stage) for stage in stages])
+        self.stats = PipelineStats()
+
+    @staticmethod
+    def _configured(stage: Stage) -> Stage:
+        """Stage with PIPELINE_STAGE_SETTINGS and the default timeout applied"""
+        if stage.timeout is None and PIPELINE_STAGE_TIMEOUT > 0:
+            stage = replace(stage, timeout=PIPELINE_STAGE_TIMEOUT)
+        return replace(stage, **PIPELINE_STAGE_SETTINGS.get(stage.name, {}))
+
+    def _order(self, stages: List[Stage]) -> List[Stage]:
+        """Stages in dependency order; rejects duplicate names, unknown dependencies and cycles"""
+        by_name: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in by_name or stage.name in self.inputs:
+                raise ValueError(f"Duplicate pipeline stage: {stage.name}")
+            by_name[stage.name] = stage
+        for stage in stages:
+            unknown = [name for name in stage.requires if name not in by_name and name not in self.inputs]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} requires unknown values: {', '.join(unknown)}")
+
+        ordered: List[Stage] = []
+        state: Dict[str, str] = {}
+
+        def visit(stage: Stage, chain: Tuple[str, ...]):
+            if state.get(stage.name) == "done":
+                return
+            if state.get(stage.name) == "visiting":
+                raise ValueError(f"Pipeline stages form a cycle: {' -> '.join(chain + (stage.name,))}")
+            state[stage.name] = "visiting"
+            for name in stage.requires:
+                if name in by_name:
+                    visit(by_name[name], chain + (stage.name,))
+            state[stage.name] = "done"
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage, ())
+        return ordered
+
+    async def run(self, listener: Listener = None, restored: Optional[Dict[str, Any]] = None, **inputs) -> PipelineRun:
+        """Run every stage as soon as its dependencies resolve; stage failures are recorded, not raised.
+
+        listener is called with (STAGE_DONE, {"stage", "output"}) as each stage succeeds (with
+        "restored" or "fallback" set when the output was not produced by the stage itself),
+        (STAGE_ERROR, {"stage", "error"}) as one fails, and with every event its stages emit().
+        restored holds stage outputs of an earlier run with the same inputs; they are taken as they are,
+        so it should only hold outputs whose own dependencies were restored too or can be recomputed.
+        """
+        missing = [name for name in self.inputs if name not in inputs]
+        if missing:
+            raise ValueError(f"Missing pipeline inputs: {', '.join(missing)}")
+        run = PipelineRun(
+            outputs=dict(inputs),
+            timings={stage.name: StageTiming(stage.name) for stage in self.stages},
+            requires={stage.name: stage.requires for stage in self.stages}
+        )
+        restored = {name: output for name, output in (restored or {}).items() if name in run.timings}
+        to_run = self._still_needed(restored) if restored else None
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        # Stage tasks copy the context they are created in, so emit() inside them reaches this run's listener
+        token = _listener.set(listener)
+        try:
+            for stage in self.stages:
+                if stage.name in restored:
+                    run.outputs[stage.name] = restored[stage.name]
+                    run.timings[stage.name].status = STAGE_RESTORED
+                    emit(STAGE_DONE, {"stage": stage.name, "output": restored[stage.name], "restored": True})
+                elif to_run is not None and stage.name not in to_run:
+                    run.timings[stage.name].error = "Only needed by restored stages"
+                else:
+                    tasks[stage.name] = asyncio.create_task(self._run_stage(stage, run, tasks, started))
+        finally:
+            _listener.reset(token)
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        run.duration = time.perf_counter() - started
+        self.stats.record(run)
+        return run
+
+    def _still_needed(self, restored: Dict[str, Any]) -> set:
+        """Stages that must run besides the restored ones: those whose output the caller or a running stage needs"""
+        dependents: Dict[str, List[str]] = {stage.name: [] for stage in self.stages}
+        for stage in self.stages:
+            for name in stage.requires:
+                if name in dependents:
+                    dependents[name].append(stage.name)
+        to_run = set()
+        for stage in reversed(self.stages):
+            needed_by = dependents[stage.name]
+            if stage.name not in restored and (not needed_by or any(name in to_run for name in needed_by)):
+                to_run.add(stage.name)
+        return to_run
+
+    async def _run_stage(self, stage: Stage, run: PipelineRun, tasks: Dict[str, asyncio.Task], started: float):
+        dependencies = [tasks[name] for name in stage.requires if name in tasks]
+        if dependencies:
+            await asyncio.gather(*dependencies)
+        timing = run.timings[stage.name]
+        unresolved = [name for name in stage.requires if name not in run.outputs]
+        if unresolved:
+            timing.error = f"Dependencies did not resolve: {', '.join(unresolved)}"
+            logger.warning(f"Skipping stage {stage.name}: {timing.error}")
+            return
+
+        left = time_left()
+        if stage.min_budget is not None and left is not None and left < stage.min_budget:
+            error = DeadlineExceeded(f"Skipped with {left:.1f}s of request budget left ({stage.min_budget}s needed)")
+            logger.warning(f"Stage {stage.name}: {error}")
+            timing.status = STAGE_DEGRADED
+            timing.error = str(error)
+            degrade(stage.name, timing.error)
+            self._fall_back(stage, run, error)
+            return
+
+        kwargs = {name: run.outputs[name] for name in stage.requires}
+        timing.start = time.perf_counter() - started
+        error = None
+        for attempt in range(stage.retries + 1):
+            timing.attempts += 1
+            timeout, capped = self._timeout(stage)
+            try:
+                run.outputs[stage.name] = await asyncio.wait_for(stage.func(**kwargs), timeout)
+                timing.status = STAGE_OK
+                timing.end = time.perf_counter() - started
+                emit(STAGE_DONE, {"stage": stage.name, "output": run.outputs[stage.name]})
+                return
+            except asyncio.TimeoutError as e:
+                if capped or isinstance(e, DeadlineExceeded):
+                    error = DeadlineExceeded(f"Stage {stage.name} cut short by the request deadline")
+                else:
+                    error = TimeoutError(f"Stage {stage.name} timed out after {timeout}s")
+            except Exception as e:
+                error = e
+            logger.warning(f"Stage {stage.name} attempt {timing.attempts} failed: {error}")
+            if isinstance(error, DeadlineExceeded):
+                break
+
+        timing.error = str(error)
+        timing.end = time.perf_counter() - started
+        if isinstance(error, DeadlineExceeded):
+            timing.status = STAGE_DEGRADED
+            degrade(stage.name, timing.error)
+        else:
+            timing.status = STAGE_FAILED
+        emit(STAGE_ERROR, {"stage": stage.name, "error": timing.error})
+        self._fall_back(stage, run, error)
+
+    @staticmethod
+    def _timeout(stage: Stage) -> Tuple[Optional[float], bool]:
+        """The stage's timeout for its next attempt, and whether the request deadline shortened it"""
+        left = time_left() if stage.bounded else None
+        if left is None or (stage.timeout is not None and stage.timeout <= left):
+            return stage.timeout, False
+        return left, True
+
+    @staticmethod
+    def _fall_back(stage: Stage, run: PipelineRun, error: Exception):
+        """Stand the stage's fallback output in for a failed or degraded stage, if it has one"""
+        if stage.fallback is not None:
+            run.outputs[stage.name] = stage.fallback(error)
+            emit(STAGE_DONE, {"stage": stage.name, "output": run.outputs[stage.name], "fallback": True})
@@ -0,0 +1,97 @@
+"""
+Static-prefix / dynamic-suffix prompt layout, and prompt-cache accounting.
+
+Topic, subtopic and ICD topic templates embed the scenario in the middle of a
+large static code table. Provider prompt caching only applies to an identical
+prefix, so the service renders each template with its per-call inputs replaced
+by a fixed reference and sends the values afterwards, as a second content part.
+The static part is then byte-identical for every call of a template.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, List
+from dotenv import load_dotenv
+from langchain.prompts import PromptTemplate
+
+load_dotenv()
+
+# "inline" sends the template as written; "split" (opt-in) sends the static prefix and the inputs separately
+LLM_PROMPT_LAYOUT = os.getenv("LLM_PROMPT_LAYOUT", "inline")
+# Model prefixes whose provider only caches prompt parts marked with cache_control
+LLM_CACHE_CONTROL_MODELS = [
+    m.strip() for m in os.getenv("LLM_CACHE_CONTROL_MODELS", "anthropic/,google/").split(",") if m.strip()
+]
+
+@dataclass(frozen=True)
+class SplitPrompt:
+    """A prompt sent as a cacheable static prefix followed by the per-call inputs"""
+    static: str
+    dynamic: str
+
+    def text(self) -> str:
+        return f"{self.static}\n\n{self.dynamic}"
+
+def _reference(name: str) -> str:
+    return f"[{name.upper()} - given at the end of this prompt]"
+
+def split_template(prompt_template: PromptTemplate, inputs: Dict[str, Any]) -> SplitPrompt:
+    """Render the template with each input replaced by a reference, and the inputs as the suffix"""
+    static = prompt_template.format(**{name: _reference(name) for name in inputs})
+    dynamic = "\n\n".join(f"{name.upper()}:\n{value}" for name, value in inputs.items())
+    return SplitPrompt(static.strip(), dynamic)
+
+def uses_cache_control(model: str) -> bool:
+    return any((model or "").startswith(prefix) for prefix in LLM_CACHE_CONTROL_MODELS)
+
+def split_content(prompt: SplitPrompt, model: str) -> List[Dict[str, Any]]:
+    """Message content parts for a split prompt, marking the prefix cacheable where the provider needs it"""
+    static_part = {"type": "text", "text": prompt.static}
+    if uses_cache_control(model):
+        static_part["cache_control"] = {"type": "ephemeral"}
+    return [static_part, {"type": "text", "text": prompt.dynamic}]
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens the provider served from its prompt cache, from a completion's usage"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", None) or 0
+
+class PromptCacheStats:
+    """Per-template prompt tokens, cached prompt tokens and latency with and without a cache hit"""
+
+    def __init__(self):
+        self.templates: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, template: str, prompt_tokens: int, cached: int, latency: float):
+        with self._lock:
+            entry = self.templates.setdefault(template, {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                "hit_calls": 0, "hit_latency": 0.0, "miss_calls": 0, "miss_latency": 0.0
+            })
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["cached_tokens"] += cached
+            kind = "hit" if cached else "miss"
+            entry[f"{kind}_calls"] += 1
+            entry[f"{kind}_latency"] += latency
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            templates = {name: dict(entry) for name, entry in self.templates.items()}
+        totals = {"prompt_tokens": 0, "cached_tokens": 0}
+        for entry in templates.values():
+            totals["prompt_tokens"] += entry["prompt_tokens"]
+            totals["cached_tokens"] += entry["cached_tokens"]
+            entry["cached_ratio"] = entry["cached_tokens"] / entry["prompt_tokens"] if entry["prompt_tokens"] else 0.0
+            hit_latency = entry.pop("hit_latency") / entry["hit_calls"] if entry["hit_calls"] else None
+            miss_latency = entry.pop("miss_latency") / entry["miss_calls"] if entry["miss_calls"] else None
+            entry["mean_latency_hit"] = hit_latency
+            entry["mean_latency_miss"] = miss_latency
+            # Without streaming, the latency gap between hits and misses stands in for the time-to-first-token saving
+            entry["latency_saving"] = miss_latency - hit_latency if hit_latency is not None and miss_latency is not None else None
+        totals["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return {"layout": LLM_PROMPT_LAYOUT, "totals": totals, "templates": templates}
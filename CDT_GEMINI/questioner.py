@@ -1,8 +1,8 @@
 import os
 import logging
 from dotenv import load_dotenv
-from llm_services import generate_response, get_service, set_model, set_temperature
-from llm_services import OPENROUTER_MODEL, DEFAULT_TEMP
+from llm_services import generate_response_async, get_service, ModelConfig, blocking
+from structured_output import use_structured_output
 from typing import Dict, Any, Optional
 
 
@@ -10,6 +10,8 @@ load_dotenv()
 
 class Questioner:
     """Class to handle dental scenario questioning with configurable prompts and settings"""
+
+    STAGE = "questioner"
     
     PROMPT_TEMPLATE = """
 You are a highly experienced dental and medical coding expert with over 15 years of expertise in ADA dental procedure codes and ICD-10 diagnostic codes. Your task is to review the provided dental scenario along with the CDT and ICD analysis results to determine if any critical information is missing that is necessary for accurately assigning codes.
@@ -46,9 +48,10 @@ ICD_QUESTIONS: [List only the most critical ICD-specific questions that would im
 ICD_EXPLANATION: [Briefly explain why these specific ICD questions are necessary for code selection]
 """
 
-    def __init__(self, model: str = OPENROUTER_MODEL, temperature: float = DEFAULT_TEMP):
-        """Initialize the questioner with model and temperature settings"""
+    def __init__(self, model: Optional[str] = None, temperature: Optional[float] = None):
+        """Initialize the questioner with optional model and temperature overrides"""
         self.service = get_service()
+        self.model_config = ModelConfig()
         self.configure(model, temperature)
         self.logger = self._setup_logging()
 
@@ -62,11 +65,8 @@ ICD_EXPLANATION: [Briefly explain why these specific ICD questions are necessary
         return logging.getLogger(__name__)
 
     def configure(self, model: Optional[str] = None, temperature: Optional[float] = None) -> None:
-        """Configure model and temperature settings"""
-        if model:
-            set_model(model)
-        if temperature is not None:
-            set_temperature(temperature)
+        """Configure model and temperature overrides for this instance's calls only"""
+        self.model_config = self.model_config.merged(ModelConfig(model=model, temperature=temperature))
 
     def format_prompt(self, scenario: str, cdt_analysis: Any, icd_analysis: Any) -> str:
         """Format the prompt template with the given inputs"""
@@ -130,34 +130,62 @@ ICD_EXPLANATION: [Briefly explain why these specific ICD questions are necessary
             "has_questions": len(cdt_questions) > 0 or len(icd_questions) > 0
         }
 
-    def process(self, scenario: str, cdt_analysis: Any = None, icd_analysis: Any = None) -> Dict[str, Any]:
+    def _from_structured(self, questions) -> Dict[str, Any]:
+        """Convert a validated QuestionSet into the parse_response format"""
+        cdt_questions = [q.strip() for q in questions.cdt_questions if q.strip() and q.strip().lower() != "none"]
+        icd_questions = [q.strip() for q in questions.icd_questions if q.strip() and q.strip().lower() != "none"]
+        return {
+            "cdt_questions": {
+                "questions": cdt_questions,
+                "explanation": questions.cdt_explanation,
+                "has_questions": len(cdt_questions) > 0
+            },
+            "icd_questions": {
+                "questions": icd_questions,
+                "explanation": questions.icd_explanation,
+                "has_questions": len(icd_questions) > 0
+            },
+            "has_questions": len(cdt_questions) > 0 or len(icd_questions) > 0
+        }
+
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        self.logger.error(f"Error in process: {str(e)}")
+        return {
+            "cdt_questions": {
+                "questions": [],
+                "explanation": f"Error occurred: {str(e)}",
+                "has_questions": False
+            },
+            "icd_questions": {
+                "questions": [],
+                "explanation": f"Error occurred: {str(e)}",
+                "has_questions": False
+            },
+            "has_questions": False
+        }
+
+    async def process_async(self, scenario: str, cdt_analysis: Any = None, icd_analysis: Any = None) -> Dict[str, Any]:
         """Process a scenario and generate questions"""
         try:
             formatted_prompt = self.format_prompt(scenario, cdt_analysis, icd_analysis)
-            response = generate_response(formatted_prompt)
+            if use_structured_output(self.STAGE):
+                return self._from_structured(
+                    await self.service.generate_structured_async(formatted_prompt, self.STAGE, self.model_config)
+                )
+            response = await generate_response_async(formatted_prompt, stage=self.STAGE, config=self.model_config)
             return self.parse_response(response)
         except Exception as e:
-            self.logger.error(f"Error in process: {str(e)}")
-            return {
-                "cdt_questions": {
-                    "questions": [],
-                    "explanation": f"Error occurred: {str(e)}",
-                    "has_questions": False
-                },
-                "icd_questions": {
-                    "questions": [],
-                    "explanation": f"Error occurred: {str(e)}",
-                    "has_questions": False
-                },
-                "has_questions": False
-            }
+            return self._error_result(e)
+
+    process = blocking(process_async)
 
     @property
     def current_settings(self) -> Dict[str, Any]:
         """Get current model settings"""
+        config = self.service.resolve_config(self.STAGE, self.model_config)
         return {
-            "model": self.service.model,
-            "temperature": self.service.temperature
+            "model": config.model,
+            "temperature": config.temperature
         }
 
 class QuestionerCLI:
@@ -0,0 +1,292 @@
+"""
+Process-wide throttling for LLM calls: per-model requests-per-second and
+tokens-per-minute buckets, a max-concurrency gate, a per-request fan-out cap,
+and retry classification/backoff that honours Retry-After.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Default limits, overridable per model with LLM_RATE_LIMITS, e.g.
+# {"openai/gpt-4o": {"rps": 5, "tpm": 300000, "max_concurrency": 16}}
+LLM_RPS = float(os.getenv("LLM_RPS", "20"))
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+# Maximum concurrent LLM calls a single analysis request may have open
+LLM_REQUEST_FANOUT = int(os.getenv("LLM_REQUEST_FANOUT", "16"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "30"))
+
+# Errors that will fail the same way however often they are retried
+NON_RETRYABLE_ERRORS = (
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.BadRequestError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError,
+    openai.ConflictError,
+)
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an LLM call that raised error is worth retrying"""
+    if isinstance(error, NON_RETRYABLE_ERRORS):
+        return False
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return True
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider through Retry-After headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def backoff_delay(error: Exception, attempt: int, base_delay: float, cap: float = LLM_BACKOFF_CAP) -> float:
+    """Exponential backoff with full jitter, never shorter than the provider's Retry-After"""
+    delay = random.uniform(0, min(cap, base_delay * (2 ** attempt)))
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used for tokens-per-minute budgeting"""
+    return max(1, len(text) // 4)
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+class TokenBucket:
+    """Reservation-based token bucket: callers take tokens and sleep off any deficit"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take amount tokens and return how long the caller must wait before using them"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+class ConcurrencyLimiter:
+    """FIFO counting semaphore usable from threads and from any event loop"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, waiter=None) -> bool:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            if waiter is not None:
+                self._waiters.append(waiter)
+            return False
+
+    def acquire(self):
+        event = threading.Event()
+        if not self._try_acquire(event):
+            event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._try_acquire((loop, future)):
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+                    raise
+            # The slot was handed over just as we were cancelled; give it back.
+            # A cancelled future is passed on by _wake instead.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                # The slot passes straight to the next waiter, so active is unchanged
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not future.done() and not loop.is_closed():
+                    loop.call_soon_threadsafe(self._wake, future)
+                    return
+            self.active -= 1
+
+    def _wake(self, future):
+        if not future.done():
+            future.set_result(True)
+        else:
+            self.release()
+
+class ModelLimiter:
+    """Requests-per-second, tokens-per-minute and concurrency limits for one model"""
+
+    def __init__(self, model: str, rps: float, tpm: float, max_concurrency: int):
+        self.model = model
+        self.requests = TokenBucket(rps, max(1.0, rps))
+        self.tokens = TokenBucket(tpm / 60.0, tpm)
+        self.concurrency = ConcurrencyLimiter(max_concurrency)
+
+class RateLimiter:
+    """Registry of per-model limiters plus queue-wait accounting"""
+
+    def __init__(self, limits: Dict[str, Dict[str, Any]] = None):
+        self.limits = limits if limits is not None else LLM_RATE_LIMITS
+        self._models: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+        self.counters = {"acquired": 0, "queued": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def for_model(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._models.get(model)
+            if limiter is None:
+                config = {**self.limits.get("default", {}), **self.limits.get(model, {})}
+                limiter = ModelLimiter(
+                    model,
+                    rps=float(config.get("rps", LLM_RPS)),
+                    tpm=float(config.get("tpm", LLM_TPM)),
+                    max_concurrency=int(config.get("max_concurrency", LLM_MAX_CONCURRENCY))
+                )
+                self._models[model] = limiter
+            return limiter
+
+    def _record_wait(self, waited: float):
+        with self._lock:
+            self.counters["acquired"] += 1
+            self.counters["total_wait"] += waited
+            self.counters["max_wait"] = max(self.counters["max_wait"], waited)
+            if waited > 0.001:
+                self.counters["queued"] += 1
+
+    @contextmanager
+    def acquire(self, model: str, tokens: int = 1):
+        """Hold a request slot for model; yields the seconds spent queueing"""
+        limiter = self.for_model(model)
+        scope = _request_scope.get()
+        if scope is not None and _on_event_loop():
+            # A blocking call on the loop thread is already serialized, and
+            # waiting here for a slot held by a task on that loop would deadlock
+            scope = None
+        start = time.monotonic()
+        if scope is not None:
+            scope.acquire()
+        try:
+            delay = max(limiter.requests.reserve(1), limiter.tokens.reserve(tokens))
+            if delay:
+                time.sleep(delay)
+            limiter.concurrency.acquire()
+            try:
+                waited = time.monotonic() - start
+                self._record_wait(waited)
+                yield waited
+            finally:
+                limiter.concurrency.release()
+        finally:
+            if scope is not None:
+                scope.release()
+
+    @asynccontextmanager
+    async def acquire_async(self, model: str, tokens: int = 1):
+        """Async counterpart of acquire"""
+        limiter = self.for_model(model)
+        scope = _request_scope.get()
+        start = time.monotonic()
+        if scope is not None:
+            await scope.acquire_async()
+        try:
+            delay = max(limiter.requests.reserve(1), limiter.tokens.reserve(tokens))
+            if delay:
+                await asyncio.sleep(delay)
+            await limiter.concurrency.acquire_async()
+            try:
+                waited = time.monotonic() - start
+                self._record_wait(waited)
+                yield waited
+            finally:
+                limiter.concurrency.release()
+        finally:
+            if scope is not None:
+                scope.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-wait totals and per-model in-flight counts"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["models"] = {
+                model: {"active": limiter.concurrency.active, "waiting": len(limiter.concurrency._waiters)}
+                for model, limiter in self._models.items()
+            }
+        stats["avg_wait"] = stats["total_wait"] / stats["acquired"] if stats["acquired"] else 0.0
+        return stats
+
+# Per-request fan-out limiter, propagated to tasks and threads through the context
+_request_scope: contextvars.ContextVar = contextvars.ContextVar("llm_request_scope", default=None)
+
+@contextmanager
+def request_fanout(limit: int = LLM_REQUEST_FANOUT):
+    """Cap the number of concurrent LLM calls issued within this request"""
+    token = _request_scope.set(ConcurrencyLimiter(limit))
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+# Process-wide instance shared by every LLMService
+rate_limiter = RateLimiter()
@@ -0,0 +1,292 @@
+"""
+Near-duplicate reuse of past analyses.
+
+Much of the traffic is templated notes ("recall exam, 4BWX, adult prophy")
+that differ only in patient name, date or tooth number. Every saved analysis
+is indexed by a MinHash signature of its cleaned scenario (content words and
+word pairs, without numbers, names, dates or filler) with LSH banding, so a near match is
+found without comparing against every past note.
+
+A match above SIMILARITY_THRESHOLD only offers its stage outputs; each stage
+keeps the prior output only if what it depends on is really unchanged: the
+classifications need the same written codes, topics, questions and
+inspections also the same kinds of teeth, and no stage is kept when a stage
+feeding it was re-run. Entries live in their own SQLite file next to the app,
+since dental_report stores the summarized results rather than the raw stage
+outputs the pipeline needs; the index fills up as new analyses are saved.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+from speculation import content_tokens, mentioned_codes, mentioned_teeth
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Reuse stage outputs of near-identical past scenarios (opt-in: a reused result is only as good as the match)
+SIMILARITY_REUSE = os.getenv("SIMILARITY_REUSE", "false").lower() in ("1", "true", "yes")
+# Estimated Jaccard similarity of two cleaned scenarios above which the older one's outputs are offered
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
+SIMILARITY_INDEX_PATH = os.getenv(
+    "SIMILARITY_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "similarity_index.sqlite3")
+)
+# Analyses kept in the index; the oldest are dropped first
+SIMILARITY_MAX_ENTRIES = int(os.getenv("SIMILARITY_MAX_ENTRIES", "50000"))
+# MinHash permutations, split into LSH bands of SIMILARITY_NUM_PERM / SIMILARITY_BANDS rows
+SIMILARITY_NUM_PERM = int(os.getenv("SIMILARITY_NUM_PERM", "128"))
+SIMILARITY_BANDS = int(os.getenv("SIMILARITY_BANDS", "32"))
+
+# Why a stage of a matched analysis was re-run
+CODES_DIFFER = "codes_differ"
+TEETH_DIFFER = "teeth_differ"
+UPSTREAM_RERUN = "upstream_rerun"
+NOT_STORED = "not_stored"
+
+# What a stage's prior output requires to be reused
+SAME_CODES = "same_codes"
+SAME_TEETH = "same_teeth"
+
+# (Stages that must be reused as well, what must match) per reusable stage, in pipeline order
+ReuseRules = Dict[str, Tuple[Tuple[str, ...], str]]
+
+_PRIME = (1 << 31) - 1
+
+_MOLARS = {1, 2, 3, 14, 15, 16, 17, 18, 19, 30, 31, 32}
+_PREMOLARS = {4, 5, 12, 13, 20, 21, 28, 29}
+_PRIMARY_MOLARS = set("ABIJKLST")
+
+_DATE_WORDS = {
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+_SENTENCE = re.compile(r"(?<=[.!?:;\n])\s+")
+_CAPITALIZED = re.compile(r"^[A-Z][a-z]+$")
+
+def tooth_class(tooth: str) -> str:
+    """Kind of tooth for a universal tooth number or primary tooth letter; what codes like D3310-D3330 turn on"""
+    if tooth.isalpha():
+        return "primary_molar" if tooth in _PRIMARY_MOLARS else "primary_anterior"
+    number = int(tooth)
+    if number in _MOLARS:
+        return "molar"
+    if number in _PREMOLARS:
+        return "premolar"
+    return "anterior" if 6 <= number <= 27 else "unknown"
+
+def _identifying_words(text: str) -> Set[str]:
+    """Likely names and dates: capitalized words inside a sentence, month and weekday names"""
+    names = [
+        word for sentence in _SENTENCE.split(text)
+        for word in re.findall(r"[A-Za-z]+", sentence)[1:] if _CAPITALIZED.match(word)
+    ]
+    return set(content_tokens(" ".join(names))) | _DATE_WORDS
+
+def shingles(text: str) -> Set[str]:
+    """Content words and adjacent word pairs of the text, leaving out what identifies the patient or visit"""
+    identifying = _identifying_words(text)
+    tokens = [token for token in content_tokens(text) if token not in identifying]
+    return set(tokens) | {f"{first} {second}" for first, second in zip(tokens, tokens[1:])}
+
+@dataclass
+class SimilarAnalysis:
+    """A past analysis close to the current scenario, and which of its stage outputs stand in for this one's"""
+    record_id: str
+    similarity: float
+    outputs: Dict[str, Any]
+    reused: List[str] = field(default_factory=list)
+    # stage -> why it is re-run
+    rerun: Dict[str, str] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "source_record_id": self.record_id,
+            "similarity": round(self.similarity, 3),
+            "reused_stages": list(self.reused),
+            "rerun_stages": dict(self.rerun)
+        }
+
+@dataclass
+class _Entry:
+    signature: np.ndarray
+    codes: Tuple[str, ...]
+    teeth: Tuple[str, ...]
+    created_at: float
+
+class SimilarityIndex:
+    """MinHash/LSH index of saved analyses, persisted in SQLite and held in memory for lookups"""
+
+    def __init__(self, path: str = SIMILARITY_INDEX_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 max_entries: int = SIMILARITY_MAX_ENTRIES, num_perm: int = SIMILARITY_NUM_PERM,
+                 bands: int = SIMILARITY_BANDS):
+        if num_perm % bands:
+            raise ValueError("SIMILARITY_NUM_PERM must be a multiple of SIMILARITY_BANDS")
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed seed: signatures stored by earlier processes must stay comparable
+        rng = np.random.RandomState(20240601)
+        self._a = rng.randint(1, _PRIME, num_perm).astype(np.int64)
+        self._b = rng.randint(0, _PRIME, num_perm).astype(np.int64)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Oldest first, so eviction drops from the front
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self.counters = {"lookups": 0, "matches": 0, "indexed": 0}
+        self.stage_counters: Dict[str, Dict[str, int]] = {}
+        self._load()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self):
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "record_id TEXT PRIMARY KEY, signature BLOB NOT NULL, codes TEXT NOT NULL, teeth TEXT NOT NULL, "
+            "outputs TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at)")
+        rows = conn.execute(
+            "SELECT record_id, signature, codes, teeth, created_at FROM analyses ORDER BY created_at"
+        ).fetchall()
+        for record_id, signature, codes, teeth, created_at in rows:
+            entry = _Entry(np.frombuffer(signature, dtype=np.int64), tuple(json.loads(codes)),
+                           tuple(json.loads(teeth)), created_at)
+            if len(entry.signature) == len(self._a):
+                self._insert(record_id, entry)
+        logger.info(f"Similarity index at {self.path} with {len(self._entries)} analyses")
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the text's shingles"""
+        hashes = np.array([
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little") % _PRIME
+            for shingle in shingles(text)
+        ], dtype=np.int64)
+        if not len(hashes):
+            return np.full(len(self._a), _PRIME, dtype=np.int64)
+        # Values stay below 2^62 + 2^31, inside int64
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def _features(self, text: str) -> _Entry:
+        return _Entry(
+            self.signature(text),
+            tuple(sorted(mentioned_codes(text))),
+            tuple(sorted(tooth_class(tooth) for tooth in mentioned_teeth(text))),
+            time.time()
+        )
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _insert(self, record_id: str, entry: _Entry):
+        self._entries[record_id] = entry
+        for key in self._band_keys(entry.signature):
+            self._buckets.setdefault(key, set()).add(record_id)
+
+    def _remove(self, record_id: str):
+        entry = self._entries.pop(record_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(record_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _nearest(self, entry: _Entry) -> Optional[Tuple[str, float]]:
+        candidates = set()
+        for key in self._band_keys(entry.signature):
+            candidates |= self._buckets.get(key, set())
+        best = None
+        for record_id in candidates:
+            similarity = float(np.mean(self._entries[record_id].signature == entry.signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (record_id, similarity)
+        return best
+
+    def lookup(self, text: str, rules: ReuseRules) -> Optional[SimilarAnalysis]:
+        """The closest indexed analysis above the threshold, with each stage in rules marked reused or re-run"""
+        entry = self._features(text)
+        with self._lock:
+            self.counters["lookups"] += 1
+            nearest = self._nearest(entry)
+            if nearest is None:
+                return None
+            self.counters["matches"] += 1
+            record_id, similarity = nearest
+            prior = self._entries[record_id]
+        row = self._connection().execute("SELECT outputs FROM analyses WHERE record_id = ?", (record_id,)).fetchone()
+        if row is None:
+            return None
+        match = SimilarAnalysis(record_id, similarity, json.loads(row[0]))
+
+        for stage, (upstream, condition) in rules.items():
+            if any(name not in match.reused for name in upstream):
+                match.rerun[stage] = UPSTREAM_RERUN
+            elif prior.codes != entry.codes:
+                match.rerun[stage] = CODES_DIFFER
+            elif condition == SAME_TEETH and prior.teeth != entry.teeth:
+                match.rerun[stage] = TEETH_DIFFER
+            elif match.outputs.get(stage) is None:
+                match.rerun[stage] = NOT_STORED
+            else:
+                match.reused.append(stage)
+        with self._lock:
+            for stage in rules:
+                counts = self.stage_counters.setdefault(stage, {})
+                outcome = "reused" if stage in match.reused else match.rerun[stage]
+                counts[outcome] = counts.get(outcome, 0) + 1
+        return match
+
+    def add(self, record_id: str, text: str, outputs: Dict[str, Any]):
+        """Index a saved analysis of the cleaned scenario text with the stage outputs later matches may reuse"""
+        entry = self._features(text)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO analyses (record_id, signature, codes, teeth, outputs, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (record_id, entry.signature.tobytes(), json.dumps(entry.codes), json.dumps(entry.teeth),
+             json.dumps(outputs, default=list), entry.created_at)
+        )
+        with self._lock:
+            self.counters["indexed"] += 1
+            self._remove(record_id)
+            self._insert(record_id, entry)
+            evicted = list(self._entries)[:max(0, len(self._entries) - self.max_entries)]
+            for old_id in evicted:
+                self._remove(old_id)
+        if evicted:
+            self._connection().executemany("DELETE FROM analyses WHERE record_id = ?", [(old_id,) for old_id in evicted])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "stages": {stage: dict(counts) for stage, counts in self.stage_counters.items()}
+            }
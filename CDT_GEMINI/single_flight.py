@@ -0,0 +1,56 @@
+"""
+Single-flight coalescing: concurrent callers asking for the same key share one
+in-flight computation instead of each issuing their own LLM request.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Awaitable
+
+class SingleFlight:
+    """Coalesces identical concurrent calls, whichever event loop or thread they come from"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.counters = {"leaders": 0, "coalesced": 0}
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key at a time; concurrent callers with the same key get the same result.
+
+        Blocking entry points each run their own thread's loop, so callers wait on a
+        thread-safe future that the leader's task settles rather than on the task itself.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                # A running future can't be cancelled, so one caller giving up doesn't fail the others
+                future.set_running_or_notify_cancel()
+                self.counters["leaders"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        if leader:
+            task = asyncio.get_running_loop().create_task(fn())
+            task.add_done_callback(functools.partial(self._settle, key, future))
+        return await asyncio.wrap_future(future)
+
+    def _settle(self, key: str, future: Future, task: asyncio.Task):
+        with self._lock:
+            self._calls.pop(key, None)
+        if task.cancelled():
+            future.set_exception(asyncio.CancelledError())
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader/coalesced counters and the number of calls currently in flight"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
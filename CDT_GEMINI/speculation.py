@@ -0,0 +1,103 @@
+"""
+Speculative classification: the CDT and ICD classifiers start on the raw
+scenario while the cleaner runs, and their results are kept when the cleaned
+text turns out to say the same thing.
+
+The check is lexical and cheap: the cleaned scenario must mention the same
+CDT/ICD codes and tooth numbers as the raw one, and nearly all of its
+remaining content words must already appear in the raw text. The cleaner
+mostly reorders notes under section headings, so in the common case the
+classifiers would have seen the same facts either way.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Any, List, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Start classification on the raw scenario alongside the cleaner (opt-in: a miss costs the speculative calls)
+PIPELINE_SPECULATION = os.getenv("PIPELINE_SPECULATION", "false").lower() in ("1", "true", "yes")
+# Share of the cleaned scenario's content words that must appear in the raw one
+PIPELINE_SPECULATION_MIN_COVERAGE = float(os.getenv("PIPELINE_SPECULATION_MIN_COVERAGE", "0.85"))
+
+# Reasons a speculative result is kept or discarded
+REUSED = "reused"
+CODES_DIFFER = "codes_differ"
+TEETH_DIFFER = "teeth_differ"
+NEW_CONTENT = "new_content"
+SPECULATION_ERROR = "speculation_error"
+
+_CODE = re.compile(r"\b(D\d{4}|[A-TV-Z]\d{2}(?:\.[0-9A-Z]{1,4})?)\b")
+_TOOTH = re.compile(r"(?:#\s*|\btooth\s+(?:#\s*)?|\bteeth\s+(?:#\s*)?)(\d{1,2}|[A-T])\b", re.I)
+_WORD = re.compile(r"[a-z][a-z\-]{2,}")
+
+# Section headings and filler the cleaner adds around the facts it restructures
+_BOILERPLATE = {
+    "the", "and", "for", "with", "was", "were", "are", "has", "had", "have", "this", "that", "from", "any",
+    "not", "none", "mentioned", "documented", "provided", "specified", "available", "noted", "stated", "per",
+    "patient", "details", "information", "demographics", "command", "line", "presented", "subjectives",
+    "subjective", "objective", "objectives", "assessment", "treatment", "treatments", "procedures",
+    "procedure", "performed", "recommendations", "recommended", "made", "medications", "medication", "next",
+    "steps", "follow-up", "follow", "visit", "provider", "clinician", "findings", "scenario", "reported",
+    "complains", "complaint", "during", "what", "says", "sees", "tests", "concluded", "did", "only",
+}
+
+def _stem(word: str) -> str:
+    return word[:-1] if word.endswith("s") and not word.endswith("ss") else word
+
+def mentioned_codes(text: str) -> Set[str]:
+    """CDT and ICD codes written in the text"""
+    return set(_CODE.findall(text))
+
+def mentioned_teeth(text: str) -> Set[str]:
+    """Tooth numbers (or primary tooth letters) written in the text"""
+    return {tooth.upper() for tooth in _TOOTH.findall(text)}
+
+def content_tokens(text: str) -> List[str]:
+    """The text's words in order, stemmed, without numbers, headings and filler"""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in _BOILERPLATE]
+
+def content_words(text: str) -> Set[str]:
+    return set(content_tokens(text))
+
+def check_reuse(raw: str, cleaned: str) -> Tuple[bool, str]:
+    """Whether classification of the raw scenario stands in for classification of the cleaned one, and why"""
+    if mentioned_codes(raw) != mentioned_codes(cleaned):
+        return False, CODES_DIFFER
+    if mentioned_teeth(raw) != mentioned_teeth(cleaned):
+        return False, TEETH_DIFFER
+    cleaned_words = content_words(cleaned)
+    if cleaned_words:
+        coverage = len(cleaned_words & content_words(raw)) / len(cleaned_words)
+        if coverage < PIPELINE_SPECULATION_MIN_COVERAGE:
+            return False, NEW_CONTENT
+    return True, REUSED
+
+class SpeculationStats:
+    """How often speculative classification results were kept, and why the rest were discarded"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, classifier: str, outcome: str):
+        with self._lock:
+            counts = self.outcomes.setdefault(classifier, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            outcomes = {classifier: dict(counts) for classifier, counts in self.outcomes.items()}
+        return {
+            "enabled": PIPELINE_SPECULATION,
+            "classifiers": {
+                classifier: {
+                    "outcomes": counts,
+                    "hit_rate": counts.get(REUSED, 0) / sum(counts.values()) if counts else 0.0
+                }
+                for classifier, counts in outcomes.items()
+            }
+        }
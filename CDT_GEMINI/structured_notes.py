@@ -0,0 +1,106 @@
+"""
+Local detection and normalization of already-structured clinical notes.
+
+Practice-management systems export SOAP-style notes whose sections map
+one-to-one onto the cleaner's output layout. For those, the sections are
+renamed and reordered here instead of asking the LLM to rewrite the note.
+A note is only treated as structured when most of its text sits under
+recognised headings; anything else goes through the cleaner.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Cleaner output sections, in output order, with the headings that map onto them.
+# "Plan" is deliberately absent: it mixes work done with work recommended, which
+# is exactly the distinction coding depends on, so those notes go to the cleaner.
+SECTIONS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("command line", ("command line", "command", "instructions", "coding instructions")),
+    ("Patient Details", ("patient details", "patient information", "patient info", "patient", "demographics")),
+    ("Subjectives", (
+        "subjectives", "subjective", "s", "chief complaint", "cc", "hpi", "history of present illness",
+        "medical history", "history"
+    )),
+    ("Objective", (
+        "objective", "o", "clinical findings", "findings", "clinical exam", "exam", "examination",
+        "radiographs", "radiographic findings", "x-rays"
+    )),
+    ("Assessment", ("assessment", "a", "diagnosis", "dx", "impression", "clinical impression")),
+    ("Treatment Provided", (
+        "treatment provided", "treatment performed", "treatment rendered", "treatment today", "treatment",
+        "procedures performed", "procedures", "procedure", "tx today", "services rendered"
+    )),
+    ("Recommendations Made", ("recommendations made", "recommendations", "recommendation", "recommended")),
+    ("Medications", ("medications", "medication", "meds", "rx", "prescriptions", "prescribed")),
+    ("Next Steps", ("next steps", "next visit", "nv", "follow-up", "follow up", "rtc", "return to clinic")),
+]
+
+_ALIASES: Dict[str, str] = {alias: name for name, aliases in SECTIONS for alias in aliases}
+# Headings that are recognised but have no cleaner section; their text stays unmapped.
+# A bare "Tx" is as often the treatment plan as the work done, so it counts as Plan.
+_UNMAPPED = {
+    "plan", "p", "tx", "tx plan", "treatment plan", "notes", "note", "comments", "remarks", "additional notes"
+}
+
+# "Heading:" or "Heading (anything):" at the start of a line, optionally bulleted or bold
+_HEADING = re.compile(r"^[\s\-\*#>]*\**\s*([A-Za-z][A-Za-z \-/]{0,40}?)\s*(?:\([^)]*\))?\s*\**\s*:\s*(.*)$")
+
+@dataclass
+class StructuredNote:
+    """Sections recognised in a note, and how much of the note they account for"""
+    sections: Dict[str, List[str]] = field(default_factory=dict)
+    mapped_chars: int = 0
+    total_chars: int = 0
+
+    @property
+    def coverage(self) -> float:
+        return self.mapped_chars / self.total_chars if self.total_chars else 0.0
+
+    def confidence(self, min_sections: int = 3) -> float:
+        """Share of the text under recognised headings, scaled down for notes with few sections"""
+        return self.coverage * min(1.0, len(self.sections) / min_sections)
+
+    def normalized(self) -> str:
+        """The note in the cleaner's output layout"""
+        lines = []
+        for name, _ in SECTIONS:
+            body = "\n".join(self.sections.get(name, [])).strip()
+            if name == "command line":
+                lines.append(f"command line : {body or 'None'}")
+            else:
+                lines.append(f"{name}:\n{body or 'Not documented'}")
+        return "\n\n".join(lines)
+
+def _heading(line: str) -> Optional[Tuple[Optional[str], str]]:
+    """(section, rest of line) if the line starts with a recognised heading; section is None for unmapped ones"""
+    match = _HEADING.match(line)
+    if not match:
+        return None
+    label = re.sub(r"\s+", " ", match.group(1)).strip().lower()
+    if label in _UNMAPPED:
+        return None, match.group(2).strip()
+    if label not in _ALIASES:
+        return None
+    return _ALIASES[label], match.group(2).strip()
+
+def parse_note(text: str) -> StructuredNote:
+    """Split a note into cleaner sections; text before the first heading or under Plan-like headings stays unmapped"""
+    note = StructuredNote()
+    current: Optional[str] = None
+    for line in text.splitlines():
+        content = line.strip()
+        if not content:
+            continue
+        heading = _heading(content)
+        if heading:
+            current, content = heading
+        note.total_chars += len(line.strip())
+        if current is None:
+            continue
+        note.mapped_chars += len(line.strip())
+        if content:
+            note.sections.setdefault(current, []).append(content)
+        else:
+            note.sections.setdefault(current, [])
+    return note
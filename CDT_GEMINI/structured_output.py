@@ -0,0 +1,179 @@
+"""
+Structured (JSON schema) output for pipeline stages.
+
+Each stage family has a pydantic model that serves as the JSON schema sent to
+the provider, the validator for the answer, and the typed result handed back.
+Stages reached through invoke_chain (topics, subtopics, ICD topics) get the
+validated model back as well, and read its fields instead of parsing text.
+"""
+
+import os
+import re
+import json
+import threading
+from typing import Dict, Any, List, Optional, Type, Union
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Structured output is opt-in; LLM_STRUCTURED_STAGES limits it to some stage families
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() in ("1", "true", "yes")
+LLM_STRUCTURED_STAGES = [s.strip() for s in os.getenv("LLM_STRUCTURED_STAGES", "").split(",") if s.strip()]
+# "json_schema" sends the schema, "json_object" asks for plain JSON mode, "prompt" relies on the instructions only
+LLM_STRUCTURED_MODE = os.getenv("LLM_STRUCTURED_MODE", "json_schema")
+
+CDT_CODE_PATTERN = r"^D\d{4}$"
+CDT_RANGE_PATTERN = r"^D\d{4}-D\d{4}$"
+
+class StructuredOutputError(Exception):
+    """Raised when an answer is not valid JSON for its stage schema"""
+
+class StageResult(BaseModel):
+    """Base of the stage answer models"""
+    model_config = ConfigDict(extra="forbid")
+
+
+class CodeRange(StageResult):
+    code_range: str = Field(pattern=CDT_RANGE_PATTERN, description="CDT code range, e.g. D0100-D0999")
+    category: str = Field(description="Name of the code range, e.g. Diagnostic Services")
+    explanation: str
+    doubt: str = ""
+
+class CDTClassification(StageResult):
+    code_ranges: List[CodeRange]
+
+
+class ICDCategory(StageResult):
+    category_number: int = Field(ge=1, le=18)
+    category_name: str
+    explanation: str
+    doubt: str = ""
+
+class ICDClassification(StageResult):
+    categories: List[ICDCategory]
+
+
+class TopicSelection(StageResult):
+    code_ranges: List[str] = Field(description="Applicable code ranges from the list above, e.g. D2710-D2799; empty if none")
+    explanation: str
+    doubt: str = ""
+
+
+class CodeSelection(StageResult):
+    code: str = Field(pattern=CDT_CODE_PATTERN)
+    explanation: str
+    doubt: str = ""
+
+class SubtopicSelection(StageResult):
+    codes: List[CodeSelection] = Field(description="One entry per applicable code (repeat a code that applies more than once); empty if none")
+
+# What a subtopic activator hands the registry: its text block, or the validated selection
+SubtopicAnswer = Union[str, SubtopicSelection]
+
+
+class ICDCodeSelection(StageResult):
+    codes: List[str] = Field(description="ICD-10 codes from the list above; empty if none")
+    explanation: str
+    doubt: str = ""
+
+
+class QuestionSet(StageResult):
+    cdt_questions: List[str]
+    cdt_explanation: str
+    icd_questions: List[str]
+    icd_explanation: str
+
+
+class CDTInspection(StageResult):
+    codes: List[str] = Field(description="Accepted CDT codes")
+    rejected_codes: List[str] = Field(description="CDT codes from the topic analysis that were rejected")
+    explanation: str
+
+
+class ICDInspection(StageResult):
+    codes: List[str] = Field(description="Accepted ICD-10-CM codes")
+    explanation: str
+
+
+STAGE_SCHEMAS: Dict[str, Type[StageResult]] = {
+    "cdt_classifier": CDTClassification,
+    "icd_classifier": ICDClassification,
+    "topic": TopicSelection,
+    "subtopic": SubtopicSelection,
+    "icd_topic": ICDCodeSelection,
+    "questioner": QuestionSet,
+    "cdt_inspector": CDTInspection,
+    "icd_inspector": ICDInspection,
+}
+
+def schema_for_stage(stage: Optional[str]) -> Optional[Type[StageResult]]:
+    if not stage:
+        return None
+    return STAGE_SCHEMAS.get(stage.split(":", 1)[0])
+
+def use_structured_output(stage: Optional[str]) -> bool:
+    """Whether calls for this stage should ask for and validate JSON"""
+    if not LLM_STRUCTURED_OUTPUT or schema_for_stage(stage) is None:
+        return False
+    return not LLM_STRUCTURED_STAGES or stage.split(":", 1)[0] in LLM_STRUCTURED_STAGES
+
+def response_format(schema: Type[StageResult], mode: str = LLM_STRUCTURED_MODE) -> Optional[Dict[str, Any]]:
+    """The chat-completions response_format for a schema in the given mode"""
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema(), "strict": False}
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+def with_schema_instructions(prompt: str, schema: Type[StageResult]) -> str:
+    """Append the JSON answer format to a prompt written for a free-text answer"""
+    return (
+        f"{prompt}\n\n"
+        "Ignore any answer format described above. Respond with a single JSON object, "
+        "without markdown or any other text, that matches this JSON schema:\n"
+        f"{json.dumps(schema.model_json_schema(), separators=(',', ':'))}"
+    )
+
+def repair_prompt(prompt: str, answer: str, error: Exception) -> str:
+    """Follow-up prompt asking the model to fix an answer that failed validation"""
+    return (
+        f"{prompt}\n\nYour previous answer was:\n{answer}\n\n"
+        f"It was rejected because: {error}\n"
+        "Return only the corrected JSON object."
+    )
+
+def parse_structured(text: str, schema: Type[StageResult]) -> StageResult:
+    """Validate a model answer against schema, tolerating code fences around the JSON"""
+    cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", (text or "").strip())
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start < 0 or end < start:
+        raise StructuredOutputError("answer contains no JSON object")
+    try:
+        return schema.model_validate_json(cleaned[start:end + 1])
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'root'}: {error['msg']}" for error in e.errors()[:5]
+        )
+        raise StructuredOutputError(problems) from e
+
+class StructuredOutputStats:
+    """How many structured answers were valid first time, repaired, or failed"""
+
+    def __init__(self):
+        self.counters = {"calls": 0, "valid": 0, "repaired": 0, "failed": 0, "provider_downgrades": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["enabled"] = LLM_STRUCTURED_OUTPUT
+        stats["mode"] = LLM_STRUCTURED_MODE
+        return stats
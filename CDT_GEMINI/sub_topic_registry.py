@@ -1,7 +1,11 @@
 import asyncio
 import inspect
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Callable, Any, Union, Coroutine
+from typing import List, Dict, Callable, Any, Union, Coroutine, Optional
+from structured_output import SubtopicAnswer, SubtopicSelection
+
+# Cancel message for activations cut short by activate_all's timeout; a nested activate_all
+# receiving it returns the subtopics that finished instead of raising
+BUDGET_EXCEEDED = "subtopic budget exceeded"
 
 class SubtopicRegistry:
     """Registry for managing subtopic activation functions."""
@@ -18,10 +22,18 @@ class SubtopicRegistry:
             "is_async": inspect.iscoroutinefunction(activate_func)
         })
     
-    async def activate_all(self, scenario: str, code_ranges: str) -> Dict[str, Any]:
-        """Activate all relevant subtopics in parallel."""
+    async def activate_all(self, scenario: str, code_ranges: str,
+                           on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Activate all relevant subtopics in parallel; on_result is called with each parsed result as it arrives.
+
+        Subtopics still running after timeout seconds are cancelled and listed under timed_out_subtopics.
+        An activator that itself runs a registry (a topic) keeps the subtopics that finished before the
+        cut and reports the rest under its own timed_out_subtopics, which are merged into this result.
+        """
         results_list = []
         activated_subtopics = []
+        timed_out_subtopics = []
         
         async def run_subtopic(subtopic: Dict[str, Any]) -> Dict[str, Any]:
             if subtopic["code_range"] in code_ranges:
@@ -32,42 +44,73 @@ class SubtopicRegistry:
                     # If it's an async function, await it directly
                     result = await subtopic["activate_func"](scenario)
                 else:
-                    # If it's a synchronous function, run it in a thread pool
-                    loop = asyncio.get_running_loop()
-                    with ThreadPoolExecutor() as pool:
-                        result = await loop.run_in_executor(pool, lambda: subtopic["activate_func"](scenario))
+                    # If it's a synchronous function, run it on the default thread pool
+                    result = await asyncio.to_thread(subtopic["activate_func"], scenario)
                 
-                # Format the result properly based on response structure
+                if not result:
+                    return None
+                
+                # A topic cut short reports the subtopics it could not finish
+                cut_short = result.pop("timed_out_subtopics", []) if isinstance(result, dict) else []
+                # Parse the raw result to extract properly formatted data
+                parsed_result = self._parse_topic_result(result, subtopic["name"], subtopic["code_range"])
+                if parsed_result and on_result is not None:
+                    on_result(parsed_result)
                 return {
-                    "raw_result": result,
+                    "parsed_result": parsed_result,
                     "name": subtopic["name"],
-                    "code_range": subtopic["code_range"]
+                    "timed_out_subtopics": cut_short
                 }
             return None
         
         # Run all relevant subtopics concurrently
-        tasks = [run_subtopic(subtopic) for subtopic in self.subtopics]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [(subtopic["name"], asyncio.create_task(run_subtopic(subtopic))) for subtopic in self.subtopics]
+        cut_short = False
+        try:
+            if tasks:
+                await asyncio.wait([task for _, task in tasks], timeout=timeout)
+        except asyncio.CancelledError as e:
+            # An enclosing registry ran out of budget: keep what finished, list the rest below
+            if e.args != (BUDGET_EXCEEDED,):
+                for _, task in tasks:
+                    task.cancel()
+                raise
+            cut_short = True
+        pending = [task for _, task in tasks if not task.done()]
+        for task in pending:
+            task.cancel(BUDGET_EXCEEDED)
+        if pending and not cut_short:
+            # Our own timeout: let nested registries hand back their finished subtopics
+            await asyncio.wait(pending)
         
         # Process results
-        for result in results:
+        for name, task in tasks:
+            # Cancelled above, but not yet unwound
+            if not task.done() or task.cancelled():
+                print(f"Subtopic {name} did not finish in time")
+                timed_out_subtopics.append(name)
+                continue
+            result = task.exception() or task.result()
             if isinstance(result, Exception):
                 print(f"Error in subtopic activation: {result}")
+                if isinstance(result, TimeoutError):
+                    timed_out_subtopics.append(name)
                 continue
+            if result and result["timed_out_subtopics"]:
+                print(f"Subtopic {name} was cut short: {', '.join(result['timed_out_subtopics'])}")
+                timed_out_subtopics.extend(result["timed_out_subtopics"])
                 
-            if result and result.get("raw_result"):
-                # Parse the raw result to extract properly formatted data
-                parsed_result = self._parse_topic_result(result["raw_result"], result["name"], result["code_range"])
-                if parsed_result:
-                    results_list.append(parsed_result)
-                    activated_subtopics.append(result["name"])
+            if result and result["parsed_result"]:
+                results_list.append(result["parsed_result"])
+                activated_subtopics.append(result["name"])
         
         return {
             "topic_result": results_list,
-            "activated_subtopics": activated_subtopics
+            "activated_subtopics": activated_subtopics,
+            "timed_out_subtopics": timed_out_subtopics
         }
     
-    def _parse_topic_result(self, raw_result: str, topic_name: str, code_range: str) -> Dict[str, Any]:
+    def _parse_topic_result(self, raw_result: SubtopicAnswer, topic_name: str, code_range: str) -> Dict[str, Any]:
         """Parse the raw result from topic activation into a properly structured format."""
         try:
             # Handle empty responses
@@ -85,6 +128,21 @@ class SubtopicRegistry:
                 if "subtopic" in raw_result:
                     del raw_result["subtopic"]
                 return raw_result
+
+            # A validated structured answer already carries its codes
+            if isinstance(raw_result, SubtopicSelection):
+                if not raw_result.codes:
+                    return None
+                return {
+                    "topic": topic_name,
+                    "explanation": "",
+                    "doubt": "",
+                    "code_range": code_range,
+                    "codes": [
+                        {"explanation": c.explanation, "doubt": c.doubt, "code": c.code}
+                        for c in raw_result.codes
+                    ]
+                }
             
             # Otherwise, parse the text format
             explanation = ""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -117,22 +118,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_anesthesia_code(self, scenario: str) -> str:
+    async def extract_anesthesia_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract anesthesia code(s) for a given scenario."""
         try:
             print(f"Analyzing anesthesia scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:anesthesia")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Anesthesia extract_anesthesia_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in anesthesia code extraction: {str(e)}")
             return ""
+
+    extract_anesthesia_code = blocking(extract_anesthesia_code_async)
     
-    def activate_anesthesia(self, scenario: str) -> str:
+    async def activate_anesthesia_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the anesthesia analysis process and return results."""
         try:
-            result = self.extract_anesthesia_code(scenario)
+            result = await self.extract_anesthesia_code_async(scenario)
             if not result:
                 print("No anesthesia code returned")
                 return ""
@@ -140,6 +143,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating anesthesia analysis: {str(e)}")
             return ""
+
+    activate_anesthesia = blocking(activate_anesthesia_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -74,22 +75,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_drugs_code(self, scenario: str) -> str:
+    async def extract_drugs_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract drug-related code(s) for a given scenario."""
         try:
             print(f"Analyzing drugs scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:drugs")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Drugs extract_drugs_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in drugs code extraction: {str(e)}")
             return ""
+
+    extract_drugs_code = blocking(extract_drugs_code_async)
     
-    def activate_drugs(self, scenario: str) -> str:
+    async def activate_drugs_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the drugs analysis process and return results."""
         try:
-            result = self.extract_drugs_code(scenario)
+            result = await self.extract_drugs_code_async(scenario)
             if not result:
                 print("No drugs code returned")
                 return ""
@@ -97,6 +100,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating drugs analysis: {str(e)}")
             return ""
+
+    activate_drugs = blocking(activate_drugs_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
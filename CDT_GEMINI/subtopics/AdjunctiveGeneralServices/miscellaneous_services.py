@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -190,22 +191,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_miscellaneous_services_code(self, scenario: str) -> str:
+    async def extract_miscellaneous_services_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract miscellaneous service code(s) for a given scenario."""
         try:
             print(f"Analyzing miscellaneous services scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:miscellaneous_services")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Miscellaneous services extract_miscellaneous_services_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in miscellaneous services code extraction: {str(e)}")
             return ""
+
+    extract_miscellaneous_services_code = blocking(extract_miscellaneous_services_code_async)
     
-    def activate_miscellaneous_services(self, scenario: str) -> str:
+    async def activate_miscellaneous_services_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the miscellaneous services analysis process and return results."""
         try:
-            result = self.extract_miscellaneous_services_code(scenario)
+            result = await self.extract_miscellaneous_services_code_async(scenario)
             if not result:
                 print("No miscellaneous services code returned")
                 return ""
@@ -213,6 +216,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating miscellaneous services analysis: {str(e)}")
             return ""
+
+    activate_miscellaneous_services = blocking(activate_miscellaneous_services_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -203,22 +204,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_non_clinical_procedures_code(self, scenario: str) -> str:
+    async def extract_non_clinical_procedures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract non-clinical procedure code(s) for a given scenario."""
         try:
             print(f"Analyzing non-clinical procedures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:non_clinical_procedures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Non-clinical procedures extract_non_clinical_procedures_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in non-clinical procedures code extraction: {str(e)}")
             return ""
+
+    extract_non_clinical_procedures_code = blocking(extract_non_clinical_procedures_code_async)
     
-    def activate_non_clinical_procedures(self, scenario: str) -> str:
+    async def activate_non_clinical_procedures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the non-clinical procedures analysis process and return results."""
         try:
-            result = self.extract_non_clinical_procedures_code(scenario)
+            result = await self.extract_non_clinical_procedures_code_async(scenario)
             if not result:
                 print("No non-clinical procedures code returned")
                 return ""
@@ -226,6 +229,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating non-clinical procedures analysis: {str(e)}")
             return ""
+
+    activate_non_clinical_procedures = blocking(activate_non_clinical_procedures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -64,22 +65,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_professional_consultation_code(self, scenario: str) -> str:
+    async def extract_professional_consultation_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract professional consultation code(s) for a given scenario."""
         try:
             print(f"Analyzing professional consultation scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:professional_consultation")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Professional consultation extract_professional_consultation_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in professional consultation code extraction: {str(e)}")
             return ""
+
+    extract_professional_consultation_code = blocking(extract_professional_consultation_code_async)
     
-    def activate_professional_consultation(self, scenario: str) -> str:
+    async def activate_professional_consultation_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the professional consultation analysis process and return results."""
         try:
-            result = self.extract_professional_consultation_code(scenario)
+            result = await self.extract_professional_consultation_code_async(scenario)
             if not result:
                 print("No professional consultation code returned")
                 return ""
@@ -87,6 +90,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating professional consultation analysis: {str(e)}")
             return ""
+
+    activate_professional_consultation = blocking(activate_professional_consultation_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
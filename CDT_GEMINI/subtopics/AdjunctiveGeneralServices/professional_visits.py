@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -77,22 +78,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_professional_visits_code(self, scenario: str) -> str:
+    async def extract_professional_visits_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract professional visits code(s) for a given scenario."""
         try:
             print(f"Analyzing professional visits scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:professional_visits")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Professional visits extract_professional_visits_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in professional visits code extraction: {str(e)}")
             return ""
+
+    extract_professional_visits_code = blocking(extract_professional_visits_code_async)
     
-    def activate_professional_visits(self, scenario: str) -> str:
+    async def activate_professional_visits_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the professional visits analysis process and return results."""
         try:
-            result = self.extract_professional_visits_code(scenario)
+            result = await self.extract_professional_visits_code_async(scenario)
             if not result:
                 print("No professional visits code returned")
                 return ""
@@ -100,6 +103,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating professional visits analysis: {str(e)}")
             return ""
+
+    activate_professional_visits = blocking(activate_professional_visits_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -69,22 +70,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_unclassified_treatment_code(self, scenario: str) -> str:
+    async def extract_unclassified_treatment_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract unclassified treatment code(s) for a given scenario."""
         try:
             print(f"Analyzing unclassified treatment scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:unclassified_treatment")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Unclassified treatment extract_unclassified_treatment_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in unclassified treatment code extraction: {str(e)}")
             return ""
+
+    extract_unclassified_treatment_code = blocking(extract_unclassified_treatment_code_async)
     
-    def activate_unclassified_treatment(self, scenario: str) -> str:
+    async def activate_unclassified_treatment_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the unclassified treatment analysis process and return results."""
         try:
-            result = self.extract_unclassified_treatment_code(scenario)
+            result = await self.extract_unclassified_treatment_code_async(scenario)
             if not result:
                 print("No unclassified treatment code returned")
                 return ""
@@ -92,6 +95,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating unclassified treatment analysis: {str(e)}")
             return ""
+
+    activate_unclassified_treatment = blocking(activate_unclassified_treatment_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
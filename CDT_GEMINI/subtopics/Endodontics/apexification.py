@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -70,22 +71,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_apexification_code(self, scenario: str) -> str:
+    async def extract_apexification_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract apexification/recalcification code(s) for a given scenario."""
         try:
             print(f"Analyzing apexification scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:apexification")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Apexification extract_apexification_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in apexification code extraction: {str(e)}")
             return ""
+
+    extract_apexification_code = blocking(extract_apexification_code_async)
     
-    def activate_apexification(self, scenario: str) -> str:
+    async def activate_apexification_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the apexification analysis process and return results."""
         try:
-            result = self.extract_apexification_code(scenario)
+            result = await self.extract_apexification_code_async(scenario)
             if not result:
                 print("No apexification code returned")
                 return ""
@@ -93,6 +96,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating apexification analysis: {str(e)}")
             return ""
+
+    activate_apexification = blocking(activate_apexification_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
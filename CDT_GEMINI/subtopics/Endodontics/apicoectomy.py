@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -339,22 +340,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_apicoectomy_code(self, scenario: str) -> str:
+    async def extract_apicoectomy_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract apicoectomy/periradicular services code(s) for a given scenario."""
         try:
             print(f"Analyzing apicoectomy scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:apicoectomy")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Apicoectomy extract_apicoectomy_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in apicoectomy code extraction: {str(e)}")
             return ""
+
+    extract_apicoectomy_code = blocking(extract_apicoectomy_code_async)
     
-    def activate_apicoectomy(self, scenario: str) -> str:
+    async def activate_apicoectomy_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the apicoectomy analysis process and return results."""
         try:
-            result = self.extract_apicoectomy_code(scenario)
+            result = await self.extract_apicoectomy_code_async(scenario)
             if not result:
                 print("No apicoectomy code returned")
                 return ""
@@ -362,6 +365,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating apicoectomy analysis: {str(e)}")
             return ""
+
+    activate_apicoectomy = blocking(activate_apicoectomy_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
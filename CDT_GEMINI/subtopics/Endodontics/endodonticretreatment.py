@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -101,22 +102,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_endodontic_retreatment_code(self, scenario: str) -> str:
+    async def extract_endodontic_retreatment_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract endodontic retreatment code(s) for a given scenario."""
         try:
             print(f"Analyzing endodontic retreatment scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:endodonticretreatment")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Endodontic retreatment extract_endodontic_retreatment_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in endodontic retreatment code extraction: {str(e)}")
             return ""
+
+    extract_endodontic_retreatment_code = blocking(extract_endodontic_retreatment_code_async)
     
-    def activate_endodontic_retreatment(self, scenario: str) -> str:
+    async def activate_endodontic_retreatment_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the endodontic retreatment analysis process and return results."""
         try:
-            result = self.extract_endodontic_retreatment_code(scenario)
+            result = await self.extract_endodontic_retreatment_code_async(scenario)
             if not result:
                 print("No endodontic retreatment code returned")
                 return ""
@@ -124,6 +127,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating endodontic retreatment analysis: {str(e)}")
             return ""
+
+    activate_endodontic_retreatment = blocking(activate_endodontic_retreatment_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -150,22 +151,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_endodontic_therapy_code(self, scenario: str) -> str:
+    async def extract_endodontic_therapy_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract endodontic therapy code(s) for a given scenario."""
         try:
             print(f"Analyzing endodontic therapy scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:endodontictherapy")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Endodontic therapy extract_endodontic_therapy_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in endodontic therapy code extraction: {str(e)}")
             return ""
+
+    extract_endodontic_therapy_code = blocking(extract_endodontic_therapy_code_async)
     
-    def activate_endodontic_therapy(self, scenario: str) -> str:
+    async def activate_endodontic_therapy_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the endodontic therapy analysis process and return results."""
         try:
-            result = self.extract_endodontic_therapy_code(scenario)
+            result = await self.extract_endodontic_therapy_code_async(scenario)
             if not result:
                 print("No endodontic therapy code returned")
                 return ""
@@ -173,6 +176,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating endodontic therapy analysis: {str(e)}")
             return ""
+
+    activate_endodontic_therapy = blocking(activate_endodontic_therapy_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
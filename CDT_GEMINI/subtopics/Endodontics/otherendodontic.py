@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -148,22 +149,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_other_endodontic_code(self, scenario: str) -> str:
+    async def extract_other_endodontic_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract other endodontic procedure code(s) for a given scenario."""
         try:
             print(f"Analyzing other endodontic scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:otherendodontic")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Other endodontic extract_other_endodontic_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in other endodontic code extraction: {str(e)}")
             return ""
+
+    extract_other_endodontic_code = blocking(extract_other_endodontic_code_async)
     
-    def activate_other_endodontic(self, scenario: str) -> str:
+    async def activate_other_endodontic_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the other endodontic analysis process and return results."""
         try:
-            result = self.extract_other_endodontic_code(scenario)
+            result = await self.extract_other_endodontic_code_async(scenario)
             if not result:
                 print("No other endodontic code returned")
                 return ""
@@ -171,6 +174,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating other endodontic analysis: {str(e)}")
             return ""
+
+    activate_other_endodontic = blocking(activate_other_endodontic_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -87,22 +88,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_primary_teeth_therapy_code(self, scenario: str) -> str:
+    async def extract_primary_teeth_therapy_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract endodontic therapy code(s) for primary teeth for a given scenario."""
         try:
             print(f"Analyzing primary teeth therapy scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:primaryteeth")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Primary teeth therapy extract_primary_teeth_therapy_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in primary teeth therapy code extraction: {str(e)}")
             return ""
+
+    extract_primary_teeth_therapy_code = blocking(extract_primary_teeth_therapy_code_async)
     
-    def activate_primary_teeth_therapy(self, scenario: str) -> str:
+    async def activate_primary_teeth_therapy_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the primary teeth therapy analysis process and return results."""
         try:
-            result = self.extract_primary_teeth_therapy_code(scenario)
+            result = await self.extract_primary_teeth_therapy_code_async(scenario)
             if not result:
                 print("No primary teeth therapy code returned")
                 return ""
@@ -110,6 +113,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating primary teeth therapy analysis: {str(e)}")
             return ""
+
+    activate_primary_teeth_therapy = blocking(activate_primary_teeth_therapy_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -103,22 +104,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_pulpal_regeneration_code(self, scenario: str) -> str:
+    async def extract_pulpal_regeneration_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract pulpal regeneration code(s) for a given scenario."""
         try:
             print(f"Analyzing pulpal regeneration scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:pulpalregeneration")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Pulpal regeneration extract_pulpal_regeneration_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in pulpal regeneration code extraction: {str(e)}")
             return ""
+
+    extract_pulpal_regeneration_code = blocking(extract_pulpal_regeneration_code_async)
     
-    def activate_pulpal_regeneration(self, scenario: str) -> str:
+    async def activate_pulpal_regeneration_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the pulpal regeneration analysis process and return results."""
         try:
-            result = self.extract_pulpal_regeneration_code(scenario)
+            result = await self.extract_pulpal_regeneration_code_async(scenario)
             if not result:
                 print("No pulpal regeneration code returned")
                 return ""
@@ -126,6 +129,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating pulpal regeneration analysis: {str(e)}")
             return ""
+
+    activate_pulpal_regeneration = blocking(activate_pulpal_regeneration_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -82,22 +83,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_pulp_capping_code(self, scenario: str) -> str:
+    async def extract_pulp_capping_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract pulp capping code(s) for a given scenario."""
         try:
             print(f"Analyzing pulp capping scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:pulpcapping")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Pulp capping extract_pulp_capping_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in pulp capping code extraction: {str(e)}")
             return ""
+
+    extract_pulp_capping_code = blocking(extract_pulp_capping_code_async)
     
-    def activate_pulp_capping(self, scenario: str) -> str:
+    async def activate_pulp_capping_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the pulp capping analysis process and return results."""
         try:
-            result = self.extract_pulp_capping_code(scenario)
+            result = await self.extract_pulp_capping_code_async(scenario)
             if not result:
                 print("No pulp capping code returned")
                 return ""
@@ -105,6 +108,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating pulp capping analysis: {str(e)}")
             return ""
+
+    activate_pulp_capping = blocking(activate_pulp_capping_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
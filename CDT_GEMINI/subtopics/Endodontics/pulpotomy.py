@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -100,22 +101,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_pulpotomy_code(self, scenario: str) -> str:
+    async def extract_pulpotomy_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract pulpotomy code(s) for a given scenario."""
         try:
             print(f"Analyzing pulpotomy scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:pulpotomy")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Pulpotomy extract_pulpotomy_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in pulpotomy code extraction: {str(e)}")
             return ""
+
+    extract_pulpotomy_code = blocking(extract_pulpotomy_code_async)
     
-    def activate_pulpotomy(self, scenario: str) -> str:
+    async def activate_pulpotomy_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the pulpotomy analysis process and return results."""
         try:
-            result = self.extract_pulpotomy_code(scenario)
+            result = await self.extract_pulpotomy_code_async(scenario)
             if not result:
                 print("No pulpotomy code returned")
                 return ""
@@ -123,6 +126,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating pulpotomy analysis: {str(e)}")
             return ""
+
+    activate_pulpotomy = blocking(activate_pulpotomy_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -145,24 +146,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_carriers_code(self, scenario: str) -> str:
+    async def extract_carriers_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract maxillofacial prosthetics carriers code(s) for a given scenario."""
         try:
             print(f"Analyzing maxillofacial carriers scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:carriers")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Carriers extract_carriers_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in carriers code extraction: {str(e)}")
             return ""
+
+    extract_carriers_code = blocking(extract_carriers_code_async)
     
-    def activate_carriers(self, scenario: str) -> str:
+    async def activate_carriers_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the maxillofacial carriers analysis process and return results."""
         try:
-            result = self.extract_carriers_code(scenario)
+            result = await self.extract_carriers_code_async(scenario)
             if not result:
                 print("No maxillofacial carriers code returned")
                 return ""
@@ -170,6 +173,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating maxillofacial carriers analysis: {str(e)}")
             return ""
+
+    activate_carriers = blocking(activate_carriers_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -573,24 +574,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_general_prosthetics_code(self, scenario: str) -> str:
+    async def extract_general_prosthetics_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract general maxillofacial prosthetics code(s) for a given scenario."""
         try:
             print(f"Analyzing general maxillofacial scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:general_prosthetics")
+            code = result.strip() if isinstance(result, str) else result
             print(f"General prosthetics extract_general_prosthetics_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in general prosthetics code extraction: {str(e)}")
             return ""
+
+    extract_general_prosthetics_code = blocking(extract_general_prosthetics_code_async)
     
-    def activate_general_prosthetics(self, scenario: str) -> str:
+    async def activate_general_prosthetics_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the general maxillofacial prosthetics analysis process and return results."""
         try:
-            result = self.extract_general_prosthetics_code(scenario)
+            result = await self.extract_general_prosthetics_code_async(scenario)
             if not result:
                 print("No general maxillofacial prosthetics code returned")
                 return ""
@@ -598,6 +601,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating general maxillofacial prosthetics analysis: {str(e)}")
             return ""
+
+    activate_general_prosthetics = blocking(activate_general_prosthetics_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting alveoloplasty-related procedure codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -80,30 +81,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_alveoloplasty_code(self, scenario: str) -> str:
+    async def extract_alveoloplasty_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract alveoloplasty code for a given scenario."""
         try:
             print(f"Analyzing alveoloplasty scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:alveoloplasty")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Alveoloplasty extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_alveoloplasty_code: {str(e)}")
             return ""
+
+    extract_alveoloplasty_code = blocking(extract_alveoloplasty_code_async)
     
-    def activate_alveoloplasty(self, scenario: str) -> str:
+    async def activate_alveoloplasty_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the alveoloplasty analysis process and return results."""
         try:
-            return self.extract_alveoloplasty_code(scenario)
+            return await self.extract_alveoloplasty_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_alveoloplasty: {str(e)}")
             return ""
+
+    activate_alveoloplasty = blocking(activate_alveoloplasty_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting treatment of closed fractures codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -107,30 +108,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_closed_fractures_code(self, scenario: str) -> str:
+    async def extract_closed_fractures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract closed fractures treatment code for a given scenario."""
         try:
             print(f"Analyzing closed fractures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:closed_fractures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Closed fractures extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_closed_fractures_code: {str(e)}")
             return ""
+
+    extract_closed_fractures_code = blocking(extract_closed_fractures_code_async)
     
-    def activate_closed_fractures(self, scenario: str) -> str:
+    async def activate_closed_fractures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the closed fractures treatment analysis process and return results."""
         try:
-            return self.extract_closed_fractures_code(scenario)
+            return await self.extract_closed_fractures_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_closed_fractures: {str(e)}")
             return ""
+
+    activate_closed_fractures = blocking(activate_closed_fractures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
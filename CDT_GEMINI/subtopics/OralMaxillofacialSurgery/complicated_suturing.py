@@ -5,7 +5,8 @@ Module for extracting complicated suturing codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -78,16 +79,16 @@ Scenario:
             input_variables=["scenario"]
     )
 
-    def extract_complicated_suturing_code(self, scenario: str) -> str:
+    async def extract_complicated_suturing_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract complicated suturing code for a given scenario."""
         try:
             print(f"Analyzing complicated suturing scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:complicated_suturing")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Complicated suturing extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
@@ -95,13 +96,17 @@ Scenario:
             print(f"Error in extract_complicated_suturing_code: {str(e)}")
             return ""
 
-    def activate_complicated_suturing(self, scenario: str) -> str:
+    extract_complicated_suturing_code = blocking(extract_complicated_suturing_code_async)
+
+    async def activate_complicated_suturing_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the complicated suturing analysis process and return results."""
         try:
-            return self.extract_complicated_suturing_code(scenario)
+            return await self.extract_complicated_suturing_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_complicated_suturing: {str(e)}")
             return "" 
+
+    activate_complicated_suturing = blocking(activate_complicated_suturing_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting excision of bone tissue codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -88,30 +89,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_excision_bone_tissue_code(self, scenario: str) -> str:
+    async def extract_excision_bone_tissue_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract excision of bone tissue code for a given scenario."""
         try:
             print(f"Analyzing excision of bone tissue scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:excision_bone_tissue")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Excision of bone tissue extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_excision_bone_tissue_code: {str(e)}")
             return ""
+
+    extract_excision_bone_tissue_code = blocking(extract_excision_bone_tissue_code_async)
     
-    def activate_excision_bone_tissue(self, scenario: str) -> str:
+    async def activate_excision_bone_tissue_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the excision of bone tissue analysis process and return results."""
         try:
-            return self.extract_excision_bone_tissue_code(scenario)
+            return await self.extract_excision_bone_tissue_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_excision_bone_tissue: {str(e)}")
             return ""
+
+    activate_excision_bone_tissue = blocking(activate_excision_bone_tissue_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting excision of intra-osseous lesions codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -93,30 +94,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_excision_intra_osseous_code(self, scenario: str) -> str:
+    async def extract_excision_intra_osseous_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract excision of intra-osseous lesions code for a given scenario."""
         try:
             print(f"Analyzing excision of intra-osseous lesions scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:excision_intra_osseous")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Excision of intra-osseous lesions extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_excision_intra_osseous_code: {str(e)}")
             return ""
+
+    extract_excision_intra_osseous_code = blocking(extract_excision_intra_osseous_code_async)
     
-    def activate_excision_intra_osseous(self, scenario: str) -> str:
+    async def activate_excision_intra_osseous_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the excision of intra-osseous lesions analysis process and return results."""
         try:
-            return self.extract_excision_intra_osseous_code(scenario)
+            return await self.extract_excision_intra_osseous_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_excision_intra_osseous: {str(e)}")
             return ""
+
+    activate_excision_intra_osseous = blocking(activate_excision_intra_osseous_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
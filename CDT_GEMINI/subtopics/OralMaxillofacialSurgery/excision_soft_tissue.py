@@ -5,7 +5,8 @@ Module for extracting excision of soft tissue lesions codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -98,16 +99,16 @@ Scenario:
             input_variables=["scenario"]
     )
 
-    def extract_excision_soft_tissue_code(self, scenario: str) -> str:
+    async def extract_excision_soft_tissue_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract excision of soft tissue lesions code for a given scenario."""
         try:
             print(f"Analyzing excision of soft tissue lesions scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:excision_soft_tissue")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Excision of soft tissue lesions extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
@@ -115,14 +116,18 @@ Scenario:
             print(f"Error in extract_excision_soft_tissue_code: {str(e)}")
             return ""
 
-    def activate_excision_soft_tissue(self, scenario: str) -> str:
+    extract_excision_soft_tissue_code = blocking(extract_excision_soft_tissue_code_async)
+
+    async def activate_excision_soft_tissue_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the excision of soft tissue lesions analysis process and return results."""
         try:
-            return self.extract_excision_soft_tissue_code(scenario)
+            return await self.extract_excision_soft_tissue_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_excision_soft_tissue: {str(e)}")
             return ""
 
+    activate_excision_soft_tissue = blocking(activate_excision_soft_tissue_async)
+
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
         print(f"Using model: {self.llm_service.model} with temperature: {self.llm_service.temperature}")
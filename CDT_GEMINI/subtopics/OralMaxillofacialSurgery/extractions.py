@@ -5,7 +5,8 @@ Module for extracting extractions codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -205,16 +206,16 @@ Scenario:
             input_variables=["scenario"]
     )
 
-    def extract_extractions_code(self, scenario: str) -> str:
+    async def extract_extractions_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract extractions code for a given scenario."""
         try:
             print(f"Analyzing extractions scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:extractions")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Extractions extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
@@ -222,14 +223,18 @@ Scenario:
             print(f"Error in extract_extractions_code: {str(e)}")
             return ""
 
-    def activate_extractions(self, scenario: str) -> str:
+    extract_extractions_code = blocking(extract_extractions_code_async)
+
+    async def activate_extractions_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the extractions analysis process and return results."""
         try:
-            return self.extract_extractions_code(scenario)
+            return await self.extract_extractions_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_extractions: {str(e)}")
             return ""
 
+    activate_extractions = blocking(activate_extractions_async)
+
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
         print(f"Using model: {self.llm_service.model} with temperature: {self.llm_service.temperature}")
@@ -5,7 +5,8 @@ Module for extracting open fractures codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -109,16 +110,16 @@ Scenario:
             input_variables=["scenario"]
     )
 
-    def extract_open_fractures_code(self, scenario: str) -> str:
+    async def extract_open_fractures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract open fractures code for a given scenario."""
         try:
             print(f"Analyzing open fractures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:open_fractures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Open fractures extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
@@ -126,13 +127,17 @@ Scenario:
             print(f"Error in extract_open_fractures_code: {str(e)}")
             return ""
 
-    def activate_open_fractures(self, scenario: str) -> str:
+    extract_open_fractures_code = blocking(extract_open_fractures_code_async)
+
+    async def activate_open_fractures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the open fractures analysis process and return results."""
         try:
-            return self.extract_open_fractures_code(scenario)
+            return await self.extract_open_fractures_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_open_fractures: {str(e)}")
             return ""
+
+    activate_open_fractures = blocking(activate_open_fractures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting other oral and maxillofacial surgical procedures codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -204,30 +205,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_other_surgical_procedures_code(self, scenario: str) -> str:
+    async def extract_other_surgical_procedures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract other surgical procedures code for a given scenario."""
         try:
             print(f"Analyzing other surgical procedures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:other_surgical_procedures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Other surgical procedures extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_other_surgical_procedures_code: {str(e)}")
             return ""
+
+    extract_other_surgical_procedures_code = blocking(extract_other_surgical_procedures_code_async)
     
-    def activate_other_surgical_procedures(self, scenario: str) -> str:
+    async def activate_other_surgical_procedures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the other surgical procedures analysis process and return results."""
         try:
-            return self.extract_other_surgical_procedures_code(scenario)
+            return await self.extract_other_surgical_procedures_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_other_surgical_procedures: {str(e)}")
             return ""
+
+    activate_other_surgical_procedures = blocking(activate_other_surgical_procedures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting surgical incision codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -108,30 +109,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_surgical_incision_code(self, scenario: str) -> str:
+    async def extract_surgical_incision_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract surgical incision code for a given scenario."""
         try:
             print(f"Analyzing surgical incision scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:surgical_incision")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Surgical incision extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_surgical_incision_code: {str(e)}")
             return ""
+
+    extract_surgical_incision_code = blocking(extract_surgical_incision_code_async)
     
-    def activate_surgical_incision(self, scenario: str) -> str:
+    async def activate_surgical_incision_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the surgical incision analysis process and return results."""
         try:
-            return self.extract_surgical_incision_code(scenario)
+            return await self.extract_surgical_incision_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_surgical_incision: {str(e)}")
             return ""
+
+    activate_surgical_incision = blocking(activate_surgical_incision_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting TMJ dysfunctions codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -173,30 +174,34 @@ Scenario:
             input_variables=["scenario"]
         )
     
-    def extract_tmj_dysfunctions_code(self, scenario: str) -> str:
+    async def extract_tmj_dysfunctions_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract TMJ dysfunctions code for a given scenario."""
         try:
             print(f"Analyzing TMJ dysfunctions scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:tmj_dysfunctions")
+            code = result.strip() if isinstance(result, str) else result
             print(f"TMJ dysfunctions extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
         except Exception as e:
             print(f"Error in extract_tmj_dysfunctions_code: {str(e)}")
             return ""
+
+    extract_tmj_dysfunctions_code = blocking(extract_tmj_dysfunctions_code_async)
     
-    def activate_tmj_dysfunctions(self, scenario: str) -> str:
+    async def activate_tmj_dysfunctions_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the TMJ dysfunctions analysis process and return results."""
         try:
-            return self.extract_tmj_dysfunctions_code(scenario)
+            return await self.extract_tmj_dysfunctions_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_tmj_dysfunctions: {str(e)}")
             return ""
+
+    activate_tmj_dysfunctions = blocking(activate_tmj_dysfunctions_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
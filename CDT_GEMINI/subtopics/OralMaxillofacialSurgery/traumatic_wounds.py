@@ -5,7 +5,8 @@ Module for extracting traumatic wounds codes.
 import os
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Load environment variables
 load_dotenv()
@@ -78,16 +79,16 @@ Scenario:
             input_variables=["scenario"]
     )
 
-    def extract_traumatic_wounds_code(self, scenario: str) -> str:
+    async def extract_traumatic_wounds_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract traumatic wounds code for a given scenario."""
         try:
             print(f"Analyzing traumatic wounds scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:traumatic_wounds")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Traumatic wounds extract code result: {code}")
             
             # Return empty string if no code found
-            if code == "None" or not code or "not applicable" in code.lower():
+            if isinstance(code, str) and (code == "None" or not code or "not applicable" in code.lower()):
                 return ""
                 
             return code
@@ -95,14 +96,18 @@ Scenario:
             print(f"Error in extract_traumatic_wounds_code: {str(e)}")
             return ""
 
-    def activate_traumatic_wounds(self, scenario: str) -> str:
+    extract_traumatic_wounds_code = blocking(extract_traumatic_wounds_code_async)
+
+    async def activate_traumatic_wounds_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the traumatic wounds analysis process and return results."""
         try:
-            return self.extract_traumatic_wounds_code(scenario)
+            return await self.extract_traumatic_wounds_code_async(scenario)
         except Exception as e:
             print(f"Error in activate_traumatic_wounds: {str(e)}")
             return ""
 
+    activate_traumatic_wounds = blocking(activate_traumatic_wounds_async)
+
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
         print(f"Using model: {self.llm_service.model} with temperature: {self.llm_service.temperature}")
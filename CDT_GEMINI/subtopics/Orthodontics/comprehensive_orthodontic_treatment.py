@@ -5,7 +5,8 @@ Module for extracting comprehensive orthodontic treatment codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -64,22 +65,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
     )
 
-    def extract_comprehensive_orthodontic_treatment_code(self, scenario: str) -> str:
+    async def extract_comprehensive_orthodontic_treatment_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract comprehensive orthodontic treatment code for a given scenario."""
         try:
             print(f"Analyzing comprehensive orthodontic treatment scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:comprehensive_orthodontic_treatment")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Comprehensive orthodontic treatment extract_comprehensive_orthodontic_treatment_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in comprehensive orthodontic treatment code extraction: {str(e)}")
             return ""
 
-    def activate_comprehensive_orthodontic_treatment(self, scenario: str) -> str:
+    extract_comprehensive_orthodontic_treatment_code = blocking(extract_comprehensive_orthodontic_treatment_code_async)
+
+    async def activate_comprehensive_orthodontic_treatment_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the comprehensive orthodontic treatment analysis process and return results."""
         try:
-            result = self.extract_comprehensive_orthodontic_treatment_code(scenario)
+            result = await self.extract_comprehensive_orthodontic_treatment_code_async(scenario)
             if not result:
                 print("No comprehensive orthodontic treatment code returned")
                 return ""
@@ -87,6 +90,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating comprehensive orthodontic treatment analysis: {str(e)}")
             return "" 
+
+    activate_comprehensive_orthodontic_treatment = blocking(activate_comprehensive_orthodontic_treatment_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
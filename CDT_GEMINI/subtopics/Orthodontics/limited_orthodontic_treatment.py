@@ -5,7 +5,8 @@ Module for extracting limited orthodontic treatment codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -67,22 +68,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
     )
 
-    def extract_limited_orthodontic_treatment_code(self, scenario: str) -> str:
+    async def extract_limited_orthodontic_treatment_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract limited orthodontic treatment code for a given scenario."""
         try:
             print(f"Analyzing limited orthodontic treatment scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:limited_orthodontic_treatment")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Limited orthodontic treatment extract_limited_orthodontic_treatment_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in limited orthodontic treatment code extraction: {str(e)}")
             return ""
 
-    def activate_limited_orthodontic_treatment(self, scenario: str) -> str:
+    extract_limited_orthodontic_treatment_code = blocking(extract_limited_orthodontic_treatment_code_async)
+
+    async def activate_limited_orthodontic_treatment_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the limited orthodontic treatment analysis process and return results."""
         try:
-            result = self.extract_limited_orthodontic_treatment_code(scenario)
+            result = await self.extract_limited_orthodontic_treatment_code_async(scenario)
             if not result:
                 print("No limited orthodontic treatment code returned")
                 return ""
@@ -90,6 +93,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating limited orthodontic treatment analysis: {str(e)}")
             return "" 
+
+    activate_limited_orthodontic_treatment = blocking(activate_limited_orthodontic_treatment_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
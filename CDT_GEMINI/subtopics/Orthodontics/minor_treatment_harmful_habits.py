@@ -5,7 +5,8 @@ Module for extracting minor treatment to control harmful habits codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -57,22 +58,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_minor_treatment_harmful_habits_code(self, scenario: str) -> str:
+    async def extract_minor_treatment_harmful_habits_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract minor treatment to control harmful habits code for a given scenario."""
         try:
             print(f"Analyzing minor treatment to control harmful habits scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:minor_treatment_harmful_habits")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Minor treatment to control harmful habits extract_minor_treatment_harmful_habits_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in minor treatment to control harmful habits code extraction: {str(e)}")
             return ""
+
+    extract_minor_treatment_harmful_habits_code = blocking(extract_minor_treatment_harmful_habits_code_async)
     
-    def activate_minor_treatment_harmful_habits(self, scenario: str) -> str:
+    async def activate_minor_treatment_harmful_habits_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the minor treatment to control harmful habits analysis process and return results."""
         try:
-            result = self.extract_minor_treatment_harmful_habits_code(scenario)
+            result = await self.extract_minor_treatment_harmful_habits_code_async(scenario)
             if not result:
                 print("No minor treatment to control harmful habits code returned")
                 return ""
@@ -80,6 +83,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating minor treatment to control harmful habits analysis: {str(e)}")
             return ""
+
+    activate_minor_treatment_harmful_habits = blocking(activate_minor_treatment_harmful_habits_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting surgical periodontal services codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -675,22 +676,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_surgical_services_code(self, scenario: str) -> str:
+    async def extract_surgical_services_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract surgical periodontal services code for a given scenario."""
         try:
             print(f"Analyzing surgical periodontal scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:surgical_services")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Surgical periodontal extract_surgical_services_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in surgical periodontal code extraction: {str(e)}")
             return ""
+
+    extract_surgical_services_code = blocking(extract_surgical_services_code_async)
     
-    def activate_surgical_services(self, scenario: str) -> str:
+    async def activate_surgical_services_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the surgical periodontal services analysis process and return results."""
         try:
-            result = self.extract_surgical_services_code(scenario)
+            result = await self.extract_surgical_services_code_async(scenario)
             if not result:
                 print("No surgical periodontal code returned")
                 return ""
@@ -698,6 +701,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating surgical periodontal analysis: {str(e)}")
             return ""
+
+    activate_surgical_services = blocking(activate_surgical_services_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting dental prophylaxis codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -91,22 +92,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_dental_prophylaxis_code(self, scenario: str) -> str:
+    async def extract_dental_prophylaxis_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract dental prophylaxis code(s) for a given scenario."""
         try:
             print(f"Analyzing dental prophylaxis scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:dental_prophylaxis")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Dental prophylaxis extract_dental_prophylaxis_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in dental prophylaxis code extraction: {str(e)}")
             return ""
+
+    extract_dental_prophylaxis_code = blocking(extract_dental_prophylaxis_code_async)
     
-    def activate_dental_prophylaxis(self, scenario: str) -> str:
+    async def activate_dental_prophylaxis_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the dental prophylaxis analysis process and return results."""
         try:
-            result = self.extract_dental_prophylaxis_code(scenario)
+            result = await self.extract_dental_prophylaxis_code_async(scenario)
             if not result:
                 print("No dental prophylaxis code returned")
                 return ""
@@ -114,6 +117,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating dental prophylaxis analysis: {str(e)}")
             return ""
+
+    activate_dental_prophylaxis = blocking(activate_dental_prophylaxis_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
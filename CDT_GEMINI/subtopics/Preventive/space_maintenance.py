@@ -5,7 +5,8 @@ Module for extracting space maintenance and space maintainers codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -280,19 +281,21 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
 
-    def extract_space_maintenance_code(self, scenario: str) -> str:
+    async def extract_space_maintenance_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract space maintenance code(s) for a given scenario."""
         try:
             print(f"Analyzing space maintenance scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.space_maintenance_prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.space_maintenance_prompt_template, {"scenario": scenario}, stage="subtopic:space_maintenance")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Space maintenance extract_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in space maintenance code extraction: {str(e)}")
             return ""
+
+    extract_space_maintenance_code = blocking(extract_space_maintenance_code_async)
     
-    def extract_space_maintainers_code(self, scenario: str) -> str:
+    async def extract_space_maintainers_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract space maintainers code(s) for a given scenario."""
         try:
             # First check if this is about bilateral maxillary space maintainer removal
@@ -305,24 +308,26 @@ Scenario: {{scenario}}
             
             # Only proceed with chain if not a maxillary bilateral removal scenario
             print(f"Analyzing space maintainers scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.space_maintainers_prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.space_maintainers_prompt_template, {"scenario": scenario}, stage="subtopic:space_maintainers")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Space maintainers extract_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in space maintainers code extraction: {str(e)}")
             return ""
+
+    extract_space_maintainers_code = blocking(extract_space_maintainers_code_async)
             
-    def activate_space_maintenance(self, scenario: str) -> str:
+    async def activate_space_maintenance_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the space maintenance analysis process and return results."""
         try:
             # First try the space_maintainers analysis for distal shoe scenarios
-            maintainers_result = self.extract_space_maintainers_code(scenario)
+            maintainers_result = await self.extract_space_maintainers_code_async(scenario)
             if maintainers_result:
                 return maintainers_result
                 
             # Then try regular space maintenance if no distal shoe code was found
-            result = self.extract_space_maintenance_code(scenario)
+            result = await self.extract_space_maintenance_code_async(scenario)
             if not result:
                 print("No space maintenance code returned")
                 return ""
@@ -330,6 +335,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating space maintenance analysis: {str(e)}")
             return ""
+
+    activate_space_maintenance = blocking(activate_space_maintenance_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -339,14 +346,16 @@ Scenario: {{scenario}}
         print(f"SPACE MAINTENANCE CODE: {result if result else 'None'}")
 
     # Legacy methods for backward compatibility
-    def activate_space_maintainers(self, scenario: str) -> str:
+    async def activate_space_maintainers_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the space maintainers analysis process and return results."""
         try:
-            return self.extract_space_maintainers_code(scenario)
+            return await self.extract_space_maintainers_code_async(scenario)
         except Exception as e:
             print(f"Error activating space maintainers analysis: {str(e)}")
             return ""
 
+    activate_space_maintainers = blocking(activate_space_maintainers_async)
+
 space_maintenance_service = SpaceMaintenanceServices()
 # Example usage
 if __name__ == "__main__":
@@ -5,7 +5,8 @@ Module for extracting topical fluoride codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -88,22 +89,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_topical_fluoride_code(self, scenario: str) -> str:
+    async def extract_topical_fluoride_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract topical fluoride code(s) for a given scenario."""
         try:
             print(f"Analyzing topical fluoride scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:topical_fluoride")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Topical fluoride extract_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in topical fluoride code extraction: {str(e)}")
             return ""
+
+    extract_topical_fluoride_code = blocking(extract_topical_fluoride_code_async)
     
-    def activate_topical_fluoride(self, scenario: str) -> str:
+    async def activate_topical_fluoride_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the topical fluoride analysis process and return results."""
         try:
-            result = self.extract_topical_fluoride_code(scenario)
+            result = await self.extract_topical_fluoride_code_async(scenario)
             if not result:
                 print("No topical fluoride code returned")
                 return ""
@@ -111,6 +114,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating topical fluoride analysis: {str(e)}")
             return ""
+
+    activate_topical_fluoride = blocking(activate_topical_fluoride_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting vaccination codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -264,7 +265,7 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_vaccinations_code(self, scenario: str) -> str:
+    async def extract_vaccinations_code_async(self, scenario: str) -> SubtopicAnswer:
         """
         Extract the appropriate vaccination code based on a clinical scenario.
         
@@ -276,15 +277,17 @@ SCENARIO: {{scenario}}
         """
         try:
             print(f"Analyzing vaccination scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:vaccinations")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Vaccination extract_vaccinations_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in vaccination code extraction: {str(e)}")
             return ""
+
+    extract_vaccinations_code = blocking(extract_vaccinations_code_async)
     
-    def activate_vaccinations(self, scenario: str) -> str:
+    async def activate_vaccinations_async(self, scenario: str) -> SubtopicAnswer:
         """
         Activate the vaccination code extraction process and return results.
         
@@ -295,7 +298,7 @@ SCENARIO: {{scenario}}
             str: The extracted vaccination code or empty string if none found.
         """
         try:
-            result = self.extract_vaccinations_code(scenario)
+            result = await self.extract_vaccinations_code_async(scenario)
             if not result:
                 print("No vaccination code returned")
                 return ""
@@ -303,6 +306,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating vaccination analysis: {str(e)}")
             return ""
+
+    activate_vaccinations = blocking(activate_vaccinations_async)
     
     def run_analysis(self, scenario: str) -> None:
         """
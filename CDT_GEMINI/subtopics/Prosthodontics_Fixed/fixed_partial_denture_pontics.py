@@ -5,7 +5,8 @@ Module for extracting fixed partial denture pontics codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -129,22 +130,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_fixed_partial_denture_pontics_code(self, scenario: str) -> str:
+    async def extract_fixed_partial_denture_pontics_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract fixed partial denture pontics code(s) for a given scenario."""
         try:
             print(f"Analyzing fixed partial denture pontics scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:fixed_partial_denture_pontics")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Fixed partial denture pontics extract_fixed_partial_denture_pontics_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in fixed partial denture pontics code extraction: {str(e)}")
             return ""
+
+    extract_fixed_partial_denture_pontics_code = blocking(extract_fixed_partial_denture_pontics_code_async)
     
-    def activate_fixed_partial_denture_pontics(self, scenario: str) -> str:
+    async def activate_fixed_partial_denture_pontics_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the fixed partial denture pontics analysis process and return results."""
         try:
-            result = self.extract_fixed_partial_denture_pontics_code(scenario)
+            result = await self.extract_fixed_partial_denture_pontics_code_async(scenario)
             if not result:
                 print("No fixed partial denture pontics code returned")
                 return ""
@@ -152,6 +155,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating fixed partial denture pontics analysis: {str(e)}")
             return ""
+
+    activate_fixed_partial_denture_pontics = blocking(activate_fixed_partial_denture_pontics_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting fixed partial denture retainers - crowns codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -204,22 +205,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_fixed_partial_denture_retainers_crowns_code(self, scenario: str) -> str:
+    async def extract_fixed_partial_denture_retainers_crowns_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract fixed partial denture retainers crowns code(s) for a given scenario."""
         try:
             print(f"Analyzing fixed partial denture retainers crowns scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:fixed_partial_denture_retainers_crowns")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Fixed partial denture retainers crowns extract_fixed_partial_denture_retainers_crowns_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in fixed partial denture retainers crowns code extraction: {str(e)}")
             return ""
+
+    extract_fixed_partial_denture_retainers_crowns_code = blocking(extract_fixed_partial_denture_retainers_crowns_code_async)
     
-    def activate_fixed_partial_denture_retainers_crowns(self, scenario: str) -> str:
+    async def activate_fixed_partial_denture_retainers_crowns_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the fixed partial denture retainers crowns analysis process and return results."""
         try:
-            result = self.extract_fixed_partial_denture_retainers_crowns_code(scenario)
+            result = await self.extract_fixed_partial_denture_retainers_crowns_code_async(scenario)
             if not result:
                 print("No fixed partial denture retainers crowns code returned")
                 return ""
@@ -227,6 +230,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating fixed partial denture retainers crowns analysis: {str(e)}")
             return ""
+
+    activate_fixed_partial_denture_retainers_crowns = blocking(activate_fixed_partial_denture_retainers_crowns_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
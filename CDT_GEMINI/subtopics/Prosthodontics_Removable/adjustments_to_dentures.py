@@ -5,7 +5,8 @@ Module for extracting adjustments to dentures codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -102,22 +103,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_adjustments_to_dentures_code(self, scenario: str) -> str:
+    async def extract_adjustments_to_dentures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract adjustments to dentures code(s) for a given scenario."""
         try:
             print(f"Analyzing adjustments to dentures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:adjustments_to_dentures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Adjustments to dentures extract_adjustments_to_dentures_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in adjustments to dentures code extraction: {str(e)}")
             return ""
+
+    extract_adjustments_to_dentures_code = blocking(extract_adjustments_to_dentures_code_async)
     
-    def activate_adjustments_to_dentures(self, scenario: str) -> str:
+    async def activate_adjustments_to_dentures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the adjustments to dentures analysis process and return results."""
         try:
-            result = self.extract_adjustments_to_dentures_code(scenario)
+            result = await self.extract_adjustments_to_dentures_code_async(scenario)
             if not result:
                 print("No adjustments to dentures code returned")
                 return ""
@@ -125,6 +128,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating adjustments to dentures analysis: {str(e)}")
             return ""
+
+    activate_adjustments_to_dentures = blocking(activate_adjustments_to_dentures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
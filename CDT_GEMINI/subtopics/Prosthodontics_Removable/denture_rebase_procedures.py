@@ -5,7 +5,8 @@ Module for extracting denture rebase procedures codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -89,22 +90,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_denture_rebase_procedures_code(self, scenario: str) -> str:
+    async def extract_denture_rebase_procedures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract denture rebase procedures code(s) for a given scenario."""
         try:
             print(f"Analyzing denture rebase procedures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:denture_rebase_procedures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Denture rebase procedures extract_denture_rebase_procedures_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in denture rebase procedures code extraction: {str(e)}")
             return ""
+
+    extract_denture_rebase_procedures_code = blocking(extract_denture_rebase_procedures_code_async)
     
-    def activate_denture_rebase_procedures(self, scenario: str) -> str:
+    async def activate_denture_rebase_procedures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the denture rebase procedures analysis process and return results."""
         try:
-            result = self.extract_denture_rebase_procedures_code(scenario)
+            result = await self.extract_denture_rebase_procedures_code_async(scenario)
             if not result:
                 print("No denture rebase procedures code returned")
                 return ""
@@ -112,6 +115,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating denture rebase procedures analysis: {str(e)}")
             return ""
+
+    activate_denture_rebase_procedures = blocking(activate_denture_rebase_procedures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting denture reline procedures codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -111,22 +112,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_denture_reline_procedures_code(self, scenario: str) -> str:
+    async def extract_denture_reline_procedures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract denture reline procedures code(s) for a given scenario."""
         try:
             print(f"Analyzing denture reline procedures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:denture_reline_procedures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Denture reline procedures extract_denture_reline_procedures_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in denture reline procedures code extraction: {str(e)}")
             return ""
+
+    extract_denture_reline_procedures_code = blocking(extract_denture_reline_procedures_code_async)
     
-    def activate_denture_reline_procedures(self, scenario: str) -> str:
+    async def activate_denture_reline_procedures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the denture reline procedures analysis process and return results."""
         try:
-            result = self.extract_denture_reline_procedures_code(scenario)
+            result = await self.extract_denture_reline_procedures_code_async(scenario)
             if not result:
                 print("No denture reline procedures code returned")
                 return ""
@@ -134,6 +137,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating denture reline procedures analysis: {str(e)}")
             return ""
+
+    activate_denture_reline_procedures = blocking(activate_denture_reline_procedures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting interim prosthesis codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -110,22 +111,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_interim_prosthesis_code(self, scenario: str) -> str:
+    async def extract_interim_prosthesis_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract interim prosthesis code(s) for a given scenario."""
         try:
             print(f"Analyzing interim prosthesis scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:interim_prosthesis")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Interim prosthesis extract_interim_prosthesis_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in interim prosthesis code extraction: {str(e)}")
             return ""
+
+    extract_interim_prosthesis_code = blocking(extract_interim_prosthesis_code_async)
     
-    def activate_interim_prosthesis(self, scenario: str) -> str:
+    async def activate_interim_prosthesis_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the interim prosthesis analysis process and return results."""
         try:
-            result = self.extract_interim_prosthesis_code(scenario)
+            result = await self.extract_interim_prosthesis_code_async(scenario)
             if not result:
                 print("No interim prosthesis code returned")
                 return ""
@@ -133,6 +136,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating interim prosthesis analysis: {str(e)}")
             return ""
+
+    activate_interim_prosthesis = blocking(activate_interim_prosthesis_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting other removable prosthetic services codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -137,22 +138,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_other_removable_prosthetic_services_code(self, scenario: str) -> str:
+    async def extract_other_removable_prosthetic_services_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract other removable prosthetic services code(s) for a given scenario."""
         try:
             print(f"Analyzing other removable prosthetic services scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:other_removable_prosthetic_services")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Other removable prosthetic services extract_other_removable_prosthetic_services_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in other removable prosthetic services code extraction: {str(e)}")
             return ""
+
+    extract_other_removable_prosthetic_services_code = blocking(extract_other_removable_prosthetic_services_code_async)
     
-    def activate_other_removable_prosthetic_services(self, scenario: str) -> str:
+    async def activate_other_removable_prosthetic_services_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the other removable prosthetic services analysis process and return results."""
         try:
-            result = self.extract_other_removable_prosthetic_services_code(scenario)
+            result = await self.extract_other_removable_prosthetic_services_code_async(scenario)
             if not result:
                 print("No other removable prosthetic services code returned")
                 return ""
@@ -160,6 +163,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating other removable prosthetic services analysis: {str(e)}")
             return ""
+
+    activate_other_removable_prosthetic_services = blocking(activate_other_removable_prosthetic_services_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -163,22 +164,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_partial_denture_code(self, scenario: str) -> str:
+    async def extract_partial_denture_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract partial denture code(s) for a given scenario."""
         try:
             print(f"Analyzing partial denture scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:partial_denture")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Partial denture extract_partial_denture_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in partial denture code extraction: {str(e)}")
             return ""
+
+    extract_partial_denture_code = blocking(extract_partial_denture_code_async)
     
-    def activate_partial_denture(self, scenario: str) -> str:
+    async def activate_partial_denture_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the partial denture analysis process and return results."""
         try:
-            result = self.extract_partial_denture_code(scenario)
+            result = await self.extract_partial_denture_code_async(scenario)
             if not result:
                 print("No partial denture code returned")
                 return ""
@@ -186,6 +189,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating partial denture analysis: {str(e)}")
             return ""
+
+    activate_partial_denture = blocking(activate_partial_denture_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
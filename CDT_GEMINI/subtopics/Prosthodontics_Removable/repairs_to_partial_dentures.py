@@ -5,7 +5,8 @@ Module for extracting repairs to partial dentures codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -122,22 +123,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_repairs_to_partial_dentures_code(self, scenario: str) -> str:
+    async def extract_repairs_to_partial_dentures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract repairs to partial dentures code(s) for a given scenario."""
         try:
             print(f"Analyzing repairs to partial dentures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:repairs_to_partial_dentures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Repairs to partial dentures extract_repairs_to_partial_dentures_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in repairs to partial dentures code extraction: {str(e)}")
             return ""
+
+    extract_repairs_to_partial_dentures_code = blocking(extract_repairs_to_partial_dentures_code_async)
     
-    def activate_repairs_to_partial_dentures(self, scenario: str) -> str:
+    async def activate_repairs_to_partial_dentures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the repairs to partial dentures analysis process and return results."""
         try:
-            result = self.extract_repairs_to_partial_dentures_code(scenario)
+            result = await self.extract_repairs_to_partial_dentures_code_async(scenario)
             if not result:
                 print("No repairs to partial dentures code returned")
                 return ""
@@ -145,6 +148,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating repairs to partial dentures analysis: {str(e)}")
             return ""
+
+    activate_repairs_to_partial_dentures = blocking(activate_repairs_to_partial_dentures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting tissue conditioning codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -96,22 +97,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_tissue_conditioning_code(self, scenario: str) -> str:
+    async def extract_tissue_conditioning_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract tissue conditioning code(s) for a given scenario."""
         try:
             print(f"Analyzing tissue conditioning scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:tissue_conditioning")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Tissue conditioning extract_tissue_conditioning_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in tissue conditioning code extraction: {str(e)}")
             return ""
+
+    extract_tissue_conditioning_code = blocking(extract_tissue_conditioning_code_async)
     
-    def activate_tissue_conditioning(self, scenario: str) -> str:
+    async def activate_tissue_conditioning_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the tissue conditioning analysis process and return results."""
         try:
-            result = self.extract_tissue_conditioning_code(scenario)
+            result = await self.extract_tissue_conditioning_code_async(scenario)
             if not result:
                 print("No tissue conditioning code returned")
                 return ""
@@ -119,6 +122,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating tissue conditioning analysis: {str(e)}")
             return ""
+
+    activate_tissue_conditioning = blocking(activate_tissue_conditioning_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting unspecified removable prosthodontic procedure codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -68,22 +69,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_unspecified_removable_prosthodontic_procedure_code(self, scenario: str) -> str:
+    async def extract_unspecified_removable_prosthodontic_procedure_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract unspecified removable prosthodontic procedure code(s) for a given scenario."""
         try:
             print(f"Analyzing unspecified removable prosthodontic procedure scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:unspecified_removable_prosthodontic_procedure")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Unspecified removable prosthodontic procedure extract_unspecified_removable_prosthodontic_procedure_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in unspecified removable prosthodontic procedure code extraction: {str(e)}")
             return ""
+
+    extract_unspecified_removable_prosthodontic_procedure_code = blocking(extract_unspecified_removable_prosthodontic_procedure_code_async)
     
-    def activate_unspecified_removable_prosthodontic_procedure(self, scenario: str) -> str:
+    async def activate_unspecified_removable_prosthodontic_procedure_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the unspecified removable prosthodontic procedure analysis process and return results."""
         try:
-            result = self.extract_unspecified_removable_prosthodontic_procedure_code(scenario)
+            result = await self.extract_unspecified_removable_prosthodontic_procedure_code_async(scenario)
             if not result:
                 print("No unspecified removable prosthodontic procedure code returned")
                 return ""
@@ -91,6 +94,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating unspecified removable prosthodontic procedure analysis: {str(e)}")
             return ""
+
+    activate_unspecified_removable_prosthodontic_procedure = blocking(activate_unspecified_removable_prosthodontic_procedure_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
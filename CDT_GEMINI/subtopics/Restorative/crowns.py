@@ -5,7 +5,8 @@ Module for extracting crown codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -156,22 +157,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_crowns_code(self, scenario: str) -> str:
+    async def extract_crowns_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract crown code(s) for a given scenario."""
         try:
             print(f"Analyzing crowns scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:crowns")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Crowns extract_crowns_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in crowns code extraction: {str(e)}")
             return ""
+
+    extract_crowns_code = blocking(extract_crowns_code_async)
     
-    def activate_crowns(self, scenario: str) -> str:
+    async def activate_crowns_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the crowns analysis process and return results."""
         try:
-            result = self.extract_crowns_code(scenario)
+            result = await self.extract_crowns_code_async(scenario)
             if not result:
                 print("No crowns code returned")
                 return ""
@@ -179,6 +182,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating crowns analysis: {str(e)}")
             return ""
+
+    activate_crowns = blocking(activate_crowns_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
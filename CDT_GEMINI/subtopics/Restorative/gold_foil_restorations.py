@@ -5,7 +5,8 @@ Module for extracting gold foil restorations codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -102,22 +103,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_gold_foil_restorations_code(self, scenario: str) -> str:
+    async def extract_gold_foil_restorations_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract gold foil restorations code(s) for a given scenario."""
         try:
             print(f"Analyzing gold foil restorations scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:gold_foil_restorations")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Gold foil restorations extract_gold_foil_restorations_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in gold foil restorations code extraction: {str(e)}")
             return ""
+
+    extract_gold_foil_restorations_code = blocking(extract_gold_foil_restorations_code_async)
     
-    def activate_gold_foil_restorations(self, scenario: str) -> str:
+    async def activate_gold_foil_restorations_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the gold foil restorations analysis process and return results."""
         try:
-            result = self.extract_gold_foil_restorations_code(scenario)
+            result = await self.extract_gold_foil_restorations_code_async(scenario)
             if not result:
                 print("No gold foil restorations code returned")
                 return ""
@@ -125,6 +128,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating gold foil restorations analysis: {str(e)}")
             return ""
+
+    activate_gold_foil_restorations = blocking(activate_gold_foil_restorations_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting inlays and onlays codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -148,22 +149,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_inlays_and_onlays_code(self, scenario: str) -> str:
+    async def extract_inlays_and_onlays_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract inlays and onlays code(s) for a given scenario."""
         try:
             print(f"Analyzing inlays and onlays scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:inlays_and_onlays")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Inlays and onlays extract_inlays_and_onlays_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in inlays and onlays code extraction: {str(e)}")
             return ""
+
+    extract_inlays_and_onlays_code = blocking(extract_inlays_and_onlays_code_async)
     
-    def activate_inlays_and_onlays(self, scenario: str) -> str:
+    async def activate_inlays_and_onlays_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the inlays and onlays analysis process and return results."""
         try:
-            result = self.extract_inlays_and_onlays_code(scenario)
+            result = await self.extract_inlays_and_onlays_code_async(scenario)
             if not result:
                 print("No inlays and onlays code returned")
                 return ""
@@ -171,6 +174,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating inlays and onlays analysis: {str(e)}")
             return ""
+
+    activate_inlays_and_onlays = blocking(activate_inlays_and_onlays_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -5,7 +5,8 @@ Module for extracting resin-based composite restorations codes.
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 # Add the parent directory to the Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -173,22 +174,24 @@ SCENARIO: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_resin_based_composite_restorations_code(self, scenario: str) -> str:
+    async def extract_resin_based_composite_restorations_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract resin-based composite restorations code(s) for a given scenario."""
         try:
             print(f"Analyzing resin-based composite restorations scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:resin_based_composite_restorations")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Resin-based composite restorations extract_resin_based_composite_restorations_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in resin-based composite restorations code extraction: {str(e)}")
             return ""
+
+    extract_resin_based_composite_restorations_code = blocking(extract_resin_based_composite_restorations_code_async)
     
-    def activate_resin_based_composite_restorations(self, scenario: str) -> str:
+    async def activate_resin_based_composite_restorations_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the resin-based composite restorations analysis process and return results."""
         try:
-            result = self.extract_resin_based_composite_restorations_code(scenario)
+            result = await self.extract_resin_based_composite_restorations_code_async(scenario)
             if not result:
                 print("No resin-based composite restorations code returned")
                 return ""
@@ -196,6 +199,8 @@ SCENARIO: {{scenario}}
         except Exception as e:
             print(f"Error activating resin-based composite restorations analysis: {str(e)}")
             return ""
+
+    activate_resin_based_composite_restorations = blocking(activate_resin_based_composite_restorations_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
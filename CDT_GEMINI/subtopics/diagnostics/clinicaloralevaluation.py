@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -180,22 +181,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_clinical_oral_evaluations_code(self, scenario: str) -> str:
+    async def extract_clinical_oral_evaluations_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract clinical oral evaluation code(s) for a given scenario."""
         try:
             print(f"Analyzing clinical oral evaluations scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:clinicaloralevaluation")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Clinical oral evaluations extract_clinical_oral_evaluations_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in clinical oral evaluations code extraction: {str(e)}")
             return ""
+
+    extract_clinical_oral_evaluations_code = blocking(extract_clinical_oral_evaluations_code_async)
     
-    def activate_clinical_oral_evaluations(self, scenario: str) -> str:
+    async def activate_clinical_oral_evaluations_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the clinical oral evaluations analysis process and return results."""
         try:
-            result = self.extract_clinical_oral_evaluations_code(scenario)
+            result = await self.extract_clinical_oral_evaluations_code_async(scenario)
             if not result:
                 print("No clinical oral evaluations code returned")
                 return ""
@@ -203,6 +206,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating clinical oral evaluations analysis: {str(e)}")
             return ""
+
+    activate_clinical_oral_evaluations = blocking(activate_clinical_oral_evaluations_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
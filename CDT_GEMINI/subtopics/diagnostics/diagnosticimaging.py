@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -304,22 +305,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_diagnostic_imaging_code(self, scenario: str) -> str:
+    async def extract_diagnostic_imaging_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract diagnostic imaging code(s) for a given scenario."""
         try:
             print(f"Analyzing diagnostic imaging scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:diagnosticimaging")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Diagnostic imaging extract_diagnostic_imaging_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in diagnostic imaging code extraction: {str(e)}")
             return ""
+
+    extract_diagnostic_imaging_code = blocking(extract_diagnostic_imaging_code_async)
     
-    def activate_diagnostic_imaging(self, scenario: str) -> str:
+    async def activate_diagnostic_imaging_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the diagnostic imaging analysis process and return results."""
         try:
-            result = self.extract_diagnostic_imaging_code(scenario)
+            result = await self.extract_diagnostic_imaging_code_async(scenario)
             if not result:
                 print("No diagnostic imaging code returned")
                 return ""
@@ -327,6 +330,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating diagnostic imaging analysis: {str(e)}")
             return ""
+
+    activate_diagnostic_imaging = blocking(activate_diagnostic_imaging_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
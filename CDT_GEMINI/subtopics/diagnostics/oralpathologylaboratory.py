@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -231,22 +232,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_oral_pathology_laboratory_code(self, scenario: str) -> str:
+    async def extract_oral_pathology_laboratory_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract oral pathology laboratory code(s) for a given scenario."""
         try:
             print(f"Analyzing oral pathology laboratory scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:oralpathologylaboratory")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Oral pathology laboratory extract_oral_pathology_laboratory_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in oral pathology laboratory code extraction: {str(e)}")
             return ""
+
+    extract_oral_pathology_laboratory_code = blocking(extract_oral_pathology_laboratory_code_async)
     
-    def activate_oral_pathology_laboratory(self, scenario: str) -> str:
+    async def activate_oral_pathology_laboratory_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the oral pathology laboratory analysis process and return results."""
         try:
-            result = self.extract_oral_pathology_laboratory_code(scenario)
+            result = await self.extract_oral_pathology_laboratory_code_async(scenario)
             if not result:
                 print("No oral pathology laboratory code returned")
                 return ""
@@ -254,6 +257,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating oral pathology laboratory analysis: {str(e)}")
             return ""
+
+    activate_oral_pathology_laboratory = blocking(activate_oral_pathology_laboratory_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
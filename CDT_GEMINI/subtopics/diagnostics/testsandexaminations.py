@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -291,22 +292,24 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_tests_and_examinations_code(self, scenario: str) -> str:
+    async def extract_tests_and_examinations_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract tests and examinations code(s) for a given scenario."""
         try:
             print(f"Analyzing tests and examinations scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:testsandexaminations")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Tests and examinations extract_tests_and_examinations_code result: {code}")
             return code
         except Exception as e:
             print(f"Error in tests and examinations code extraction: {str(e)}")
             return ""
+
+    extract_tests_and_examinations_code = blocking(extract_tests_and_examinations_code_async)
     
-    def activate_tests_and_examinations(self, scenario: str) -> str:
+    async def activate_tests_and_examinations_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the tests and examinations analysis process and return results."""
         try:
-            result = self.extract_tests_and_examinations_code(scenario)
+            result = await self.extract_tests_and_examinations_code_async(scenario)
             if not result:
                 print("No tests and examinations code returned")
                 return ""
@@ -314,6 +317,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating tests and examinations analysis: {str(e)}")
             return ""
+
+    activate_tests_and_examinations = blocking(activate_tests_and_examinations_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
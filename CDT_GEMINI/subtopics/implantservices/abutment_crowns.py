@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -189,24 +190,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_abutment_crowns_code(self, scenario: str) -> str:
+    async def extract_abutment_crowns_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract abutment-supported single crown code(s) for a given scenario."""
         try:
             print(f"Analyzing abutment crowns scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:abutment_crowns")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Abutment crowns extract_abutment_crowns_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in abutment crowns code extraction: {str(e)}")
             return ""
+
+    extract_abutment_crowns_code = blocking(extract_abutment_crowns_code_async)
     
-    def activate_single_crowns_abutment(self, scenario: str) -> str:
+    async def activate_single_crowns_abutment_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the abutment-supported single crowns analysis process and return results."""
         try:
-            result = self.extract_abutment_crowns_code(scenario)
+            result = await self.extract_abutment_crowns_code_async(scenario)
             if not result:
                 print("No abutment crowns code returned")
                 return ""
@@ -214,6 +217,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating abutment crowns analysis: {str(e)}")
             return ""
+
+    activate_single_crowns_abutment = blocking(activate_single_crowns_abutment_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
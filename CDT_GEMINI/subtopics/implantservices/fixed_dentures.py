@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -145,24 +146,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_fixed_dentures_code(self, scenario: str) -> str:
+    async def extract_fixed_dentures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract implant/abutment-supported fixed dentures code(s) for a given scenario."""
         try:
             print(f"Analyzing fixed dentures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:fixed_dentures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Fixed dentures extract_fixed_dentures_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in fixed dentures code extraction: {str(e)}")
             return ""
+
+    extract_fixed_dentures_code = blocking(extract_fixed_dentures_code_async)
     
-    def activate_implant_supported_fixed_dentures(self, scenario: str) -> str:
+    async def activate_implant_supported_fixed_dentures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the implant/abutment-supported fixed dentures analysis process and return results."""
         try:
-            result = self.extract_fixed_dentures_code(scenario)
+            result = await self.extract_fixed_dentures_code_async(scenario)
             if not result:
                 print("No fixed dentures code returned")
                 return ""
@@ -170,6 +173,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating fixed dentures analysis: {str(e)}")
             return ""
+
+    activate_implant_supported_fixed_dentures = blocking(activate_implant_supported_fixed_dentures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
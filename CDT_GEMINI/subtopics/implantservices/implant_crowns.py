@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -189,24 +190,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_implant_crowns_code(self, scenario: str) -> str:
+    async def extract_implant_crowns_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract implant-supported single crown code(s) for a given scenario."""
         try:
             print(f"Analyzing implant crowns scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:implant_crowns")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Implant crowns extract_implant_crowns_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in implant crowns code extraction: {str(e)}")
             return ""
+
+    extract_implant_crowns_code = blocking(extract_implant_crowns_code_async)
     
-    def activate_single_crowns_implant(self, scenario: str) -> str:
+    async def activate_single_crowns_implant_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the implant-supported single crowns analysis process and return results."""
         try:
-            result = self.extract_implant_crowns_code(scenario)
+            result = await self.extract_implant_crowns_code_async(scenario)
             if not result:
                 print("No implant crowns code returned")
                 return ""
@@ -214,6 +217,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating implant crowns analysis: {str(e)}")
             return ""
+
+    activate_single_crowns_implant = blocking(activate_single_crowns_implant_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -144,24 +145,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_implant_supported_prosthetics_code(self, scenario: str) -> str:
+    async def extract_implant_supported_prosthetics_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract implant-supported prosthetics component code(s) for a given scenario."""
         try:
             print(f"Analyzing implant prosthetics scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:implant_supported_prosthetics")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Implant prosthetics extract_implant_supported_prosthetics_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in implant prosthetics code extraction: {str(e)}")
             return ""
+
+    extract_implant_supported_prosthetics_code = blocking(extract_implant_supported_prosthetics_code_async)
     
-    def activate_implant_supported_prosthetics(self, scenario: str) -> str:
+    async def activate_implant_supported_prosthetics_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the implant-supported prosthetics analysis process and return results."""
         try:
-            result = self.extract_implant_supported_prosthetics_code(scenario)
+            result = await self.extract_implant_supported_prosthetics_code_async(scenario)
             if not result:
                 print("No implant prosthetics code returned")
                 return ""
@@ -169,6 +172,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating implant prosthetics analysis: {str(e)}")
             return ""
+
+    activate_implant_supported_prosthetics = blocking(activate_implant_supported_prosthetics_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -430,24 +431,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_other_implant_services_code(self, scenario: str) -> str:
+    async def extract_other_implant_services_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract other implant services code(s) for a given scenario."""
         try:
             print(f"Analyzing other implant services scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:other_services")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Other implant services extract_other_implant_services_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in other implant services code extraction: {str(e)}")
             return ""
+
+    extract_other_implant_services_code = blocking(extract_other_implant_services_code_async)
     
-    def activate_other_implant_services(self, scenario: str) -> str:
+    async def activate_other_implant_services_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the other implant services analysis process and return results."""
         try:
-            result = self.extract_other_implant_services_code(scenario)
+            result = await self.extract_other_implant_services_code_async(scenario)
             if not result:
                 print("No other implant services code returned")
                 return ""
@@ -455,6 +458,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating other implant services analysis: {str(e)}")
             return ""
+
+    activate_other_implant_services = blocking(activate_other_implant_services_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
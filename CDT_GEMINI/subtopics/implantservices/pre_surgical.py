@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -71,24 +72,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_pre_surgical_code(self, scenario: str) -> str:
+    async def extract_pre_surgical_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract pre-surgical implant services code(s) for a given scenario."""
         try:
             print(f"Analyzing pre-surgical implant scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:pre_surgical")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Pre-surgical extract_pre_surgical_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in pre-surgical code extraction: {str(e)}")
             return ""
+
+    extract_pre_surgical_code = blocking(extract_pre_surgical_code_async)
     
-    def activate_pre_surgical(self, scenario: str) -> str:
+    async def activate_pre_surgical_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the pre-surgical implant services analysis process and return results."""
         try:
-            result = self.extract_pre_surgical_code(scenario)
+            result = await self.extract_pre_surgical_code_async(scenario)
             if not result:
                 print("No pre-surgical implant code returned")
                 return ""
@@ -96,6 +99,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating pre-surgical implant analysis: {str(e)}")
             return ""
+
+    activate_pre_surgical = blocking(activate_pre_surgical_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
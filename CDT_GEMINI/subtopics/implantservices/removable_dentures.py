@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -116,24 +117,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_removable_dentures_code(self, scenario: str) -> str:
+    async def extract_removable_dentures_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract implant/abutment supported removable dentures code(s) for a given scenario."""
         try:
             print(f"Analyzing removable dentures scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:removable_dentures")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Removable dentures extract_removable_dentures_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in removable dentures code extraction: {str(e)}")
             return ""
+
+    extract_removable_dentures_code = blocking(extract_removable_dentures_code_async)
     
-    def activate_removable_dentures(self, scenario: str) -> str:
+    async def activate_removable_dentures_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the removable dentures analysis process and return results."""
         try:
-            result = self.extract_removable_dentures_code(scenario)
+            result = await self.extract_removable_dentures_code_async(scenario)
             if not result:
                 print("No removable dentures code returned")
                 return ""
@@ -141,6 +144,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating removable dentures analysis: {str(e)}")
             return ""
+
+    activate_removable_dentures = blocking(activate_removable_dentures_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
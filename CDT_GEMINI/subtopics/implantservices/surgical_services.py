@@ -1,7 +1,8 @@
 import os
 import sys
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
+from structured_output import SubtopicAnswer
 
 
 # Add the parent directory to the Python path
@@ -266,24 +267,26 @@ Scenario: {{scenario}}
             input_variables=["scenario"]
         )
     
-    def extract_surgical_services_code(self, scenario: str) -> str:
+    async def extract_surgical_services_code_async(self, scenario: str) -> SubtopicAnswer:
         """Extract surgical implant services code(s) for a given scenario."""
         try:
             print(f"Analyzing surgical implant scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="subtopic:surgical_services")
+            code = result.strip() if isinstance(result, str) else result
             print(f"Surgical services extract_surgical_services_code result: {code}")
-            if code.lower() in ["none", "", "not applicable"]:
+            if isinstance(code, str) and code.lower() in ["none", "", "not applicable"]:
                 return ""
             return code
         except Exception as e:
             print(f"Error in surgical services code extraction: {str(e)}")
             return ""
+
+    extract_surgical_services_code = blocking(extract_surgical_services_code_async)
     
-    def activate_surgical_services(self, scenario: str) -> str:
+    async def activate_surgical_services_async(self, scenario: str) -> SubtopicAnswer:
         """Activate the surgical implant services analysis process and return results."""
         try:
-            result = self.extract_surgical_services_code(scenario)
+            result = await self.extract_surgical_services_code_async(scenario)
             if not result:
                 print("No surgical implant code returned")
                 return ""
@@ -291,6 +294,8 @@ Scenario: {{scenario}}
         except Exception as e:
             print(f"Error activating surgical implant analysis: {str(e)}")
             return ""
+
+    activate_surgical_services = blocking(activate_surgical_services_async)
     
     def run_analysis(self, scenario: str) -> None:
         """Run the analysis and print results."""
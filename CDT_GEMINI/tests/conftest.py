@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app's modules live at the project root and import each other by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# llm_services builds its shared service at import time; keep it offline and off the on-disk cache
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
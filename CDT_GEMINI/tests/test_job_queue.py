@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+from job_queue import JobQueue, JobWorkerPool, SUCCEEDED
+
+def test_worker_pool_keeps_queue_writes_off_the_event_loop(tmp_path):
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"))
+    threads = []
+    for name in ("claim", "update_progress", "complete"):
+        method = getattr(queue, name)
+        setattr(queue, name, lambda *args, method=method: threads.append(threading.get_ident()) or method(*args))
+
+    async def handler(payload, report):
+        for stage in ("processed_scenario", "cdt_result", "icd_result"):
+            report(stage, {"scenario": payload["scenario"]})
+            await asyncio.sleep(0)
+        return {"status": "success"}
+
+    async def run():
+        pool = JobWorkerPool(queue, handler, workers=1, poll_interval=0.01)
+        job_id = queue.enqueue({"scenario": "crown on 8"})
+        pool.start()
+        while queue.get(job_id)["status"] != SUCCEEDED:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return job_id, threading.get_ident()
+
+    job_id, loop_thread = asyncio.run(run())
+
+    job = queue.get(job_id)
+    assert job["result"] == {"status": "success"}
+    assert job["progress"]["events"] == ["processed_scenario", "cdt_result", "icd_result"]
+    assert threads and loop_thread not in threads
@@ -0,0 +1,29 @@
+import time
+import asyncio
+
+from llm_batch import BatchCollector, LocalBatchBackend
+
+def test_cancelled_caller_does_not_fail_the_rest_of_the_batch(tmp_path):
+    backend = LocalBatchBackend(directory=str(tmp_path), responder=lambda body: body["messages"][0]["content"])
+    # The batch is cut by the window rather than by size, so the cancel below lands before it is claimed
+    collector = BatchCollector(backend=backend, directory=str(tmp_path), batch_size=8, window=0.2, poll_interval=0.01)
+
+    async def run():
+        futures = [
+            asyncio.wrap_future(collector.submit({"messages": [{"role": "user", "content": f"prompt {i}"}]}))
+            for i in range(4)
+        ]
+        futures[0].cancel()
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == ["prompt 1", "prompt 2", "prompt 3"]
+    # Counters are settled by the batch thread just after it resolves the futures
+    deadline = time.monotonic() + 5
+    while collector.stats()["in_flight_batches"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = collector.stats()
+    assert stats["completed"] == 3
+    assert stats["failed"] == 0
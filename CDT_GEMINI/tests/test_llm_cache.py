@@ -0,0 +1,23 @@
+import asyncio
+import threading
+
+from llm_cache import LLMResponseCache
+
+def test_async_access_reads_and_writes_the_disk_tier_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    writer, reader = LLMResponseCache(path=path), LLMResponseCache(path=path)
+    threads = []
+    for cache in (writer, reader):
+        connection = cache._connection
+        cache._connection = lambda connection=connection: threads.append(threading.get_ident()) or connection()
+
+    async def run():
+        await writer.set_async("key", "CODE: D2740", "google/gemini-2.5-pro")
+        # A fresh memory tier, so the read has to go to disk
+        return await reader.get_async("key"), await reader.get_async("key"), threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(run())
+
+    assert threads and loop_thread not in threads
+    assert first == second == "CODE: D2740"
+    assert reader.stats()["disk_hits"] == 1 and reader.stats()["memory_hits"] == 1
@@ -0,0 +1,28 @@
+from llm_metrics import CallMetrics, CallRecord, LLM_METRICS_RECENT
+
+def test_recent_limit_of_zero_keeps_no_records():
+    metrics = CallMetrics(enabled=True, recent=0)
+    metrics.record(CallRecord(stage="subtopic:crowns", model="google/gemini-2.5-pro"))
+
+    assert metrics.records() == []
+    assert metrics.stats()["totals"]["calls"] == 1
+
+def test_reset_keeps_the_current_limit_unless_given_one():
+    metrics = CallMetrics(enabled=True, recent=2)
+    metrics.reset()
+    assert metrics.recent.maxlen == 2
+
+    metrics.reset(5)
+    assert metrics.recent.maxlen == 5
+    assert CallMetrics(enabled=True, recent=None).recent.maxlen == LLM_METRICS_RECENT
+
+def test_records_limit_of_zero_returns_nothing_and_none_returns_everything():
+    metrics = CallMetrics(enabled=True, recent=10)
+    for stage in ("topic:restorative", "subtopic:crowns", "subtopic:crowns"):
+        metrics.record(CallRecord(stage=stage, model="google/gemini-2.5-pro"))
+
+    assert metrics.records(limit=0) == []
+    assert metrics.records(limit=-1) == []
+    assert len(metrics.records(limit=None)) == 3
+    assert [r["stage"] for r in metrics.records(limit=1)] == ["subtopic:crowns"]
+    assert len(metrics.records("subtopic", limit=None)) == 2
@@ -0,0 +1,64 @@
+import time
+import asyncio
+
+from pipeline import Pipeline, Stage
+from sub_topic_registry import SubtopicRegistry
+
+FAST, SLOW = 0.3, 0.6
+# Scheduling slack allowed on top of the slowest branch; well under the FAST branch it must not add
+SLACK = 0.2
+
+def sleeper(seconds, output):
+    async def branch(*args, **kwargs):
+        await asyncio.sleep(seconds)
+        return output
+    return branch
+
+def test_subtopic_fan_out_takes_as_long_as_the_slowest_subtopic():
+    registry = SubtopicRegistry()
+    registry.register("D2700-D2799", sleeper(FAST, "CODE: D2740"), "Crowns")
+    registry.register("D2900-D2999", sleeper(SLOW, "CODE: D2950"), "Other Restorative Services")
+
+    started = time.perf_counter()
+    result = asyncio.run(registry.activate_all("scenario", "D2700-D2799, D2900-D2999"))
+    elapsed = time.perf_counter() - started
+
+    assert sorted(result["activated_subtopics"]) == ["Crowns", "Other Restorative Services"]
+    assert SLOW <= elapsed < SLOW + SLACK
+
+def test_cdt_and_icd_classification_run_side_by_side():
+    pipeline = Pipeline([
+        Stage("processed_scenario", sleeper(0, "cleaned"), ("scenario",)),
+        Stage("cdt_result", sleeper(FAST, {"codes": []}), ("processed_scenario",)),
+        Stage("icd_result", sleeper(SLOW, {"codes": []}), ("processed_scenario",)),
+    ], inputs=("scenario",))
+
+    run = asyncio.run(pipeline.run(scenario="scenario"))
+
+    assert run.outputs["cdt_result"] == run.outputs["icd_result"] == {"codes": []}
+    assert SLOW <= run.duration < SLOW + SLACK
+    assert run.critical_path() == ["processed_scenario", "icd_result"]
+
+def test_topic_cut_short_by_the_deadline_keeps_its_finished_subtopics():
+    subtopics = SubtopicRegistry()
+    subtopics.register("D2700-D2799", sleeper(0, "CODE: D2740"), "Crowns")
+    subtopics.register("D2900-D2999", sleeper(10, "CODE: D2950"), "Other Restorative Services")
+
+    async def restorative(scenario):
+        result = await subtopics.activate_all(scenario, "D2700-D2799, D2900-D2999")
+        return {
+            "code_range": "D2700-D2799, D2900-D2999",
+            "activated_subtopics": result["activated_subtopics"],
+            "codes": result["topic_result"],
+            "timed_out_subtopics": result["timed_out_subtopics"]
+        }
+
+    topics = SubtopicRegistry()
+    topics.register("D2000-D2999", restorative, "Restorative")
+    result = asyncio.run(topics.activate_all("scenario", "D2000-D2999", timeout=FAST))
+
+    assert result["activated_subtopics"] == ["Restorative"]
+    assert result["timed_out_subtopics"] == ["Other Restorative Services"]
+    [restorative_result] = result["topic_result"]
+    assert restorative_result["activated_subtopics"] == ["Crowns"]
+    assert [item["raw_text"] for item in restorative_result["codes"]] == ["CODE: D2740"]
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+from single_flight import SingleFlight
+
+def test_blocking_callers_on_their_own_loops_share_one_call():
+    flight = SingleFlight()
+    calls, results = [], []
+    both_waiting = threading.Barrier(2)
+
+    async def fetch():
+        calls.append(threading.get_ident())
+        await asyncio.sleep(0.3)
+        return "CODE: D2740"
+
+    def caller():
+        both_waiting.wait()
+        # Each thread runs its own event loop, as blocking entry points do
+        results.append(asyncio.run(flight.do_async("key", fetch)))
+
+    threads = [threading.Thread(target=caller) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["CODE: D2740", "CODE: D2740"]
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "coalesced": 1, "in_flight": 0}
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        return "CODE: D2740"
+
+    async def run():
+        first = asyncio.create_task(flight.do_async("key", fetch))
+        second = asyncio.create_task(flight.do_async("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+
+    assert isinstance(first, asyncio.CancelledError)
+    assert second == "CODE: D2740"
@@ -0,0 +1,19 @@
+from structured_notes import parse_note
+
+NOTE = """S: Pain on upper right molar for two weeks.
+O: Deep distal caries on #3, percussion positive.
+A: Irreversible pulpitis #3.
+Tx: RCT #3, then crown.
+"""
+
+def test_bare_tx_heading_is_treated_as_a_plan():
+    note = parse_note(NOTE)
+
+    assert "Treatment Provided" not in note.sections
+    assert note.mapped_chars < note.total_chars
+
+def test_tx_today_heading_is_work_performed():
+    note = parse_note(NOTE.replace("Tx:", "Tx today:"))
+
+    assert note.sections["Treatment Provided"] == ["RCT #3, then crown."]
+    assert note.mapped_chars == note.total_chars
@@ -0,0 +1,45 @@
+import asyncio
+
+from structured_output import CodeSelection, SubtopicSelection
+from sub_topic_registry import SubtopicRegistry
+
+def selection(*codes):
+    return SubtopicSelection(codes=[CodeSelection(code=code, explanation=f"{code} applies") for code in codes])
+
+def test_registry_reads_structured_subtopic_answers_without_parsing_text():
+    registry = SubtopicRegistry()
+    async def crowns(scenario):
+        return selection("D2740", "D2740")
+    async def other_restorative(scenario):
+        return selection()
+    registry.register("D2700-D2799", crowns, "Crowns")
+    registry.register("D2900-D2999", other_restorative, "Other Restorative Services")
+
+    result = asyncio.run(registry.activate_all("scenario", "D2700-D2799, D2900-D2999"))
+
+    assert result["activated_subtopics"] == ["Crowns"]
+    [crowns_result] = result["topic_result"]
+    assert crowns_result["code_range"] == "D2700-D2799"
+    assert [code["code"] for code in crowns_result["codes"]] == ["D2740", "D2740"]
+    assert crowns_result["codes"][0]["explanation"] == "D2740 applies"
+
+def bad_request(message):
+    import httpx
+    import openai
+    response = httpx.Response(400, request=httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions"))
+    try:
+        raise RuntimeError("LLM call failed") from openai.BadRequestError(message, response=response, body={"message": message})
+    except RuntimeError as e:
+        return e
+
+def test_only_response_format_rejections_downgrade_the_model():
+    from llm_services import LLMService
+    from model_config import ModelConfig
+    service = LLMService()
+    config = ModelConfig(model="google/gemini-2.5-pro", response_format={"type": "json_object"})
+
+    assert not service._rejected_response_format(bad_request("This model's maximum context length is exceeded"), config)
+    assert config.model not in service._no_response_format
+
+    assert service._rejected_response_format(bad_request("response_format json_schema is not supported"), config)
+    assert config.model in service._no_response_format
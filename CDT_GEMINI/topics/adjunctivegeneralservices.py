@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -46,19 +46,19 @@ class AdjunctiveGeneralServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D9110-D9130", unclassified_service.activate_unclassified_treatment, 
+        self.registry.register("D9110-D9130", unclassified_service.activate_unclassified_treatment_async, 
                             "Unclassified Treatment (D9110-D9130)")
-        self.registry.register("D9210-D9248", anesthesia_service.activate_anesthesia, 
+        self.registry.register("D9210-D9248", anesthesia_service.activate_anesthesia_async, 
                             "Anesthesia (D9210-D9248)")
-        self.registry.register("D9310-D9311", professional_consultation_service.activate_professional_consultation, 
+        self.registry.register("D9310-D9311", professional_consultation_service.activate_professional_consultation_async, 
                             "Professional Consultation (D9310-D9311)")
-        self.registry.register("D9410-D9450", professional_visits_service.activate_professional_visits, 
+        self.registry.register("D9410-D9450", professional_visits_service.activate_professional_visits_async, 
                             "Professional Visits (D9410-D9450)")
-        self.registry.register("D9610-D9630", drugs_service.activate_drugs, 
+        self.registry.register("D9610-D9630", drugs_service.activate_drugs_async, 
                             "Drugs (D9610-D9630)")
-        self.registry.register("D9910-D9973", misc_service.activate_miscellaneous_services, 
+        self.registry.register("D9910-D9973", misc_service.activate_miscellaneous_services_async, 
                             "Miscellaneous Services (D9910-D9973)")
-        self.registry.register("D9961-D9999", non_clinical_service.activate_non_clinical_procedures, 
+        self.registry.register("D9961-D9999", non_clinical_service.activate_non_clinical_procedures_async, 
                             "Non-clinical Procedures (D9961-D9999)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -120,23 +120,25 @@ Example: "D9210-D9248, D9110-D9130, D9610-D9630"
             input_variables=["scenario"]
         )
     
-    def analyze_adjunctive_general_services(self, scenario: str) -> str:
+    async def analyze_adjunctive_general_services_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing adjunctive general services scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:adjunctivegeneralservices")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Adjunctive analyze_adjunctive_general_services result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_adjunctive_general_services: {str(e)}")
             return ""
+
+    analyze_adjunctive_general_services = blocking(analyze_adjunctive_general_services_async)
     
     async def activate_adjunctive_general_services(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            adjunctive_result = self.analyze_adjunctive_general_services(scenario)
+            adjunctive_result = await self.analyze_adjunctive_general_services_async(scenario)
             if not adjunctive_result:
                 print("No adjunctive result returned")
                 return {}
@@ -150,7 +152,8 @@ Example: "D9210-D9248, D9110-D9130, D9610-D9630"
             return {
                 "code_range": adjunctive_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in adjunctive general services analysis: {str(e)}")
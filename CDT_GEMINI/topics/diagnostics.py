@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -31,15 +31,15 @@ class DiagnosticServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D0120-D0180", clinical_oral_evaluations_service.activate_clinical_oral_evaluations, 
+        self.registry.register("D0120-D0180", clinical_oral_evaluations_service.activate_clinical_oral_evaluations_async, 
                             "Clinical Oral Evaluations (D0120-D0180)")
-        self.registry.register("D0190-D0191", prediagnostic_service.activate_prediagnostic_services, 
+        self.registry.register("D0190-D0191", prediagnostic_service.activate_prediagnostic_services_async, 
                             "Pre-diagnostic Services (D0190-D0191)")
-        self.registry.register("D0210-D0391", diagnostic_imaging_service.activate_diagnostic_imaging, 
+        self.registry.register("D0210-D0391", diagnostic_imaging_service.activate_diagnostic_imaging_async, 
                             "Diagnostic Imaging (D0210-D0391)")
-        self.registry.register("D0472-D0502", oral_pathology_laboratory_service.activate_oral_pathology_laboratory, 
+        self.registry.register("D0472-D0502", oral_pathology_laboratory_service.activate_oral_pathology_laboratory_async, 
                             "Oral Pathology Laboratory (D0472-D0502)")
-        self.registry.register("D0411-D0999", tests_service.activate_tests_and_examinations, 
+        self.registry.register("D0411-D0999", tests_service.activate_tests_and_examinations_async, 
                             "Tests and Laboratory Examinations (D0411-D0999)")
         self.registry.register("D4186", lambda x: "D4186" if "outcome assessment" in x.lower() else None, 
                             "Assessment of Patient Outcome Metrics (D4186)")
@@ -97,23 +97,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_diagnostic(self, scenario: str) -> str:
+    async def analyze_diagnostic_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing diagnostic scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:diagnostics")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Diagnostic analyze_diagnostic result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_diagnostic: {str(e)}")
             return ""
+
+    analyze_diagnostic = blocking(analyze_diagnostic_async)
     
     async def activate_diagnostic(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            diagnostic_result = self.analyze_diagnostic(scenario)
+            diagnostic_result = await self.analyze_diagnostic_async(scenario)
             if not diagnostic_result:
                 print("No diagnostic result returned")
                 return {}
@@ -127,7 +129,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": diagnostic_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in diagnostic analysis: {str(e)}")
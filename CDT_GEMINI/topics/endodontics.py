@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -50,23 +50,23 @@ class EndodonticServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D3110-D3120", pulpcapping_service.activate_pulp_capping, 
+        self.registry.register("D3110-D3120", pulpcapping_service.activate_pulp_capping_async, 
                             "Pulp Capping (D3110-D3120)")
-        self.registry.register("D3220-D3222", pulpotomy_service.activate_pulpotomy, 
+        self.registry.register("D3220-D3222", pulpotomy_service.activate_pulpotomy_async, 
                             "Pulpotomy (D3220-D3222)")
-        self.registry.register("D3230-D3240", primary_teeth_therapy_service.activate_primary_teeth_therapy, 
+        self.registry.register("D3230-D3240", primary_teeth_therapy_service.activate_primary_teeth_therapy_async, 
                             "Endodontic Therapy on Primary Teeth (D3230-D3240)")
-        self.registry.register("D3310-D3333", endodontic_therapy_service.activate_endodontic_therapy, 
+        self.registry.register("D3310-D3333", endodontic_therapy_service.activate_endodontic_therapy_async, 
                             "Endodontic Therapy (D3310-D3333)")
-        self.registry.register("D3346-D3348", endodontic_retreatment_service.activate_endodontic_retreatment, 
+        self.registry.register("D3346-D3348", endodontic_retreatment_service.activate_endodontic_retreatment_async, 
                             "Endodontic Retreatment (D3346-D3348)")
-        self.registry.register("D3351", apexification_service.activate_apexification, 
+        self.registry.register("D3351", apexification_service.activate_apexification_async, 
                             "Apexification/Recalcification (D3351)")
-        self.registry.register("D3355-D3357", pulpal_regeneration_service.activate_pulpal_regeneration, 
+        self.registry.register("D3355-D3357", pulpal_regeneration_service.activate_pulpal_regeneration_async, 
                             "Pulpal Regeneration (D3355-D3357)")
-        self.registry.register("D3410-D3470", apicoectomy_service.activate_apicoectomy, 
+        self.registry.register("D3410-D3470", apicoectomy_service.activate_apicoectomy_async, 
                             "Apicoectomy/Periradicular Services (D3410-D3470)")
-        self.registry.register("D3910-D3999", other_endodontic_service.activate_other_endodontic, 
+        self.registry.register("D3910-D3999", other_endodontic_service.activate_other_endodontic_async, 
                             "Other Endodontic Procedures (D3910-D3999)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -140,23 +140,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_endodontic(self, scenario: str) -> str:
+    async def analyze_endodontic_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing endodontic scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:endodontics")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Endodontics analyze_endodontic result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_endodontic: {str(e)}")
             return ""
+
+    analyze_endodontic = blocking(analyze_endodontic_async)
     
     async def activate_endodontic(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            endodontic_result = self.analyze_endodontic(scenario)
+            endodontic_result = await self.analyze_endodontic_async(scenario)
             if not endodontic_result:
                 print("No endodontic result returned")
                 return {}
@@ -170,7 +172,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": endodontic_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in endodontic analysis: {str(e)}")
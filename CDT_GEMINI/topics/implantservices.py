@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -53,25 +53,25 @@ class ImplantServices:
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
         try:
-            self.registry.register("D6190-D6190)", pre_surgical_service.activate_pre_surgical, 
+            self.registry.register("D6190-D6190)", pre_surgical_service.activate_pre_surgical_async, 
                                 "Pre-Surgical Services (D6190-D6190)")
-            self.registry.register("D6010-D6199", surgical_service.activate_surgical_services, 
+            self.registry.register("D6010-D6199", surgical_service.activate_surgical_services_async, 
                                 "Surgical Services (D6010-D6199)")
-            self.registry.register("D6051-D6078", implant_supported_prosthetics_service.activate_implant_supported_prosthetics, 
+            self.registry.register("D6051-D6078", implant_supported_prosthetics_service.activate_implant_supported_prosthetics_async, 
                                 "Implant Supported Prosthetics (D6051-D6078)")
-            self.registry.register("D6110-D6119", removable_dentures_service.activate_removable_dentures, 
+            self.registry.register("D6110-D6119", removable_dentures_service.activate_removable_dentures_async, 
                                 "Implant Supported Removable Dentures (D6110-D6119)")
-            self.registry.register("D6090-D6095", fixed_dentures_service.activate_implant_supported_fixed_dentures, 
+            self.registry.register("D6090-D6095", fixed_dentures_service.activate_implant_supported_fixed_dentures_async, 
                                 "Implant Supported Fixed Dentures (D6090-D6095)")
-            self.registry.register("D6058-D6077", abutment_crowns_service.activate_single_crowns_abutment, 
+            self.registry.register("D6058-D6077", abutment_crowns_service.activate_single_crowns_abutment_async, 
                                 "Single Crowns, Abutment Supported (D6058-D6077)")
-            self.registry.register("D6065-D6067", implant_crowns_service.activate_single_crowns_implant, 
+            self.registry.register("D6065-D6067", implant_crowns_service.activate_single_crowns_implant_async, 
                                 "Single Crowns, Implant Supported (D6065-D6067)")
-            self.registry.register("D6071-D6074", fpd_abutment_service.activate_fpd_abutment, 
+            self.registry.register("D6071-D6074", fpd_abutment_service.activate_fpd_abutment_async, 
                                 "Fixed Partial Denture, Abutment Supported (D6071-D6074)")
-            self.registry.register("D6075", fpd_implant_service.activate_fpd_implant, 
+            self.registry.register("D6075", fpd_implant_service.activate_fpd_implant_async, 
                                 "Fixed Partial Denture, Implant Supported (D6075)")
-            self.registry.register("D6080-D6199", other_implant_services_service.activate_other_implant_services, 
+            self.registry.register("D6080-D6199", other_implant_services_service.activate_other_implant_services_async, 
                                 "Other Implant Services (D6080-D6199)")
         except Exception as e:
             print(f"Error registering subtopics: {str(e)}")
@@ -153,23 +153,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_implant_services(self, scenario: str) -> str:
+    async def analyze_implant_services_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing implant services scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:implantservices")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Implant Services analyze_implant_services result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_implant_services: {str(e)}")
             return ""
+
+    analyze_implant_services = blocking(analyze_implant_services_async)
     
     async def activate_implant_services(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            implant_result = self.analyze_implant_services(scenario)
+            implant_result = await self.analyze_implant_services_async(scenario)
             if not implant_result:
                 print("No implant services result returned")
                 return {}
@@ -183,7 +185,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": implant_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in implant services analysis: {str(e)}")
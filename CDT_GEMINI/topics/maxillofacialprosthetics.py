@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -28,9 +28,9 @@ class MaxillofacialProstheticsServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D5992-D5937", general_prosthetics_service.activate_general_prosthetics, 
+        self.registry.register("D5992-D5937", general_prosthetics_service.activate_general_prosthetics_async, 
                             "General Maxillofacial Prosthetics (D5992-D5937)")
-        self.registry.register("D5986-D5999", carriers_service.activate_carriers, 
+        self.registry.register("D5986-D5999", carriers_service.activate_carriers_async, 
                             "Carriers (D5986-D5999)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -62,23 +62,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_maxillofacial_prosthetics(self, scenario: str) -> str:
+    async def analyze_maxillofacial_prosthetics_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing maxillofacial prosthetics scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:maxillofacialprosthetics")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Maxillofacial Prosthetics analyze_maxillofacial_prosthetics result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_maxillofacial_prosthetics: {str(e)}")
             return ""
+
+    analyze_maxillofacial_prosthetics = blocking(analyze_maxillofacial_prosthetics_async)
     
     async def activate_maxillofacial_prosthetics(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            maxillofacial_result = self.analyze_maxillofacial_prosthetics(scenario)
+            maxillofacial_result = await self.analyze_maxillofacial_prosthetics_async(scenario)
             if not maxillofacial_result:
                 print("No maxillofacial prosthetics result returned")
                 return {}
@@ -92,7 +94,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": maxillofacial_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in maxillofacial prosthetics analysis: {str(e)}")
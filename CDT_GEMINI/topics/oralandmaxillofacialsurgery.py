@@ -3,7 +3,7 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -67,35 +67,35 @@ class OralMaxillofacialSurgeryServices:
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
         try:
-            self.registry.register("D7111-D7140", extractions_service.activate_extractions, 
+            self.registry.register("D7111-D7140", extractions_service.activate_extractions_async, 
                                 "Extractions (D7111-D7140)")
-            self.registry.register("D7210-D7251", extractions_service.activate_extractions, 
+            self.registry.register("D7210-D7251", extractions_service.activate_extractions_async, 
                                 "Surgical Extractions (D7210-D7251)")
-            self.registry.register("D7260-D7297", other_surgical_procedures_service.activate_other_surgical_procedures, 
+            self.registry.register("D7260-D7297", other_surgical_procedures_service.activate_other_surgical_procedures_async, 
                                 "Other Surgical Procedures (D7260-D7297)")
-            self.registry.register("D7310-D7321", alveoloplasty_service.activate_alveoloplasty, 
+            self.registry.register("D7310-D7321", alveoloplasty_service.activate_alveoloplasty_async, 
                                 "Alveoloplasty (D7310-D7321)")
-            self.registry.register("D7340-D7350", vestibuloplasty_service.activate_vestibuloplasty, 
+            self.registry.register("D7340-D7350", vestibuloplasty_service.activate_vestibuloplasty_async, 
                                 "Vestibuloplasty (D7340-D7350)")
-            self.registry.register("D7410-D7465", excision_soft_tissue_service.activate_excision_soft_tissue, 
+            self.registry.register("D7410-D7465", excision_soft_tissue_service.activate_excision_soft_tissue_async, 
                                 "Excision of Soft Tissue Lesions (D7410-D7465)")
-            self.registry.register("D7440-D7461", excision_intra_osseous_service.activate_excision_intra_osseous, 
+            self.registry.register("D7440-D7461", excision_intra_osseous_service.activate_excision_intra_osseous_async, 
                                 "Excision of Intra-Osseous Lesions (D7440-D7461)")
-            self.registry.register("D7471-D7490", excision_bone_tissue_service.activate_excision_bone_tissue, 
+            self.registry.register("D7471-D7490", excision_bone_tissue_service.activate_excision_bone_tissue_async, 
                                 "Excision of Bone Tissue (D7471-D7490)")
-            self.registry.register("D7510-D7560", surgical_incision_service.activate_surgical_incision, 
+            self.registry.register("D7510-D7560", surgical_incision_service.activate_surgical_incision_async, 
                                 "Surgical Incision (D7510-D7560)")
-            self.registry.register("D7610-D7780", closed_fractures_service.activate_closed_fractures, 
+            self.registry.register("D7610-D7780", closed_fractures_service.activate_closed_fractures_async, 
                                 "Treatment of Closed Fractures (D7610-D7780)")
-            self.registry.register("D7610-D7780", open_fractures_service.activate_open_fractures, 
+            self.registry.register("D7610-D7780", open_fractures_service.activate_open_fractures_async, 
                                 "Treatment of Open Fractures (D7610-D7780)")
-            self.registry.register("D7810-D7880", tmj_dysfunctions_service.activate_tmj_dysfunctions, 
+            self.registry.register("D7810-D7880", tmj_dysfunctions_service.activate_tmj_dysfunctions_async, 
                                 "Reduction of Dislocation (D7810-D7880)")
-            self.registry.register("D7910-D7912", traumatic_wounds_service.activate_traumatic_wounds, 
+            self.registry.register("D7910-D7912", traumatic_wounds_service.activate_traumatic_wounds_async, 
                                 "Repair of Traumatic Wounds (D7910-D7912)")
-            self.registry.register("D7911-D7912", complicated_suturing_service.activate_complicated_suturing, 
+            self.registry.register("D7911-D7912", complicated_suturing_service.activate_complicated_suturing_async, 
                                 "Complicated Suturing (D7911-D7912)")
-            self.registry.register("D7920-D7999", other_repair_procedures_service.activate_other_repair_procedures, 
+            self.registry.register("D7920-D7999", other_repair_procedures_service.activate_other_repair_procedures_async, 
                                 "Other Repair Procedures (D7920-D7999)")
         except Exception as e:
             print(f"Error registering subtopics: {str(e)}")
@@ -209,23 +209,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_oral_maxillofacial_surgery(self, scenario: str) -> str:
+    async def analyze_oral_maxillofacial_surgery_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing oral and maxillofacial surgery scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:oralandmaxillofacialsurgery")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Oral & Maxillofacial Surgery analyze_oral_maxillofacial_surgery result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_oral_maxillofacial_surgery: {str(e)}")
             return ""
+
+    analyze_oral_maxillofacial_surgery = blocking(analyze_oral_maxillofacial_surgery_async)
     
     async def activate_oral_maxillofacial_surgery(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            oral_surgery_result = self.analyze_oral_maxillofacial_surgery(scenario)
+            oral_surgery_result = await self.analyze_oral_maxillofacial_surgery_async(scenario)
             if not oral_surgery_result:
                 print("No oral and maxillofacial surgery result returned")
                 return {}
@@ -239,10 +241,11 @@ List them in order of relevance, with the most relevant first.
             topic_result = result["topic_result"]
             activated_subtopics = result["activated_subtopics"]
             
-            # Special case for sialoliths
-            if "sialolith" in scenario.lower() and "D7260-D7297" not in oral_surgery_result:
+            # Special case for sialoliths (skipped when the request budget cut the subtopics short)
+            if ("sialolith" in scenario.lower() and "D7260-D7297" not in oral_surgery_result
+                    and not result["timed_out_subtopics"]):
                 print("Activating subtopic: Other Surgical Procedures (D7260-D7297) - Sialolithotomy")
-                code = other_surgical_procedures_service.activate_other_surgical_procedures(scenario)
+                code = await other_surgical_procedures_service.activate_other_surgical_procedures_async(scenario)
                 if code:
                     topic_result.append(code)
                     activated_subtopics.append("Other Surgical Procedures (D7260-D7297) - Sialolithotomy")
@@ -251,7 +254,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": oral_surgery_result,
                 "activated_subtopics": activated_subtopics,
-                "codes": topic_result
+                "codes": topic_result,
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in oral and maxillofacial surgery analysis: {str(e)}")
@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -40,13 +40,13 @@ class OrthodonticServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D8010-D8040", limited_orthodontic_treatment.activate_limited_orthodontic_treatment, 
+        self.registry.register("D8010-D8040", limited_orthodontic_treatment.activate_limited_orthodontic_treatment_async, 
                             "Limited Orthodontic Treatment (D8010-D8040)")
-        self.registry.register("D8070-D8090", comprehensive_orthodontic_treatment.activate_comprehensive_orthodontic_treatment, 
+        self.registry.register("D8070-D8090", comprehensive_orthodontic_treatment.activate_comprehensive_orthodontic_treatment_async, 
                             "Comprehensive Orthodontic Treatment (D8070-D8090)")
-        self.registry.register("D8210-D8220", minor_treatment_harmful_habits.activate_minor_treatment_harmful_habits, 
+        self.registry.register("D8210-D8220", minor_treatment_harmful_habits.activate_minor_treatment_harmful_habits_async, 
                             "Minor Treatment to Control Harmful Habits (D8210-D8220)")
-        self.registry.register("D8660-D8999", other_orthodontic_services.activate_other_orthodontic_services, 
+        self.registry.register("D8660-D8999", other_orthodontic_services.activate_other_orthodontic_services_async, 
                             "Other Orthodontic Services (D8660-D8999)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -90,23 +90,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_orthodontic(self, scenario: str) -> str:
+    async def analyze_orthodontic_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing orthodontic scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:orthodontics")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Orthodontic analyze_orthodontic result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_orthodontic: {str(e)}")
             return ""
+
+    analyze_orthodontic = blocking(analyze_orthodontic_async)
     
     async def activate_orthodontic(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            orthodontic_result = self.analyze_orthodontic(scenario)
+            orthodontic_result = await self.analyze_orthodontic_async(scenario)
             if not orthodontic_result:
                 print("No orthodontic result returned")
                 return {}
@@ -120,7 +122,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": orthodontic_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in orthodontic analysis: {str(e)}")
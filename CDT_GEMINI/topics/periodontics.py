@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -38,11 +38,11 @@ class PeriodonticServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D4210-D4286", surgical_services.activate_surgical_services, 
+        self.registry.register("D4210-D4286", surgical_services.activate_surgical_services_async, 
                             "Surgical Services (D4210-D4286)")
-        self.registry.register("D4322-D4381", non_surgical_services.activate_non_surgical_services, 
+        self.registry.register("D4322-D4381", non_surgical_services.activate_non_surgical_services_async, 
                             "Non-Surgical Services (D4322-D4381)")
-        self.registry.register("D4910-D4999", other_periodontal_services.activate_other_periodontal_services, 
+        self.registry.register("D4910-D4999", other_periodontal_services.activate_other_periodontal_services_async, 
                             "Other Periodontal Services (D4910-D4999)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -81,23 +81,25 @@ Example: "D4322-D4381, D4910-D4999, D4210-D4286"
             input_variables=["scenario"]
         )
     
-    def analyze_periodontic(self, scenario: str) -> str:
+    async def analyze_periodontic_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing periodontic scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:periodontics")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Periodontic analyze_periodontic result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_periodontic: {str(e)}")
             return ""
+
+    analyze_periodontic = blocking(analyze_periodontic_async)
     
     async def activate_periodontic(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            periodontic_result = self.analyze_periodontic(scenario)
+            periodontic_result = await self.analyze_periodontic_async(scenario)
             if not periodontic_result:
                 print("No periodontic result returned")
                 return {}
@@ -111,7 +113,8 @@ Example: "D4322-D4381, D4910-D4999, D4210-D4286"
             return {
                 "code_range": periodontic_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in periodontic analysis: {str(e)}")
@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -42,15 +42,15 @@ class PreventiveServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D1110-D1120", dental_prophylaxis_service.activate_dental_prophylaxis, 
+        self.registry.register("D1110-D1120", dental_prophylaxis_service.activate_dental_prophylaxis_async, 
                             "Dental Prophylaxis (D1110-D1120)")
-        self.registry.register("D1206-D1208", topical_fluoride_service.activate_topical_fluoride, 
+        self.registry.register("D1206-D1208", topical_fluoride_service.activate_topical_fluoride_async, 
                             "Topical Fluoride Treatment (D1206-D1208)")
-        self.registry.register("D1310-D1355", other_preventive_service.activate_other_preventive_services, 
+        self.registry.register("D1310-D1355", other_preventive_service.activate_other_preventive_services_async, 
                             "Other Preventive Services (D1310-D1355)")
-        self.registry.register("D1510-D1555", space_maintenance_service.activate_space_maintenance, 
+        self.registry.register("D1510-D1555", space_maintenance_service.activate_space_maintenance_async, 
                             "Space Maintenance (D1510-D1555)")
-        self.registry.register("D1701-D1707", vaccinations_service.activate_vaccinations, 
+        self.registry.register("D1701-D1707", vaccinations_service.activate_vaccinations_async, 
                             "Vaccinations (D1701-D1707)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -100,23 +100,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_preventive(self, scenario: str) -> str:
+    async def analyze_preventive_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing preventive scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:preventive")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Preventive analyze_preventive result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_preventive: {str(e)}")
             return ""
+
+    analyze_preventive = blocking(analyze_preventive_async)
     
     async def activate_preventive(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            preventive_result = self.analyze_preventive(scenario)
+            preventive_result = await self.analyze_preventive_async(scenario)
             if not preventive_result:
                 print("No preventive result returned")
                 return {}
@@ -130,7 +132,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": preventive_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in preventive analysis: {str(e)}")
@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -42,13 +42,13 @@ class FixedProsthodonticsServices:
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
         try:
-            self.registry.register("D6205-D6253", fixed_partial_denture_pontics_service.activate_fixed_partial_denture_pontics, 
+            self.registry.register("D6205-D6253", fixed_partial_denture_pontics_service.activate_fixed_partial_denture_pontics_async, 
                                 "Fixed Partial Denture Pontics (D6205-D6253)")
-            self.registry.register("D6545-D6634", fixed_partial_denture_retainers_inlays_onlays_service.activate_fixed_partial_denture_retainers_inlays_onlays, 
+            self.registry.register("D6545-D6634", fixed_partial_denture_retainers_inlays_onlays_service.activate_fixed_partial_denture_retainers_inlays_onlays_async, 
                                 "Fixed Partial Denture Retainers — Inlays/Onlays (D6545-D6634)")
-            self.registry.register("D6710-D6793", fixed_partial_denture_retainers_crowns_service.activate_fixed_partial_denture_retainers_crowns, 
+            self.registry.register("D6710-D6793", fixed_partial_denture_retainers_crowns_service.activate_fixed_partial_denture_retainers_crowns_async, 
                                 "Fixed Partial Denture Retainers — Crowns (D6710-D6793)")
-            self.registry.register("D6920-D6999", other_fixed_partial_denture_services_service.activate_other_fixed_partial_denture_services, 
+            self.registry.register("D6920-D6999", other_fixed_partial_denture_services_service.activate_other_fixed_partial_denture_services_async, 
                                 "Other Fixed Partial Denture Services (D6920-D6999)")
         except Exception as e:
             print(f"Error registering subtopics: {str(e)}")
@@ -94,23 +94,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_prosthodontics_fixed(self, scenario: str) -> str:
+    async def analyze_prosthodontics_fixed_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing fixed prosthodontics scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:prosthodonticsfixed")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Prosthodontics Fixed analyze_prosthodontics_fixed result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_prosthodontics_fixed: {str(e)}")
             return ""
+
+    analyze_prosthodontics_fixed = blocking(analyze_prosthodontics_fixed_async)
     
     async def activate_prosthodontics_fixed(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            prosthodontics_result = self.analyze_prosthodontics_fixed(scenario)
+            prosthodontics_result = await self.analyze_prosthodontics_fixed_async(scenario)
             if not prosthodontics_result:
                 print("No prosthodontics result returned")
                 return {}
@@ -124,7 +126,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": prosthodontics_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in prosthodontics fixed analysis: {str(e)}")
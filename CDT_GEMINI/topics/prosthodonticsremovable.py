@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -50,27 +50,27 @@ class RemovableProsthodonticsServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D5110-D5140", CompleteDenturesServices.activate_complete_dentures, 
+        self.registry.register("D5110-D5140", CompleteDenturesServices.activate_complete_dentures_async, 
                             "Complete Dentures (D5110-D5140)")
-        self.registry.register("D5211-D5286", PartialDentureServices.activate_partial_denture, 
+        self.registry.register("D5211-D5286", PartialDentureServices.activate_partial_denture_async, 
                             "Partial Denture (D5211-D5286)")
-        self.registry.register("D5410-D5422", AdjustmentsToDenturesServices.activate_adjustments_to_dentures, 
+        self.registry.register("D5410-D5422", AdjustmentsToDenturesServices.activate_adjustments_to_dentures_async, 
                             "Adjustments to Dentures (D5410-D5422)")
-        self.registry.register("D5511-D5520", RepairsToCompleteDenturesServices.activate_repairs_to_complete_dentures, 
+        self.registry.register("D5511-D5520", RepairsToCompleteDenturesServices.activate_repairs_to_complete_dentures_async, 
                             "Repairs to Complete Dentures (D5511-D5520)")
-        self.registry.register("D5611-D5671", RepairsToPartialDenturesServices.activate_repairs_to_partial_dentures, 
+        self.registry.register("D5611-D5671", RepairsToPartialDenturesServices.activate_repairs_to_partial_dentures_async, 
                             "Repairs to Partial Dentures (D5611-D5671)")
-        self.registry.register("D5710-D5725", DentureRebaseProceduresServices.activate_denture_rebase_procedures, 
+        self.registry.register("D5710-D5725", DentureRebaseProceduresServices.activate_denture_rebase_procedures_async, 
                             "Denture Rebase Procedures (D5710-D5725)")
-        self.registry.register("D5730-D5761", DentureRelineProceduresServices.activate_denture_reline_procedures, 
+        self.registry.register("D5730-D5761", DentureRelineProceduresServices.activate_denture_reline_procedures_async, 
                             "Denture Reline Procedures (D5730-D5761)")
-        self.registry.register("D5810-D5821", InterimProsthesisServices.activate_interim_prosthesis, 
+        self.registry.register("D5810-D5821", InterimProsthesisServices.activate_interim_prosthesis_async, 
                             "Interim Prosthesis (D5810-D5821)")
-        self.registry.register("D5765-D5899", OtherRemovableProstheticServices.activate_other_removable_prosthetic_services, 
+        self.registry.register("D5765-D5899", OtherRemovableProstheticServices.activate_other_removable_prosthetic_services_async, 
                             "Other Removable Prosthetic Services (D5765-D5899)")
-        self.registry.register("D5765-D5899", TissueConditioningServices.activate_tissue_conditioning, 
+        self.registry.register("D5765-D5899", TissueConditioningServices.activate_tissue_conditioning_async, 
                             "Tissue Conditioning (D5765-D5899)")
-        self.registry.register("D5765-D5899", UnspecifiedRemovableProsthodonticProcedureServices.activate_unspecified_removable_prosthodontic_procedure, 
+        self.registry.register("D5765-D5899", UnspecifiedRemovableProsthodonticProcedureServices.activate_unspecified_removable_prosthodontic_procedure_async, 
                             "Unspecified Removable Prosthodontic Procedure (D5765-D5899)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -152,23 +152,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_prosthodontics_removable(self, scenario: str) -> str:
+    async def analyze_prosthodontics_removable_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing removable prosthodontics scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:prosthodonticsremovable")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Prosthodontics Removable analyze_prosthodontics_removable result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_prosthodontics_removable: {str(e)}")
             return ""
+
+    analyze_prosthodontics_removable = blocking(analyze_prosthodontics_removable_async)
     
     async def activate_prosthodontics_removable(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            prosthodontics_result = self.analyze_prosthodontics_removable(scenario)
+            prosthodontics_result = await self.analyze_prosthodontics_removable_async(scenario)
             if not prosthodontics_result:
                 print("No removable prosthodontics result returned")
                 return {}
@@ -182,7 +184,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": prosthodontics_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in removable prosthodontics analysis: {str(e)}")
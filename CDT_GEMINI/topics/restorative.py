@@ -2,7 +2,7 @@ import os
 import sys
 import asyncio
 from langchain.prompts import PromptTemplate
-from llm_services import LLMService, get_service, set_model, set_temperature
+from llm_services import LLMService, get_service, set_model, set_temperature, blocking
 
 from sub_topic_registry import SubtopicRegistry
 
@@ -41,17 +41,17 @@ class RestorativeServices:
     
     def _register_subtopics(self):
         """Register all subtopics for parallel activation."""
-        self.registry.register("D2140-D2161", self.amalgam_restorations.activate_amalgam_restorations, 
+        self.registry.register("D2140-D2161", self.amalgam_restorations.activate_amalgam_restorations_async, 
                             "Amalgam Restorations (D2140-D2161)")
-        self.registry.register("D2330-D2394", self.resin_based_composite_restorations.activate_resin_based_composite_restorations, 
+        self.registry.register("D2330-D2394", self.resin_based_composite_restorations.activate_resin_based_composite_restorations_async, 
                             "Resin-Based Composite Restorations (D2330-D2394)")
-        self.registry.register("D2410-D2430", self.gold_foil_restorations.activate_gold_foil_restorations, 
+        self.registry.register("D2410-D2430", self.gold_foil_restorations.activate_gold_foil_restorations_async, 
                             "Gold Foil Restorations (D2410-D2430)")
-        self.registry.register("D2510-D2664", self.inlays_and_onlays.activate_inlays_and_onlays, 
+        self.registry.register("D2510-D2664", self.inlays_and_onlays.activate_inlays_and_onlays_async, 
                             "Inlays and Onlays (D2510-D2664)")
-        self.registry.register("D2710-D2799", self.crowns.activate_crowns, 
+        self.registry.register("D2710-D2799", self.crowns.activate_crowns_async, 
                             "Crowns (D2710-D2799)")
-        self.registry.register("D2910-D2999", self.other_restorative_services.activate_other_restorative_services, 
+        self.registry.register("D2910-D2999", self.other_restorative_services.activate_other_restorative_services_async, 
                             "Other Restorative Services (D2910-D2999)")
     
     def _create_prompt_template(self) -> PromptTemplate:
@@ -107,23 +107,25 @@ List them in order of relevance, with the most relevant first.
             input_variables=["scenario"]
         )
     
-    def analyze_restorative(self, scenario: str) -> str:
+    async def analyze_restorative_async(self, scenario: str) -> str:
         """Analyze the scenario to determine applicable code ranges."""
         try:
             print(f"Analyzing restorative scenario: {scenario[:100]}...")
-            result = self.llm_service.invoke_chain(self.prompt_template, {"scenario": scenario})
-            code_range = result.strip()
+            result = await self.llm_service.invoke_chain_async(self.prompt_template, {"scenario": scenario}, stage="topic:restorative")
+            code_range = result.strip() if isinstance(result, str) else ", ".join(result.code_ranges)
             print(f"Restorative analyze_restorative result: {code_range}")
             return code_range
         except Exception as e:
             print(f"Error in analyze_restorative: {str(e)}")
             return ""
+
+    analyze_restorative = blocking(analyze_restorative_async)
     
     async def activate_restorative(self, scenario: str) -> dict:
         """Activate relevant subtopics in parallel and return detailed results."""
         try:
             # Get the code range from the analysis
-            restorative_result = self.analyze_restorative(scenario)
+            restorative_result = await self.analyze_restorative_async(scenario)
             if not restorative_result:
                 print("No restorative result returned")
                 return {}
@@ -137,7 +139,8 @@ List them in order of relevance, with the most relevant first.
             return {
                 "code_range": restorative_result,
                 "activated_subtopics": result["activated_subtopics"],
-                "codes": result["topic_result"]
+                "codes": result["topic_result"],
+                "timed_out_subtopics": result["timed_out_subtopics"]
             }
         except Exception as e:
             print(f"Error in restorative analysis: {str(e)}")